@@ -0,0 +1,352 @@
+"""
+取り込み・検索・チャット応答のベンチマーク
+
+外部APIを使わないスタンドイン（LLM_PROVIDER=fake, VECTOR_STORE_BACKEND=local）に
+対して実行し、各処理の所要時間の p50 / p95 / p99 とスループットをJSONで出力する。
+同じシード・同じ件数で実行すれば同じコーパスが生成されるため、結果のJSONを
+比較することで実行ごとの性能の退行を確認できる。
+
+使い方（リポジトリのルートで実行）:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 1,100,10000,100000 --only upload_chunks,query
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/前回の結果.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import List, Dict, Any, Callable
+
+# 設定はインポート時に環境変数から読み込まれるため、src をインポートする前に設定する
+# シェルでPinecone・OpenAIの設定を使っていても本番のインデックスや有料APIに触れないよう、
+# スタンドインの使用と保存先は常に上書きする
+_STORE_DIR = tempfile.mkdtemp(prefix="pinechat_bench_")
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["VECTOR_STORE_BACKEND"] = "local"
+os.environ["LOCAL_VECTOR_STORE_DIR"] = os.path.join(_STORE_DIR, "vector_store")
+os.environ["INGESTION_MANIFEST_PATH"] = os.path.join(_STORE_DIR, "ingestion_manifest.sqlite3")
+os.environ["INGESTION_JOB_DIR"] = os.path.join(_STORE_DIR, "ingestion_jobs")
+os.environ["DOCUMENT_STORE_PATH"] = os.path.join(_STORE_DIR, "document_store.sqlite3")
+os.environ["LEXICAL_INDEX_PATH"] = os.path.join(_STORE_DIR, "lexical_index.sqlite3")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(_STORE_DIR, "embeddings.sqlite3")
+# キャッシュが効くと2回目以降の実行結果が変わるため無効化する
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("QUERY_CACHE_ENABLED", "false")
+# st.secrets を参照しないようにダミーの値を設定
+for _name in ("PINECONE_API_KEY", "OPENAI_API_KEY", "PINECONE_INDEX_NAME", "PINECONE_ASSISTANT_NAME"):
+    os.environ.setdefault(_name, "benchmark")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config.settings import CHUNK_SIZE, LLM_PROVIDER, VECTOR_STORE_BACKEND, BATCH_SIZE
+from src.components.file_upload import split_text_into_chunks, analyze_text_category, process_csv_file
+from src.utils.text_processing import JapaneseTextProcessor
+from src.services.pinecone_service import PineconeService
+from src.services.langchain_service import LangChainService
+
+# ベンチマークはインデックスの削除を伴うため、スタンドイン以外では実行しない
+if VECTOR_STORE_BACKEND != "local" or LLM_PROVIDER != "fake":
+    shutil.rmtree(_STORE_DIR, ignore_errors=True)
+    raise SystemExit(
+        "ベンチマークはスタンドイン（LLM_PROVIDER=fake, VECTOR_STORE_BACKEND=local）でのみ実行できます"
+        f"（現在: LLM_PROVIDER={LLM_PROVIDER}, VECTOR_STORE_BACKEND={VECTOR_STORE_BACKEND}）"
+    )
+
+DEFAULT_SIZES = "1,10,100,1000"
+DEFAULT_RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# コーパス生成に使う語彙（取り込み処理のカテゴリ判定に掛かる語を含める）
+_SUBJECTS = [
+    "駅前の商業施設", "市立図書館", "総合病院", "小学校", "中央公園", "市役所",
+    "新築マンション", "分譲住宅", "バス停", "スーパーマーケット", "保育園", "神社"
+]
+_PREDICATES = [
+    "は徒歩5分の距離にあります", "の周辺は治安が良く子育て世帯に人気です",
+    "は平日9時から17時まで利用できます", "では毎年夏祭りが開催されています",
+    "の家賃相場は月額8万円程度です", "は江戸時代から続く歴史ある地域です",
+    "には駐車場が併設されています", "の時刻表は1時間に4本です",
+    "は再開発により利便性が向上しました", "の近くには大型の商業施設があります"
+]
+_CITIES = ["川越市", "所沢市", "越谷市", "草加市"]
+_CSV_CATEGORIES = [
+    ("公共施設", "図書館"), ("医療", "病院"), ("教育", "小学校"),
+    ("交通", "駅"), ("商業施設", "スーパー"), ("公園", "都市公園")
+]
+
+def generate_sentence(rng: random.Random) -> str:
+    """ランダムな日本語の文を1つ生成"""
+    return f"{rng.choice(_CITIES)}の{rng.choice(_SUBJECTS)}{rng.choice(_PREDICATES)}。"
+
+def generate_text(num_chunks: int, chunk_size: int, seed: int) -> str:
+    """おおよそ num_chunks 個のチャンクに分割される長さのテキストを生成"""
+    rng = random.Random(seed)
+    target_length = num_chunks * chunk_size
+    lines = []
+    length = 0
+    while length < target_length:
+        line = "".join(generate_sentence(rng) for _ in range(rng.randint(1, 4)))
+        lines.append(line)
+        length += len(line) + 1
+    return "\n".join(lines)
+
+def generate_chunks(num_chunks: int, chunk_size: int, seed: int) -> List[Dict[str, Any]]:
+    """アップロード用のチャンクを生成"""
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(num_chunks):
+        text = ""
+        while len(text) < chunk_size:
+            text += generate_sentence(rng)
+        main_category, sub_category = rng.choice(_CSV_CATEGORIES)
+        chunks.append({
+            "id": f"bench_{i}",
+            "text": text[:chunk_size],
+            "metadata": {
+                "main_category": main_category,
+                "sub_category": sub_category,
+                "city": rng.choice(_CITIES),
+                "source": "benchmark"
+            }
+        })
+    return chunks
+
+def generate_csv(num_rows: int, seed: int) -> io.BytesIO:
+    """施設データ形式のCSVを生成（アップロードされたファイルと同じく getvalue() を持つ）"""
+    rng = random.Random(seed)
+    lines = []
+    for i in range(num_rows):
+        main_category, sub_category = rng.choice(_CSV_CATEGORIES)
+        lines.append(",".join([
+            main_category,
+            sub_category,
+            f"{rng.choice(_CITIES)}{sub_category}{i}",
+            f"{35.8 + rng.random() * 0.1:.6f}",
+            f"{139.4 + rng.random() * 0.1:.6f}",
+            str(rng.randint(50, 3000)),
+            str(rng.randint(1, 40)),
+            str(rng.randint(50, 2500))
+        ]))
+    return io.BytesIO("\n".join(lines).encode("utf-8"))
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """ソート済みの値から線形補間でパーセンタイルを計算"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def summarize(name: str, size: int, samples: List[float], items_per_sample: int, unit: str) -> Dict[str, Any]:
+    """計測値（秒）を集計"""
+    values = sorted(samples)
+    total_seconds = sum(values)
+    return {
+        "name": name,
+        "size": size,
+        "runs": len(values),
+        "unit": unit,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "mean_ms": total_seconds / len(values) * 1000 if values else 0.0,
+        "throughput_per_sec": items_per_sample * len(values) / total_seconds if total_seconds > 0 else 0.0
+    }
+
+def measure(func: Callable[[], Any], runs: int) -> List[float]:
+    """関数を runs 回実行し、各回の所要時間（秒）を返す"""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+def bench_split_text_into_chunks(size: int, args) -> List[Dict[str, Any]]:
+    text = generate_text(size, args.chunk_size, args.seed)
+    num_chunks = len(split_text_into_chunks(text, args.chunk_size))
+    samples = measure(lambda: split_text_into_chunks(text, args.chunk_size), args.repeat)
+    return [summarize("split_text_into_chunks", size, samples, num_chunks, "chunks")]
+
+def bench_japanese_text_processor(size: int, args) -> List[Dict[str, Any]]:
+    text = generate_text(size, args.chunk_size, args.seed)
+    results = []
+    for sentence_splitter in ("regex", "janome"):
+        processor = JapaneseTextProcessor(sentence_splitter)
+        num_chunks = len(processor.process_text_file(text, "benchmark.txt", args.chunk_size))
+        samples = measure(lambda: processor.process_text_file(text, "benchmark.txt", args.chunk_size), args.repeat)
+        results.append(summarize(f"JapaneseTextProcessor.process_text_file[{sentence_splitter}]", size, samples, num_chunks, "chunks"))
+    return results
+
+def bench_analyze_text_category(size: int, args) -> List[Dict[str, Any]]:
+    chunks = split_text_into_chunks(generate_text(size, args.chunk_size, args.seed), args.chunk_size)
+    samples = []
+    for _ in range(args.repeat):
+        for chunk in chunks:
+            samples.extend(measure(lambda: analyze_text_category(chunk), 1))
+    return [summarize("analyze_text_category", size, samples, 1, "chunks")]
+
+def bench_process_csv_file(size: int, args) -> List[Dict[str, Any]]:
+    csv_file = generate_csv(size, args.seed)
+    samples = measure(lambda: list(process_csv_file(csv_file)), args.repeat)
+    return [summarize("process_csv_file", size, samples, size, "rows")]
+
+def bench_upload_chunks(size: int, args) -> List[Dict[str, Any]]:
+    service = PineconeService()
+    chunks = generate_chunks(size, args.chunk_size, args.seed)
+    samples = []
+    for run in range(args.repeat):
+        namespace = f"bench_upload_{size}_{run}"
+        start = time.perf_counter()
+        service.upload_chunks(chunks, namespace=namespace, batch_size=args.batch_size)
+        samples.append(time.perf_counter() - start)
+        service.clear_index(namespace=namespace)
+    return [summarize("upload_chunks", size, samples, size, "chunks")]
+
+def _query_texts(chunks: List[Dict[str, Any]], count: int, seed: int) -> List[str]:
+    """検索に使うクエリ（登録済みチャンクの本文と、登録されていない文を半数ずつ）"""
+    rng = random.Random(seed)
+    queries = []
+    for i in range(count):
+        if i % 2 == 0:
+            queries.append(rng.choice(chunks)["text"])
+        else:
+            queries.append(generate_sentence(rng))
+    return queries
+
+def bench_query(size: int, args) -> List[Dict[str, Any]]:
+    service = PineconeService()
+    namespace = f"bench_query_{size}"
+    chunks = generate_chunks(size, args.chunk_size, args.seed)
+    service.upload_chunks(chunks, namespace=namespace, batch_size=args.batch_size)
+    queries = _query_texts(chunks, args.queries, args.seed)
+    try:
+        samples = []
+        for query in queries:
+            samples.extend(measure(lambda: service.query(query, namespace=namespace), 1))
+    finally:
+        service.clear_index(namespace=namespace)
+    return [summarize("query", size, samples, 1, "queries")]
+
+def bench_get_response(size: int, args) -> List[Dict[str, Any]]:
+    # LangChainService はデフォルトのnamespaceを検索する
+    service = PineconeService()
+    chunks = generate_chunks(size, args.chunk_size, args.seed)
+    service.upload_chunks(chunks, batch_size=args.batch_size)
+    langchain_service = LangChainService()
+    queries = _query_texts(chunks, args.queries, args.seed)
+    try:
+        samples = []
+        for query in queries:
+            samples.extend(measure(lambda: langchain_service.get_response(query), 1))
+            langchain_service.clear_memory()
+    finally:
+        service.clear_index(namespace="")
+    return [summarize("LangChainService.get_response", size, samples, 1, "turns")]
+
+BENCHMARKS = {
+    "split_text_into_chunks": bench_split_text_into_chunks,
+    "japanese_text_processor": bench_japanese_text_processor,
+    "analyze_text_category": bench_analyze_text_category,
+    "process_csv_file": bench_process_csv_file,
+    "upload_chunks": bench_upload_chunks,
+    "query": bench_query,
+    "get_response": bench_get_response
+}
+
+def compare_results(current: List[Dict[str, Any]], previous_path: str) -> None:
+    """前回の結果と p50 / p95 を比較して表示"""
+    with open(previous_path, encoding="utf-8") as f:
+        previous = {(r["name"], r["size"]): r for r in json.load(f)["results"]}
+
+    print(f"\n=== 前回の結果との比較: {previous_path} ===")
+    for result in current:
+        before = previous.get((result["name"], result["size"]))
+        if before is None:
+            continue
+        changes = []
+        for key in ("p50_ms", "p95_ms"):
+            if before[key] > 0:
+                changes.append(f"{key} {(result[key] / before[key] - 1) * 100:+.1f}%")
+        print(f"{result['name']:<40} size={result['size']:<7} " + ", ".join(changes))
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="取り込み・検索・チャット応答のベンチマーク")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"コーパスのチャンク数（カンマ区切り、既定: {DEFAULT_SIZES}）")
+    parser.add_argument("--only", default="", help="実行するベンチマーク名（カンマ区切り）: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=3, help="一括処理の繰り返し回数")
+    parser.add_argument("--queries", type=int, default=50, help="検索・チャット応答の計測回数")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="チャンクサイズ（文字数）")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="アップロードのバッチサイズ")
+    parser.add_argument("--seed", type=int, default=42, help="コーパス生成の乱数シード")
+    parser.add_argument("--output", default=None, help="結果のJSONの出力先")
+    parser.add_argument("--compare", default=None, help="比較する前回の結果のJSON")
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_args()
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    names = [name.strip() for name in args.only.split(",") if name.strip()] or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise SystemExit(f"不明なベンチマーク名です: {', '.join(unknown)}")
+
+    results = []
+    try:
+        for name in names:
+            for size in sizes:
+                print(f"実行中: {name} (size={size})", flush=True)
+                # 各処理のデバッグ出力は計測対象に含めつつ、画面には表示しない
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                    size_results = BENCHMARKS[name](size, args)
+                for result in size_results:
+                    print(
+                        f"  {result['name']}: p50={result['p50_ms']:.2f}ms p95={result['p95_ms']:.2f}ms "
+                        f"p99={result['p99_ms']:.2f}ms throughput={result['throughput_per_sec']:.1f} {result['unit']}/s",
+                        flush=True
+                    )
+                results.extend(size_results)
+    finally:
+        shutil.rmtree(_STORE_DIR, ignore_errors=True)
+
+    output_path = args.output or os.path.join(
+        DEFAULT_RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "created_at": datetime.now().isoformat(),
+            "environment": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "llm_provider": LLM_PROVIDER,
+                "vector_store_backend": VECTOR_STORE_BACKEND
+            },
+            "parameters": {
+                "sizes": sizes,
+                "repeat": args.repeat,
+                "queries": args.queries,
+                "chunk_size": args.chunk_size,
+                "batch_size": args.batch_size,
+                "seed": args.seed
+            },
+            "results": results
+        }, f, ensure_ascii=False, indent=2)
+    print(f"結果を保存しました: {output_path}")
+
+    if args.compare:
+        compare_results(results, args.compare)
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,15 @@ from src.services.question_classifier import QuestionClassifier
 from src.services.response_templates import ResponseTemplates
 from src.services.metadata_processor import MetadataProcessor
 from src.utils.error_handler import ErrorHandler, ErrorType
+from src.utils.resource_cache import get_resource
 
 def render_agent(pinecone_service: PineconeService):
     st.title("Agent Mode")
     
-    # サービスの初期化
-    question_classifier = QuestionClassifier()
+    # サービスの初期化（チャットモデルを含むものはプロセス内で共有）
+    question_classifier = get_resource("question_classifier", QuestionClassifier)
     response_templates = ResponseTemplates()
-    metadata_processor = MetadataProcessor()
+    metadata_processor = get_resource("metadata_processor", MetadataProcessor)
     error_handler = ErrorHandler()
     
     # ユーザー入力
@@ -36,9 +37,10 @@ def render_agent(pinecone_service: PineconeService):
             if question_type:
                 st.write(f"- 質問タイプ: {question_type}")
                 
-                # Pineconeから関連情報を検索
+                # Pineconeから関連情報を検索（キーワード検索と並行して実行し、結果を統合）
                 st.write("3. 関連情報の検索")
-                search_results = pinecone_service.query(user_input, top_k=3)
+                search_results = pinecone_service.hybrid_query(user_input, top_k=3)
+                st.write(f"- 検索方法: {search_results['mode']}")
                 
                 if search_results["matches"]:
                     # メタデータの抽出と検証
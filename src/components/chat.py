@@ -59,16 +59,11 @@ def load_chat_history(file):
 def get_property_list(pinecone_service: PineconeService) -> list:
     """物件情報の一覧を取得"""
     try:
-        # Pineconeから物件情報の一覧を取得
-        results = pinecone_service.list_vectors(namespace="property")
-        
-        if not results:
-            return []
-            
+        # Pineconeから物件情報をページ単位で取得
         properties = []
-        for match in results:
+        for match in pinecone_service.iter_vectors(namespace="property"):
             # テキストから物件情報を抽出
-            text = match.metadata["text"]
+            text = match["metadata"].get("text", "")
             lines = text.split('\n')
             
             # 物件名と場所を抽出（最初の2行を想定）
@@ -76,9 +71,10 @@ def get_property_list(pinecone_service: PineconeService) -> list:
             location = lines[1].strip() if len(lines) > 1 else "不明"
             
             properties.append({
-                "id": match.id,
+                "id": match["id"],
                 "name": name,
                 "location": location,
+                "city": match["metadata"].get("city", ""),
                 "text": text
             })
             
@@ -157,6 +153,9 @@ def render_chat(pinecone_service: PineconeService):
             # 選択された物件のIDを取得
             selected_property_id = properties[property_options.index(selected_property)]["id"]
             
+            # 選択された物件の市区町村（文脈検索の絞り込みに使用）
+            st.session_state.property_city = properties[property_options.index(selected_property)]["city"]
+            
             # 選択された物件の詳細情報を取得
             st.session_state.property_info = get_property_info(selected_property_id, pinecone_service)
             
@@ -166,6 +165,7 @@ def render_chat(pinecone_service: PineconeService):
         else:
             st.warning("物件情報が登録されていません。")
             st.session_state.property_info = "物件情報が登録されていません。"
+            st.session_state.property_city = None
         
         # 履歴の保存 (ローカルダウンロード)
         st.write(f"現在のメッセージ数: {len(st.session_state.messages)}")
@@ -238,33 +238,40 @@ def render_chat(pinecone_service: PineconeService):
             if template["name"] == selected_template
         )
         
-        # LangChainを使用して応答を生成
-        with st.spinner("応答を生成中..."):
-            # 会話履歴をLangChainのメッセージ形式に変換
-            chat_history = []
-            for msg in st.session_state.messages:  # すべてのメッセージを含める
-                if msg["role"] == "user":
-                    chat_history.append(("human", msg["content"]))
-                elif msg["role"] == "assistant":
-                    chat_history.append(("ai", msg["content"]))
-            
-            # 応答を生成
-            response, details = st.session_state.langchain_service.get_response(
-                query=prompt,
-                system_prompt=selected_template_data["system_prompt"],
-                response_template=selected_template_data["response_template"],
-                property_info=st.session_state.get("property_info"),
-                chat_history=chat_history,
-                selected_template_data=selected_template_data
-            )
-            
-            # アシスタントの応答を追加
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": response,
-                "timestamp": datetime.now().isoformat(),
-                "details": details
-            })
-            
-            # 画面を更新
-            st.rerun() 
\ No newline at end of file
+        # ユーザーメッセージを表示
+        with st.chat_message("user"):
+            st.markdown(prompt)
+        
+        # 会話履歴をLangChainのメッセージ形式に変換
+        chat_history = []
+        for msg in st.session_state.messages:  # すべてのメッセージを含める
+            if msg["role"] == "user":
+                chat_history.append(("human", msg["content"]))
+            elif msg["role"] == "assistant":
+                chat_history.append(("ai", msg["content"]))
+        
+        # LangChainを使用して応答をストリーミング生成
+        with st.chat_message("assistant"):
+            with st.spinner("関連情報を検索中..."):
+                stream = st.session_state.langchain_service.stream_response(
+                    query=prompt,
+                    system_prompt=selected_template_data["system_prompt"],
+                    response_template=selected_template_data["response_template"],
+                    property_info=st.session_state.get("property_info"),
+                    chat_history=chat_history,
+                    selected_template_data=selected_template_data,
+                    property_city=st.session_state.get("property_city")
+                )
+            # トークンを受信しながら表示
+            st.write_stream(iter(stream))
+        
+        # アシスタントの応答を追加（詳細情報はストリーム終了後に確定する）
+        st.session_state.messages.append({
+            "role": "assistant",
+            "content": stream.answer,
+            "timestamp": datetime.now().isoformat(),
+            "details": stream.details
+        })
+        
+        # 画面を更新
+        st.rerun()
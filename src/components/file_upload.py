@@ -1,14 +1,28 @@
 import streamlit as st
 from src.utils.text_processing import process_text_file
+from src.utils.keyword_matcher import KeywordMatcher
+from src.utils.chunking import ChunkingEngine
+from src.utils.file_reader import detect_encoding, iter_decoded_blocks, iter_file_lines
 from src.services.pinecone_service import PineconeService
-from src.config.settings import METADATA_CATEGORIES, CATEGORY_KEYWORDS, CHUNK_SIZE
+from src.services.ingestion_jobs import make_job_id, get_dead_letters
+from src.services.ingestion_worker import get_ingestion_worker
+from src.components.ingestion_status import render_ingestion_jobs, track_ingestion_job
+from src.config.settings import METADATA_CATEGORIES, CATEGORY_KEYWORDS, CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_SIZE_UNIT, CSV_READ_CHUNK_ROWS, CSV_DEBUG_SAMPLE_ROWS, BULK_UPLOAD_PROCESSES
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
+import numpy as np
 import json
 import traceback
+import hashlib
 import io
+import itertools
+import multiprocessing
+import os
+import time
+import zipfile
 import re
-from typing import List
+from typing import List, Iterable, Iterator, Callable, Tuple, Optional
 
 # デフォルトの作成日時を設定
 DEFAULT_CREATION_DATE = datetime.now().isoformat()
@@ -31,127 +45,258 @@ def split_text_into_chunks(text: str, max_chunk_size: int = None) -> list:
     if not text:
         return []
     
-    # テキストを行ごとに分割
-    lines = text.split('\n')
-    chunks = []
-    current_chunk = []
-    current_size = 0
-    
-    for line in lines:
-        line = line.strip()
-        if not line:  # 空行をスキップ
-            continue
-            
-        # 現在のチャンクに追加した場合のサイズを計算
-        line_size = len(line)
-        
-        # 現在のチャンクが最大サイズを超える場合は新しいチャンクを開始
-        if current_size + line_size > chunk_size and current_chunk:
-            chunks.append('\n'.join(current_chunk))
-            current_chunk = []
-            current_size = 0
-        
-        # 行を現在のチャンクに追加
-        current_chunk.append(line)
-        current_size += line_size
+    return list(iter_text_chunks(text.split('\n'), chunk_size))
+
+def iter_text_chunks(lines: Iterable[str], chunk_size: int, chunk_overlap: int = 0) -> Iterator[str]:
+    """
+    行のイテレータからチャンクを逐次生成する関数（split_text_into_chunks のストリーミング版）
     
-    # 最後のチャンクを追加
-    if current_chunk:
-        chunks.append('\n'.join(current_chunk))
+    Args:
+        lines (Iterable[str]): 分割するテキストの行
+        chunk_size (int): チャンクの最大サイズ（文字数）
+        chunk_overlap (int): 前のチャンクと重ねるサイズ
     
-    return chunks
+    Returns:
+        Iterator[str]: テキストチャンクのイテレータ
+    """
+    for chunk in ChunkingEngine(chunk_size, chunk_overlap).iter_chunks(lines):
+        yield chunk.text
 
 def read_file_content(file) -> str:
-    """ファイルの内容を適切なエンコーディングで読み込む"""
-    encodings = ['utf-8', 'shift-jis', 'cp932', 'euc-jp']
-    content = file.getvalue()
+    """ファイルの内容を適切なエンコーディングで読み込む
     
-    for encoding in encodings:
-        try:
-            # バイト列を文字列にデコード
-            decoded_content = content.decode(encoding)
-            # デコードした文字列を再度エンコードして元のバイト列と比較
-            if decoded_content.encode(encoding) == content:
-                return decoded_content
-        except (UnicodeDecodeError, UnicodeEncodeError):
-            continue
+    エンコーディングはファイルの先頭部分から判定し、判定できない場合は
+    UTF-8として読み込む（一部の文字が化ける可能性あり）。
+    """
+    encoding = detect_encoding(file) or 'utf-8'
+    return ''.join(iter_decoded_blocks(file, encoding))
+
+# 施設データCSVの列名
+CSV_COLUMNS = ["大カテゴリ", "中カテゴリ", "施設名", "緯度", "経度", "徒歩距離", "徒歩分数", "直線距離"]
+
+def format_skipped_rows(count: int, row_numbers: List[int]) -> str:
+    """数値に変換できない値のため処理しなかった行の件数と行番号（先頭の数行）を文言に変換"""
+    return (
+        f"{count}行に数値に変換できない値が含まれていたため処理しませんでした"
+        f"（行: {', '.join(str(row) for row in row_numbers)}{' など' if count > len(row_numbers) else ''}）"
+    )
+
+def process_csv_file(
+    file,
+    debug: bool = False,
+    chunksize: int = CSV_READ_CHUNK_ROWS,
+    on_skipped_rows: Optional[Callable[[int, List[int]], None]] = None
+) -> Iterator[dict]:
+    """CSVファイルを処理してチャンクに分割
+    
+    エンコーディングの判定はこの関数の呼び出し時に行い、チャンクは
+    chunksize 行ずつ読み込みながら生成するジェネレータとして返す。
+    
+    Args:
+        file: アップロードされたCSVファイル
+        debug (bool): 先頭の数行の内容とメタデータを画面に表示するかどうか
+        chunksize (int): 一度に読み込む行数
+        on_skipped_rows: 処理しなかった行があるたびに、それまでの合計の行数と
+            行番号（先頭のCSV_DEBUG_SAMPLE_ROWS行）を受け取る関数（ワーカーのスレッド・
+            子プロセスでは画面に表示できないため、呼び出し元で報告する）
     
-    # すべてのエンコーディングで失敗した場合
+    Returns:
+        Iterator[dict]: チャンクのイテレータ
+    """
     try:
-        # UTF-8で強制的にデコードを試みる（一部の文字が化ける可能性あり）
-        return content.decode('utf-8', errors='replace')
+        # ファイルの先頭部分からエンコーディングを判定
+        encoding = detect_encoding(file)
+        if encoding is None:
+            raise ValueError("CSVファイルのエンコーディングを特定できませんでした。")
+        
+        # CSVとして chunksize 行ずつ読み込む（文字列のまま読み込み、数値は後でまとめて変換）
+        reader = pd.read_csv(
+            file,
+            header=None,
+            names=CSV_COLUMNS,
+            dtype=str,
+            encoding=encoding,
+            encoding_errors='replace',
+            chunksize=chunksize
+        )
     except Exception as e:
-        raise ValueError(f"ファイルのエンコーディングを特定できませんでした。エラー: {str(e)}")
+        raise ValueError(f"CSVファイルの処理に失敗しました: {str(e)}")
+    
+    return _iter_csv_chunks(reader, debug, on_skipped_rows)
 
-def process_csv_file(file):
-    """CSVファイルを処理してチャンクに分割"""
+def _iter_csv_chunks(reader, debug: bool, on_skipped_rows: Optional[Callable[[int, List[int]], None]] = None) -> Iterator[dict]:
+    """読み込んだCSVを列単位でまとめて変換し、チャンクを順に生成"""
+    chunk_count = 0
+    debug_rows = CSV_DEBUG_SAMPLE_ROWS if debug else 0
+    skipped_count = 0
+    skipped_rows = []
+    
     try:
-        # エンコーディングのリスト（日本語のCSVで一般的なエンコーディング）
-        encodings = ['utf-8', 'shift-jis', 'cp932', 'euc-jp']
-        
-        # 各エンコーディングで試行
-        for encoding in encodings:
-            try:
-                # ファイルの内容をバイト列として読み込む
-                content = file.getvalue()
-                # 指定したエンコーディングでデコード
-                decoded_content = content.decode(encoding)
-                # デコードした内容をStringIOに変換
-                file_like = io.StringIO(decoded_content)
-                # CSVとして読み込む
-                df = pd.read_csv(file_like, header=None, names=[
-                    "大カテゴリ", "中カテゴリ", "施設名", "緯度", "経度", "徒歩距離", "徒歩分数", "直線距離"
-                ])
-                break  # 成功したらループを抜ける
-            except (UnicodeDecodeError, pd.errors.EmptyDataError):
-                continue  # 失敗したら次のエンコーディングを試す
-        
-        if 'df' not in locals():
-            raise ValueError("CSVファイルのエンコーディングを特定できませんでした。")
-        
-        # デバッグ情報の表示
-        st.write("CSVファイルの内容:")
-        st.dataframe(df)
-        
-        # 各列を結合してテキストを作成
-        chunks = []
-        for index, row in df.iterrows():
-            try:
-                # 各行をテキストに変換
-                text = f"{row['施設名']}は{row['大カテゴリ']}の{row['中カテゴリ']}です。"
-                if text.strip():
-                    # NaN値を適切に処理し、型変換を確実に行う
-                    metadata = {
-                        "main_category": str(row['大カテゴリ']) if pd.notna(row['大カテゴリ']) else "",
-                        "sub_category": str(row['中カテゴリ']) if pd.notna(row['中カテゴリ']) else "",
-                        "facility_name": str(row['施設名']) if pd.notna(row['施設名']) else "",
-                        "latitude": float(row['緯度']) if pd.notna(row['緯度']) else 0.0,
-                        "longitude": float(row['経度']) if pd.notna(row['経度']) else 0.0,
-                        "walking_distance": int(float(row['徒歩距離'])) if pd.notna(row['徒歩距離']) else 0,
-                        "walking_minutes": int(float(row['徒歩分数'])) if pd.notna(row['徒歩分数']) else 0,
-                        "straight_distance": int(float(row['直線距離'])) if pd.notna(row['直線距離']) else 0
-                    }
-                    
-                    # デバッグ情報の表示
+        for df in reader:
+            if debug_rows > 0:
+                # デバッグ情報の表示
+                st.write("CSVファイルの内容（先頭）:")
+                st.dataframe(df.head(debug_rows))
+            
+            # 数値列をまとめて変換（空欄は0、変換できない値がある行は処理しない）
+            invalid = pd.Series(False, index=df.index)
+            numeric = {}
+            for column in ["緯度", "経度", "徒歩距離", "徒歩分数", "直線距離"]:
+                values = pd.to_numeric(df[column], errors="coerce")
+                invalid |= values.isna() & df[column].notna()
+                if column not in ("緯度", "経度"):
+                    # 整数に変換できない値（無限大）も不正な値として扱う
+                    invalid |= np.isinf(values)
+                numeric[column] = values.fillna(0)
+            
+            if invalid.any():
+                skipped_count += int(invalid.sum())
+                skipped_rows.extend(int(index) + 1 for index in df.index[invalid][:CSV_DEBUG_SAMPLE_ROWS - len(skipped_rows)])
+                if on_skipped_rows:
+                    on_skipped_rows(skipped_count, list(skipped_rows))
+            
+            valid = df[~invalid]
+            if valid.empty:
+                continue
+            
+            # 各行をテキストに変換（空欄は従来どおり "nan" と表記）
+            names, main_categories, sub_categories = (
+                valid[column].fillna("nan").astype(str) for column in ['施設名', '大カテゴリ', '中カテゴリ']
+            )
+            texts = names + "は" + main_categories + "の" + sub_categories + "です。"
+            metadata_columns = {
+                "main_category": valid['大カテゴリ'].fillna("").tolist(),
+                "sub_category": valid['中カテゴリ'].fillna("").tolist(),
+                "facility_name": valid['施設名'].fillna("").tolist(),
+                "latitude": numeric['緯度'][~invalid].astype(float).tolist(),
+                "longitude": numeric['経度'][~invalid].astype(float).tolist(),
+                "walking_distance": numeric['徒歩距離'][~invalid].astype(np.int64).tolist(),
+                "walking_minutes": numeric['徒歩分数'][~invalid].astype(np.int64).tolist(),
+                "straight_distance": numeric['直線距離'][~invalid].astype(np.int64).tolist()
+            }
+            
+            for i, (index, text) in enumerate(zip(valid.index, texts.tolist())):
+                metadata = {key: values[i] for key, values in metadata_columns.items()}
+                
+                if debug_rows > 0:
+                    # デバッグ情報の表示（先頭の数行のみ）
                     st.write(f"行 {index + 1} のメタデータ:")
                     st.json(metadata)
-                    
-                    chunks.append({
-                        "id": f"csv_{index}_{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                        "text": text,
-                        "metadata": metadata
-                    })
-            except Exception as e:
-                st.error(f"行 {index + 1} の処理中にエラーが発生しました: {str(e)}")
-                continue
+                    debug_rows -= 1
+                
+                chunk_count += 1
+                yield {
+                    "id": f"csv_{index}",
+                    "text": text,
+                    "metadata": metadata
+                }
         
-        if not chunks:
+        if chunk_count == 0:
             raise ValueError("有効なデータが1件も見つかりませんでした。")
-            
-        return chunks
     except Exception as e:
         raise ValueError(f"CSVファイルの処理に失敗しました: {str(e)}")
 
+# 時刻表特有のキーワード（より具体的な表現に）
+TIMETABLE_KEYWORDS = [
+    "時刻表", "発車", "到着", "上り", "下り", "平日", "土休日", "号",
+    "始発", "終電", "運行", "ダイヤ", "列車", "電車", "快速", "普通",
+    "各駅停車", "区間", "方面", "行き", "駅", "バス停", "停留所"
+]
+
+# 歴史・文化関連のキーワードを追加
+HISTORY_CULTURE_KEYWORDS = [
+    "歴史", "史跡", "文化財", "重要文化財", "国宝", "遺跡",
+    "城", "神社", "寺院", "仏閣", "古墳", "博物館", "資料館",
+    "伝統", "文化", "祭り", "行事", "風習", "伝説", "物語",
+    "偉人", "人物", "発祥", "起源", "由来", "地名", "街道",
+    "市制", "施行", "周年", "記念", "制定", "答申", "告示",
+    "和歌", "歌人", "伝説", "逸話", "故事", "由来", "歴史的",
+    "文化的", "伝統的", "風習", "習俗", "慣習", "風俗", "民俗"
+]
+
+# キーワードマッピング
+KEYWORD_MAPPING = {
+    "物件概要": {
+        "概要・エリア区分": [
+            "物件", "マンション", "アパート", "一戸建て", "土地", "駐車場",
+            "エリア", "地区", "地域", "区画", "街区", "敷地", "建物",
+            "構造", "階数", "築年数", "新築", "中古", "リフォーム"
+        ],
+        "価格・費用": [
+            "価格", "費用", "家賃", "管理費", "敷金", "礼金", "仲介手数料",
+            "共益費", "光熱費", "水道代", "電気代", "ガス代", "保険料",
+            "税金", "固定資産税", "都市計画税", "修繕積立金", "更新料"
+        ],
+        "間取り・設備": [
+            "間取り", "LDK", "DK", "K", "設備", "家具", "家電", "エアコン",
+            "バス", "トイレ", "キッチン", "洗面所", "収納", "クローゼット",
+            "ベランダ", "バルコニー", "ロフト", "地下室", "屋上", "庭",
+            "駐車場", "駐輪場", "宅配ボックス", "インターホン", "セキュリティ"
+        ],
+        "契約・手続き": [
+            "契約", "入居", "退去", "更新", "手続き", "書類", "保証人",
+            "連帯保証人", "審査", "内見", "申込", "入居審査", "契約書",
+            "重要事項説明", "火災保険", "家財保険", "原状回復", "明渡し"
+        ]
+    },
+    "地域特性・街のプロフィール": {
+        "概要・エリア区分": [
+            "エリア", "地区", "地域", "区画", "街区", "町", "丁目",
+            "住宅地", "商業地", "工業地", "文教地区", "オフィス街",
+            "再開発", "都市計画", "用途地域", "容積率", "建蔽率"
+        ],
+        "交通アクセス": [
+            "JR", "線", "駅", "所要時間", "分", "直通", "運転", "急行", "特急",
+            "バス", "車", "アクセス", "交通", "路線", "新宿", "池袋", "渋谷",
+            "横浜", "大宮", "川越", "本川越", "新木場", "八王子", "海老名",
+            "元町", "中華街", "新横浜", "Fライナー", "小江戸号", "バス停",
+            "高速道路", "IC", "JCT", "空港", "港", "フェリー", "タクシー"
+        ] + TIMETABLE_KEYWORDS,
+        "街の歴史・地域史": HISTORY_CULTURE_KEYWORDS,
+        "自然・環境": [
+            "公園", "緑地", "庭園", "植物園", "森林", "山", "川", "湖",
+            "海", "海岸", "砂浜", "岬", "渓谷", "滝", "温泉", "湧水",
+            "自然", "環境", "生態系", "動植物", "野鳥", "昆虫", "花",
+            "桜", "紅葉", "四季", "気候", "天気", "風", "光", "空気"
+        ],
+        "観光・グルメ": [
+            "観光", "観光地", "名所", "旧跡", "見所", "スポット",
+            "レジャー", "遊園地", "水族館", "動物園", "美術館", "博物館",
+            "ショッピング", "商業施設", "モール", "商店街", "市場",
+            "グルメ", "飲食店", "レストラン", "カフェ", "居酒屋", "バー",
+            "特産品", "名物", "郷土料理", "スイーツ", "お土産", "物産"
+        ]
+    }
+}
+
+# 時刻表の特徴的なパターン（より厳密な条件に）
+TIMETABLE_PATTERNS = [re.compile(pattern) for pattern in [
+    r'^\d{1,2}:\d{2}$',  # 時刻のパターン（例：6:02）- 行全体が時刻の場合のみ
+    r'発車|到着',        # 発着の表示
+    r'上り|下り',        # 上り下りの表示
+    r'平日|土休日',      # 運行区分
+    r'^\d+号$'          # 列車番号 - 行全体が番号の場合のみ
+]]
+
+# キーワード → 出現時に加算するグループと件数
+# （同じキーワードがリストに複数回含まれる場合はその回数分を数える）
+_KEYWORD_GROUPS = {}
+
+def _register_keywords(group, keywords):
+    """キーワードとグループの対応を登録"""
+    for keyword in keywords:
+        counts = _KEYWORD_GROUPS.setdefault(keyword, {})
+        counts[group] = counts.get(group, 0) + 1
+
+_register_keywords("history_culture", HISTORY_CULTURE_KEYWORDS)
+_register_keywords("timetable", TIMETABLE_KEYWORDS)
+for _main_category, _subcategories in KEYWORD_MAPPING.items():
+    for _subcategory, _keywords in _subcategories.items():
+        _register_keywords((_main_category, _subcategory), _keywords)
+
+# 全キーワードを1回の走査で検出するマッチャー（インポート時に1度だけ構築）
+KEYWORD_MATCHER = KeywordMatcher(_KEYWORD_GROUPS)
+
 def analyze_text_category(text: str) -> dict:
     """
     テキストの内容からカテゴリを分析する関数
@@ -185,111 +330,36 @@ def analyze_text_category(text: str) -> dict:
         }
     }
     
-    # テキストを行ごとに分割
-    lines = text.split('\n')
-    
-    # 時刻表特有のキーワード（より具体的な表現に）
-    timetable_keywords = [
-        "時刻表", "発車", "到着", "上り", "下り", "平日", "土休日", "号",
-        "始発", "終電", "運行", "ダイヤ", "列車", "電車", "快速", "普通",
-        "各駅停車", "区間", "方面", "行き", "駅", "バス停", "停留所"
-    ]
-    
-    # 歴史・文化関連のキーワードを追加
-    history_culture_keywords = [
-        "歴史", "史跡", "文化財", "重要文化財", "国宝", "遺跡",
-        "城", "神社", "寺院", "仏閣", "古墳", "博物館", "資料館",
-        "伝統", "文化", "祭り", "行事", "風習", "伝説", "物語",
-        "偉人", "人物", "発祥", "起源", "由来", "地名", "街道",
-        "市制", "施行", "周年", "記念", "制定", "答申", "告示",
-        "和歌", "歌人", "伝説", "逸話", "故事", "由来", "歴史的",
-        "文化的", "伝統的", "風習", "習俗", "慣習", "風俗", "民俗"
-    ]
-    
-    # キーワードマッピング
-    keyword_mapping = {
-        "物件概要": {
-            "概要・エリア区分": [
-                "物件", "マンション", "アパート", "一戸建て", "土地", "駐車場",
-                "エリア", "地区", "地域", "区画", "街区", "敷地", "建物",
-                "構造", "階数", "築年数", "新築", "中古", "リフォーム"
-            ],
-            "価格・費用": [
-                "価格", "費用", "家賃", "管理費", "敷金", "礼金", "仲介手数料",
-                "共益費", "光熱費", "水道代", "電気代", "ガス代", "保険料",
-                "税金", "固定資産税", "都市計画税", "修繕積立金", "更新料"
-            ],
-            "間取り・設備": [
-                "間取り", "LDK", "DK", "K", "設備", "家具", "家電", "エアコン",
-                "バス", "トイレ", "キッチン", "洗面所", "収納", "クローゼット",
-                "ベランダ", "バルコニー", "ロフト", "地下室", "屋上", "庭",
-                "駐車場", "駐輪場", "宅配ボックス", "インターホン", "セキュリティ"
-            ],
-            "契約・手続き": [
-                "契約", "入居", "退去", "更新", "手続き", "書類", "保証人",
-                "連帯保証人", "審査", "内見", "申込", "入居審査", "契約書",
-                "重要事項説明", "火災保険", "家財保険", "原状回復", "明渡し"
-            ]
-        },
-        "地域特性・街のプロフィール": {
-            "概要・エリア区分": [
-                "エリア", "地区", "地域", "区画", "街区", "町", "丁目",
-                "住宅地", "商業地", "工業地", "文教地区", "オフィス街",
-                "再開発", "都市計画", "用途地域", "容積率", "建蔽率"
-            ],
-            "交通アクセス": [
-                "JR", "線", "駅", "所要時間", "分", "直通", "運転", "急行", "特急",
-                "バス", "車", "アクセス", "交通", "路線", "新宿", "池袋", "渋谷",
-                "横浜", "大宮", "川越", "本川越", "新木場", "八王子", "海老名",
-                "元町", "中華街", "新横浜", "Fライナー", "小江戸号", "バス停",
-                "高速道路", "IC", "JCT", "空港", "港", "フェリー", "タクシー"
-            ] + timetable_keywords,
-            "街の歴史・地域史": history_culture_keywords,
-            "自然・環境": [
-                "公園", "緑地", "庭園", "植物園", "森林", "山", "川", "湖",
-                "海", "海岸", "砂浜", "岬", "渓谷", "滝", "温泉", "湧水",
-                "自然", "環境", "生態系", "動植物", "野鳥", "昆虫", "花",
-                "桜", "紅葉", "四季", "気候", "天気", "風", "光", "空気"
-            ],
-            "観光・グルメ": [
-                "観光", "観光地", "名所", "旧跡", "見所", "スポット",
-                "レジャー", "遊園地", "水族館", "動物園", "美術館", "博物館",
-                "ショッピング", "商業施設", "モール", "商店街", "市場",
-                "グルメ", "飲食店", "レストラン", "カフェ", "居酒屋", "バー",
-                "特産品", "名物", "郷土料理", "スイーツ", "お土産", "物産"
-            ]
-        }
-    }
-    
     # 時刻表判定のためのフラグ
     is_timetable = False
     
-    # 時刻表の特徴的なパターン（より厳密な条件に）
-    timetable_patterns = [
-        r'^\d{1,2}:\d{2}$',  # 時刻のパターン（例：6:02）- 行全体が時刻の場合のみ
-        r'発車|到着',        # 発着の表示
-        r'上り|下り',        # 上り下りの表示
-        r'平日|土休日',      # 運行区分
-        r'^\d+号$'          # 列車番号 - 行全体が番号の場合のみ
-    ]
+    # 各行に含まれるキーワードを1回の走査で検出
+    lines = text.split('\n')
+    line_keywords = KEYWORD_MATCHER.find_per_line(text)
     
     # 各行を分析
-    for line in lines:
+    for line, keywords_in_line in zip(lines, line_keywords):
         line = line.strip()
         if not line:
             continue
         
+        # グループごとのキーワードの出現数を集計
+        group_counts = {}
+        for keyword in keywords_in_line:
+            for group, count in _KEYWORD_GROUPS[keyword].items():
+                group_counts[group] = group_counts.get(group, 0) + count
+        
         # 歴史・文化関連のキーワードチェック（優先度を上げる）
-        history_culture_count = sum(1 for keyword in history_culture_keywords if keyword in line)
+        history_culture_count = group_counts.get("history_culture", 0)
         if history_culture_count > 0:
             category_scores["地域特性・街のプロフィール"] += history_culture_count * 2
             subcategory_scores["地域特性・街のプロフィール"]["街の歴史・地域史"] += history_culture_count * 2
             continue
         
         # 時刻表特有のキーワードチェック（より厳密に）
-        if any(keyword in line for keyword in timetable_keywords):
+        if group_counts.get("timetable", 0) > 0:
             # 時刻表のパターンも同時に確認
-            pattern_matches = sum(1 for pattern in timetable_patterns if re.search(pattern, line))
+            pattern_matches = sum(1 for pattern in TIMETABLE_PATTERNS if pattern.search(line))
             if pattern_matches >= 2:  # 2つ以上のパターンが一致した場合のみ
                 is_timetable = True
                 category_scores["地域特性・街のプロフィール"] += 3
@@ -297,9 +367,9 @@ def analyze_text_category(text: str) -> dict:
             continue
         
         # 通常のキーワードチェック
-        for main_category, subcategories in keyword_mapping.items():
-            for subcategory, keywords in subcategories.items():
-                keyword_count = sum(1 for keyword in keywords if keyword in line)
+        for main_category, subcategories in KEYWORD_MAPPING.items():
+            for subcategory in subcategories:
+                keyword_count = group_counts.get((main_category, subcategory), 0)
                 if keyword_count > 0:
                     # サブカテゴリごとに重み付けを調整
                     weight = 2 if subcategory == "街の歴史・地域史" else 1
@@ -347,17 +417,32 @@ def process_text_file(file_content: str, metadata: dict) -> List[dict]:
     Returns:
         List[dict]: チャンクとメタデータのリスト
     """
-    # テキストをチャンクに分割
-    chunks = split_text_into_chunks(file_content)
+    chunk_size = st.session_state.get("chunk_size", CHUNK_SIZE)
+    chunk_overlap = st.session_state.get("chunk_overlap", CHUNK_OVERLAP)
+    return list(iter_text_file_chunks(file_content.split('\n'), metadata, chunk_size, chunk_overlap))
+
+def iter_text_file_chunks(lines: Iterable[str], metadata: dict, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> Iterator[dict]:
+    """
+    テキストの行を逐次チャンクに分割し、メタデータを付与する関数（process_text_file のストリーミング版）
+    
+    Args:
+        lines (Iterable[str]): テキストファイルの行
+        metadata (dict): メタデータ
+        chunk_size (int): チャンクの最大サイズ
+        chunk_overlap (int): 前のチャンクと重ねるサイズ
     
-    # 各チャンクにメタデータを付与
-    processed_chunks = []
-    for i, chunk in enumerate(chunks):
+    Returns:
+        Iterator[dict]: チャンクとメタデータのイテレータ
+    """
+    # 各チャンクにメタデータを付与（IDは「ファイルのID_連番」）
+    engine = ChunkingEngine(chunk_size, chunk_overlap)
+    for text_chunk in engine.iter_chunks(lines, id_prefix=metadata.get('id', 'chunk')):
+        chunk = text_chunk.text
+        
         # チャンクのカテゴリを分析
         category_analysis = analyze_text_category(chunk)
         
-        # チャンクのIDを生成
-        chunk_id = f"{metadata.get('id', 'chunk')}_{i}"
+        chunk_id = text_chunk.id
         
         # チャンクのメタデータを作成
         chunk_metadata = {
@@ -373,19 +458,216 @@ def process_text_file(file_content: str, metadata: dict) -> List[dict]:
             "upload_date": metadata.get("upload_date", datetime.now().isoformat())
         }
         
-        processed_chunks.append({
+        yield {
             "id": chunk_id,
             "text": chunk,
             "metadata": chunk_metadata
-        })
+        }
+
+def make_upload_job_id(uploaded_file, source_id: str, *params) -> str:
+    """アップロードされたファイルの内容と取り込みの設定からジョブIDを作成
+    
+    同じファイルを同じ設定で再アップロードした場合は同じジョブIDになり、
+    中断したアップロードは続きから再開される。
+    """
+    content_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+    return make_job_id(source_id, content_hash, *params)
+
+# 一括アップロードで処理するファイルの拡張子（ZIPファイル内のファイルも対象）
+BULK_UPLOAD_EXTENSIONS = ('txt', 'csv')
+
+def _get_extension(name: str) -> str:
+    return name.rsplit('.', 1)[-1].lower() if '.' in name else ''
+
+def _decode_zip_member_name(info: zipfile.ZipInfo) -> str:
+    """ZIP内のファイル名を取得（UTF-8フラグのないファイル名はCP932として解釈）"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode('cp437').decode('cp932')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+def expand_upload_files(uploaded_files) -> List[Tuple[str, bytes]]:
+    """
+    アップロードされたファイルを (ファイル名, 内容) のリストに変換する関数
+    
+    ZIPファイルは展開し、対象の拡張子のファイルのみを含める。順序はアップロード順
+    （ZIPファイル内は格納順）で、ZIP内のファイル名は「ZIPファイル名/パス」とする。
+    """
+    files = []
+    for uploaded_file in uploaded_files:
+        extension = _get_extension(uploaded_file.name)
+        if extension == 'zip':
+            with zipfile.ZipFile(io.BytesIO(uploaded_file.getvalue())) as archive:
+                for info in archive.infolist():
+                    name = _decode_zip_member_name(info)
+                    if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+                        continue
+                    if _get_extension(name) in BULK_UPLOAD_EXTENSIONS:
+                        files.append((f"{uploaded_file.name}/{name}", archive.read(info)))
+        elif extension in BULK_UPLOAD_EXTENSIONS:
+            files.append((uploaded_file.name, uploaded_file.getvalue()))
+    return files
+
+def get_bulk_source_id(name: str, city: str) -> str:
+    """一括アップロードのファイルのソースID（1ファイルずつアップロードした場合と同じ形式）"""
+    if _get_extension(name) == 'csv':
+        return f"csv:{name}"
+    return f"text:{city}:{name}"
+
+def chunk_file_worker(name: str, data: bytes, metadata: dict, chunk_size: int, chunk_overlap: int = CHUNK_OVERLAP) -> Tuple[List[dict], float, Optional[str], List[str]]:
+    """
+    1つのファイルをチャンクに分割し、カテゴリを付与する関数（プロセスプールで実行）
+    
+    子プロセスではセッション状態を参照できないため、チャンクサイズと重なりは引数で受け取る。
+    
+    Returns:
+        Tuple[List[dict], float, Optional[str], List[str]]: (チャンクのリスト, 処理時間（秒）, エラー内容, 警告)
+    """
+    start = time.perf_counter()
+    warnings = []
+    
+    def on_skipped_rows(count: int, row_numbers: List[int]) -> None:
+        warnings[:] = [format_skipped_rows(count, row_numbers)]
+    
+    try:
+        file = io.BytesIO(data)
+        if _get_extension(name) == 'csv':
+            chunks = list(process_csv_file(file, on_skipped_rows=on_skipped_rows))
+        else:
+            file_metadata = {**metadata, "id": name, "filename": name}
+            chunks = list(iter_text_file_chunks(iter_file_lines(file), file_metadata, chunk_size, chunk_overlap))
+        return chunks, time.perf_counter() - start, None, warnings
+    except Exception as e:
+        return [], time.perf_counter() - start, str(e), warnings
+
+def run_csv_upload(
+    pinecone_service: PineconeService,
+    source_file,
+    source_id: str,
+    job_id: str,
+    on_progress: Callable[[int, Optional[int]], None],
+    on_report: Callable[..., None]
+) -> int:
+    """
+    CSVファイルを解析しながらアップロードし、アップロードした件数を返す関数
     
-    return processed_chunks
+    数値に変換できない値のため処理しなかった行は on_report(warnings=[...]) で報告する。
+    """
+    chunks = process_csv_file(
+        source_file,
+        on_skipped_rows=lambda count, row_numbers: on_report(warnings=[format_skipped_rows(count, row_numbers)])
+    )
+    uploaded = pinecone_service.upload_chunks(
+        chunks,
+        progress_callback=on_progress,
+        source_id=source_id,
+        job_id=job_id
+    )
+    on_report(dead_letters=len(get_dead_letters(job_id)))
+    return uploaded
+
+def run_bulk_upload(
+    pinecone_service: PineconeService,
+    files: List[Tuple[str, bytes]],
+    metadata: dict,
+    chunk_size: int,
+    job_id: str,
+    on_progress: Callable[[int, Optional[int]], None],
+    on_report: Callable[..., None],
+    processes: int = BULK_UPLOAD_PROCESSES,
+    chunk_overlap: int = CHUNK_OVERLAP
+) -> int:
+    """
+    複数のファイルを一括でアップロードし、アップロードした件数を返す関数
+    
+    チャンク分割とカテゴリ分析はプロセスプールで並列に実行し、結果はファイルの順に
+    アップロードに渡す（各プロセスの完了順によらず、アップロードの順序は常に同じ）。
+    ファイルごとの処理速度は on_report(files=[...]) で報告する。
+    """
+    uploaded = 0
+    file_stats = []
+    warnings = []
+    dead_letter_job_ids = []
+    
+    # Streamlitのサーバーはスレッドを含むため、forkではなくspawnで子プロセスを起動する
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, min(processes, len(files))), mp_context=context) as executor:
+        futures = [executor.submit(chunk_file_worker, name, data, metadata, chunk_size, chunk_overlap) for name, data in files]
+        total_bytes = sum(len(data) for _, data in files) or 1
+        
+        def estimate_total_chunks() -> Optional[int]:
+            """分割が完了したファイルのチャンク数から、全体のチャンク数を推定"""
+            chunk_count = 0
+            chunked_bytes = 0
+            for (_, data), future in zip(files, futures):
+                if future.done():
+                    chunk_count += len(future.result()[0])
+                    chunked_bytes += len(data)
+            if not chunked_bytes:
+                return None
+            return round(chunk_count * total_bytes / chunked_bytes)
+        
+        for (name, data), future in zip(files, futures):
+            chunks, chunk_seconds, error, file_warnings = future.result()
+            warnings.extend(f"{name}: {warning}" for warning in file_warnings)
+            stats = {
+                "name": name,
+                "bytes": len(data),
+                "chunks": len(chunks),
+                "chunk_seconds": chunk_seconds,
+                "upload_seconds": 0.0,
+                "uploaded": 0,
+                "error": error,
+                "warnings": file_warnings
+            }
+            
+            if error is None:
+                file_job_id = make_job_id(job_id, name)
+                uploaded_before = uploaded
+                start = time.perf_counter()
+                try:
+                    # 同じファイルの再アップロード時は変更のあったチャンクのみアップロード
+                    uploaded += pinecone_service.upload_chunks(
+                        chunks,
+                        progress_callback=lambda done, _: on_progress(uploaded_before + done, estimate_total_chunks()),
+                        source_id=get_bulk_source_id(name, metadata.get("municipality", "")),
+                        job_id=file_job_id
+                    )
+                    dead_letter_job_ids.append(file_job_id)
+                except Exception as e:
+                    stats["error"] = str(e)
+                stats["uploaded"] = uploaded - uploaded_before
+                stats["upload_seconds"] = time.perf_counter() - start
+            
+            file_stats.append(stats)
+            on_progress(uploaded, estimate_total_chunks())
+            on_report(
+                files=list(file_stats),
+                warnings=list(warnings),
+                dead_letters=sum(len(get_dead_letters(file_job_id)) for file_job_id in dead_letter_job_ids),
+                dead_letter_job_ids=list(dead_letter_job_ids)
+            )
+    
+    return uploaded
 
 def render_file_upload(pinecone_service: PineconeService):
     """ファイルアップロード機能のUIを表示"""
     st.title("ファイルアップロード")
     st.write("テキストファイルをアップロードして、Pineconeデータベースに保存します。")
     
+    upload_mode = st.radio(
+        "アップロード方法",
+        ["1ファイルずつ", "一括アップロード"],
+        horizontal=True,
+        help="一括アップロードでは複数のファイルやZIPファイルをまとめてアップロードできます"
+    )
+    if upload_mode == "一括アップロード":
+        render_bulk_upload(pinecone_service)
+        render_ingestion_jobs()
+        return
+    
     uploaded_file = st.file_uploader("テキストファイルをアップロード", type=['txt', 'csv'])
     
     if uploaded_file is not None:
@@ -394,15 +676,35 @@ def render_file_upload(pinecone_service: PineconeService):
         
         if file_extension == 'csv':
             # CSVファイルの場合はメタデータ入力フォームを表示しない
+            show_debug = st.checkbox(
+                "デバッグ情報を表示",
+                value=False,
+                help=f"先頭{CSV_DEBUG_SAMPLE_ROWS}行の内容とメタデータを表示します"
+            )
             if st.button("データベースに保存"):
                 try:
-                    with st.spinner("ファイルを処理中..."):
-                        chunks = process_csv_file(uploaded_file)
-                        st.write(f"ファイルを{len(chunks)}個のチャンクに分割しました")
-                        
-                        with st.spinner("Pineconeにアップロード中..."):
-                            pinecone_service.upload_chunks(chunks)
-                            st.success("アップロードが完了しました！")
+                    if show_debug:
+                        # デバッグ情報は先頭部分だけを読み込んで表示
+                        for _ in itertools.islice(process_csv_file(uploaded_file, debug=True), CSV_DEBUG_SAMPLE_ROWS):
+                            pass
+                    
+                    source_id = f"csv:{uploaded_file.name}"
+                    job_id = make_upload_job_id(uploaded_file, source_id)
+                    # ファイルの解析とアップロードはバックグラウンドで実行
+                    # （同じファイルの再アップロード時は変更のあったチャンクのみアップロードし、
+                    # 中断した場合は完了したバッチの続きから再開）
+                    # （処理しなかった行はワーカーのスレッドから画面に表示できないため、ジョブの状態で報告）
+                    source_file = io.BytesIO(uploaded_file.getvalue())
+                    get_ingestion_worker().submit_task(
+                        job_id,
+                        uploaded_file.name,
+                        lambda on_progress, on_report: run_csv_upload(
+                            pinecone_service, source_file, source_id, job_id, on_progress, on_report
+                        ),
+                        source_file=source_file
+                    )
+                    track_ingestion_job(job_id)
+                    st.success("アップロードを開始しました。ページを移動しても処理は続行されます。")
                 except ValueError as e:
                     st.error(str(e))
                 except Exception as e:
@@ -434,31 +736,112 @@ def render_file_upload(pinecone_service: PineconeService):
                     if not all([city, source]):
                         st.error("市区町村とソース元は必須項目です。")
                         return
-                        
-                    with st.spinner("ファイルを処理中..."):
-                        file_content = read_file_content(uploaded_file)
-                        # ファイルの一意のIDを生成
-                        file_id = f"{uploaded_file.name}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-                        chunks = process_text_file(file_content, {
-                            "id": file_id,
-                            "municipality": city,
-                            "source": source,
-                            "creation_date": upload_date.isoformat(),
-                            "upload_date": upload_date.isoformat(),
-                            "filename": uploaded_file.name
-                        })
-                        
-                        st.write(f"ファイルを{len(chunks)}個のチャンクに分割しました")
-                        
-                        # デバッグ情報の表示
-                        st.write("メタデータの例:")
-                        if chunks:
-                            st.json(chunks[0]["metadata"])
-                        
-                        with st.spinner("Pineconeにアップロード中..."):
-                            pinecone_service.upload_chunks(chunks)
-                            st.success("アップロードが完了しました！")
+                    
+                    # ファイルのID（チャンクIDはアップロード時に内容から決定的に作成）
+                    file_id = uploaded_file.name
+                    chunk_size = st.session_state.get("chunk_size", CHUNK_SIZE)
+                    chunk_overlap = st.session_state.get("chunk_overlap", CHUNK_OVERLAP)
+                    source_id = f"text:{city}:{uploaded_file.name}"
+                    job_id = make_upload_job_id(uploaded_file, source_id, source, chunk_size, chunk_overlap, CHUNK_SIZE_UNIT)
+                    metadata = {
+                        "id": file_id,
+                        "municipality": city,
+                        "source": source,
+                        "creation_date": upload_date.isoformat(),
+                        "upload_date": upload_date.isoformat(),
+                        "filename": uploaded_file.name
+                    }
+                    
+                    # デバッグ情報の表示
+                    st.write("メタデータの例:")
+                    first_chunk = next(iter_text_file_chunks(iter_file_lines(uploaded_file), metadata, chunk_size, chunk_overlap), None)
+                    if first_chunk:
+                        st.json(first_chunk["metadata"])
+                    
+                    # ファイルは少しずつ読み込み、チャンクを生成しながらバックグラウンドでアップロード
+                    # （同じファイルの再アップロード時は変更のあったチャンクのみアップロードし、
+                    # 中断した場合は完了したバッチの続きから再開）
+                    source_file = io.BytesIO(uploaded_file.getvalue())
+                    get_ingestion_worker().submit(
+                        job_id,
+                        uploaded_file.name,
+                        pinecone_service,
+                        lambda: iter_text_file_chunks(iter_file_lines(source_file), metadata, chunk_size, chunk_overlap),
+                        source_id=source_id,
+                        source_file=source_file
+                    )
+                    track_ingestion_job(job_id)
+                    st.success("アップロードを開始しました。ページを移動しても処理は続行されます。")
                 except ValueError as e:
                     st.error(str(e))
                 except Exception as e:
-                    st.error(f"エラーが発生しました: {str(e)}") 
\ No newline at end of file
+                    st.error(f"エラーが発生しました: {str(e)}")
+    
+    # バックグラウンドで実行中・完了したアップロードの状態
+    render_ingestion_jobs()
+
+def render_bulk_upload(pinecone_service: PineconeService):
+    """複数ファイル・ZIPファイルの一括アップロードのUIを表示"""
+    uploaded_files = st.file_uploader(
+        "ファイルをアップロード（複数選択・ZIPファイル可）",
+        type=['txt', 'csv', 'zip'],
+        accept_multiple_files=True
+    )
+    if not uploaded_files:
+        return
+    
+    # テキストファイルのメタデータ（CSVファイルには使用しない）
+    st.subheader("メタデータ入力（テキストファイル用）")
+    city = st.selectbox(
+        "市区町村",
+        METADATA_CATEGORIES["市区町村"],
+        index=None,
+        placeholder="市区町村を選択してください"
+    )
+    source = st.text_input(
+        "ソース元",
+        placeholder="ソース元を入力してください"
+    )
+    upload_date = datetime.now()
+    
+    if st.button("データベースに保存"):
+        try:
+            files = expand_upload_files(uploaded_files)
+            if not files:
+                st.error("アップロードできるファイル（.txt、.csv）が見つかりませんでした。")
+                return
+            if any(_get_extension(name) == 'txt' for name, _ in files) and not all([city, source]):
+                st.error("テキストファイルを含む場合は、市区町村とソース元は必須項目です。")
+                return
+            
+            chunk_size = st.session_state.get("chunk_size", CHUNK_SIZE)
+            chunk_overlap = st.session_state.get("chunk_overlap", CHUNK_OVERLAP)
+            metadata = {
+                "municipality": city or "",
+                "source": source or "",
+                "creation_date": upload_date.isoformat(),
+                "upload_date": upload_date.isoformat()
+            }
+            job_id = make_job_id(
+                "bulk",
+                city,
+                source,
+                chunk_size,
+                chunk_overlap,
+                CHUNK_SIZE_UNIT,
+                *(f"{name}:{hashlib.sha256(data).hexdigest()}" for name, data in files)
+            )
+            get_ingestion_worker().submit_task(
+                job_id,
+                f"一括アップロード（{len(files)}ファイル）",
+                lambda on_progress, on_report: run_bulk_upload(
+                    pinecone_service, files, metadata, chunk_size, job_id, on_progress, on_report,
+                    chunk_overlap=chunk_overlap
+                )
+            )
+            track_ingestion_job(job_id)
+            st.success(f"{len(files)}個のファイルのアップロードを開始しました。ページを移動しても処理は続行されます。")
+        except zipfile.BadZipFile:
+            st.error("ZIPファイルを展開できませんでした。")
+        except Exception as e:
+            st.error(f"エラーが発生しました: {str(e)}")
@@ -0,0 +1,111 @@
+import streamlit as st
+import pandas as pd
+from typing import List, Optional
+from src.services.ingestion_worker import get_ingestion_worker, JOB_QUEUED, JOB_RUNNING, JOB_DONE, JOB_FAILED
+from src.services.ingestion_jobs import get_dead_letters
+from src.config.settings import INGESTION_STATUS_POLL_SECONDS
+
+JOB_STATUS_LABELS = {
+    JOB_QUEUED: "待機中",
+    JOB_RUNNING: "実行中",
+    JOB_DONE: "完了",
+    JOB_FAILED: "失敗"
+}
+
+def format_seconds(seconds: Optional[float]) -> str:
+    """秒数を「X分Y秒」の形式に変換"""
+    if seconds is None:
+        return "不明"
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}分{seconds}秒" if minutes else f"{seconds}秒"
+
+def render_file_throughput(files: List[dict]) -> None:
+    """ファイルごとのチャンク分割・アップロードの処理速度を表示"""
+    rows = []
+    for file in files:
+        rows.append({
+            "ファイル": file["name"],
+            "サイズ(KB)": round(file["bytes"] / 1024, 1),
+            "チャンク数": file["chunks"],
+            "分割時間(秒)": round(file["chunk_seconds"], 2),
+            "分割速度(MB/秒)": round(file["bytes"] / 1024 / 1024 / file["chunk_seconds"], 2) if file["chunk_seconds"] else None,
+            "アップロード件数": file["uploaded"],
+            "アップロード速度(件/秒)": round(file["uploaded"] / file["upload_seconds"], 1) if file["upload_seconds"] else None,
+            "エラー": file["error"] or "",
+            "警告": " ".join(file.get("warnings") or [])
+        })
+    with st.expander("ファイルごとの処理状況"):
+        st.dataframe(pd.DataFrame(rows))
+
+def track_ingestion_job(job_id: str) -> None:
+    """セッションで登録した取り込みジョブとして記録（状態表示の対象になる）"""
+    job_ids = st.session_state.setdefault("ingestion_job_ids", [])
+    if job_id in job_ids:
+        job_ids.remove(job_id)
+    job_ids.insert(0, job_id)
+
+def get_jobs(job_ids: List[str]) -> List[dict]:
+    """ジョブIDの一覧から、状態を取得できるジョブを取得"""
+    worker = get_ingestion_worker()
+    return [job for job in (worker.get_job(job_id) for job_id in job_ids) if job is not None]
+
+def is_active(job: dict) -> bool:
+    """待機中・実行中のジョブかどうか"""
+    return job["status"] in (JOB_QUEUED, JOB_RUNNING)
+
+def render_job(job: dict) -> None:
+    """1件の取り込みジョブの状態を表示"""
+    status = JOB_STATUS_LABELS.get(job["status"], job["status"])
+    st.write(f"**{job['label']}**: {status}")
+
+    if job["status"] == JOB_RUNNING:
+        progress = job["progress"] or 0.0
+        speed = f"{job['chunks_per_sec']:.1f}件/秒" if job["chunks_per_sec"] is not None else "不明"
+        st.progress(
+            progress,
+            text=f"{job['done']}件完了（{speed}、残り {format_seconds(job['eta_seconds'])}）"
+        )
+    elif job["status"] == JOB_DONE:
+        st.write(f"{job['uploaded']}個のチャンクをアップロードしました（変更のないチャンクはスキップしました）")
+        if job["dead_letters"]:
+            st.warning(f"{job['dead_letters']}個のチャンクはアップロードできませんでした。再度保存すると再試行します。")
+            with st.expander("アップロードできなかったチャンク"):
+                for dead_letter_job_id in job.get("dead_letter_job_ids") or [job["job_id"]]:
+                    for dead_letter in get_dead_letters(dead_letter_job_id):
+                        st.write(f"{dead_letter['id']}: {dead_letter['error']}")
+    elif job["status"] == JOB_FAILED:
+        st.error(f"エラーが発生しました: {job['error']}")
+    
+    # 処理しなかった行など、ワーカーで発生した警告
+    for warning in job.get("warnings") or []:
+        st.warning(warning)
+    
+    # 一括アップロードの場合はファイルごとの処理速度を表示
+    if job["files"]:
+        render_file_throughput(job["files"])
+
+@st.fragment(run_every=INGESTION_STATUS_POLL_SECONDS)
+def render_active_ingestion_jobs(job_ids: List[str]) -> None:
+    """取り込みジョブの状態を一定間隔で更新して表示（この部分のみを再実行する）"""
+    jobs = get_jobs(job_ids)
+    for job in jobs:
+        render_job(job)
+    
+    # すべてのジョブが終了したら、アプリ全体を1回だけ再実行して定期的な更新を止める
+    if not any(is_active(job) for job in jobs):
+        st.rerun()
+
+def render_ingestion_jobs(job_ids: List[str] = None) -> None:
+    """取り込みジョブの状態を表示（待機中・実行中のジョブがあれば状態の表示部分のみを定期的に更新）"""
+    if job_ids is None:
+        job_ids = st.session_state.get("ingestion_job_ids", [])
+    jobs = get_jobs(job_ids)
+    if not jobs:
+        return
+
+    st.subheader("アップロードの状態")
+    if any(is_active(job) for job in jobs) and st.checkbox("状態を自動更新", value=True, key="ingestion_auto_refresh"):
+        render_active_ingestion_jobs(job_ids)
+    else:
+        for job in jobs:
+            render_job(job)
@@ -1,9 +1,11 @@
 import streamlit as st
 from src.services.pinecone_service import PineconeService
+from src.services.ingestion_jobs import make_job_id
+from src.services.ingestion_worker import get_ingestion_worker
+from src.components.ingestion_status import render_ingestion_jobs, track_ingestion_job
 import pandas as pd
 import json
 import traceback
-from datetime import datetime
 
 # 都道府県と市区町村のデータ
 PREFECTURES = [
@@ -99,17 +101,30 @@ def render_property_upload(pinecone_service: PineconeService):
                 
                 # Pineconeへのアップロード
                 chunks = [{
-                    "id": f"property_{datetime.now().strftime('%Y%m%d%H%M%S')}",
+                    "id": "property",
                     "text": json.dumps(property_data, ensure_ascii=False),
                     "metadata": property_data
                 }]
                 
-                # property namespaceを使用してアップロード
-                pinecone_service.upload_chunks(chunks, namespace="property")
+                # property namespaceを使用してバックグラウンドでアップロード
+                # （同じ物件を再登録した場合は以前の情報を置き換える）
+                source_id = f"property:{prefecture}:{city}:{property_name}"
+                job_id = get_ingestion_worker().submit(
+                    make_job_id(source_id, chunks[0]["text"]),
+                    property_name,
+                    pinecone_service,
+                    lambda: chunks,
+                    namespace="property",
+                    source_id=source_id
+                )
+                track_ingestion_job(job_id)
                 
-                st.success("✅ 物件情報をアップロードしました")
+                st.success("✅ 物件情報のアップロードを開始しました")
                 
             except Exception as e:
                 st.error(f"❌ アップロードに失敗しました: {str(e)}")
                 st.error(f"🔍 エラーの詳細: {type(e).__name__}")
-                st.error(f"📜 スタックトレース:\n{traceback.format_exc()}") 
\ No newline at end of file
+                st.error(f"📜 スタックトレース:\n{traceback.format_exc()}")
+    
+    # バックグラウンドで実行中・完了したアップロードの状態
+    render_ingestion_jobs()
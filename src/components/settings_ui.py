@@ -1,7 +1,11 @@
 import streamlit as st
 from src.services.pinecone_service import PineconeService
+from src.services.embedding_cache import get_embedding_cache
+from src.services.query_cache import get_query_cache
+from src.utils.resource_cache import get_resource_cache, invalidate_resource
 from src.config.settings import (
     CHUNK_SIZE,
+    CHUNK_OVERLAP,
     BATCH_SIZE,
     EMBEDDING_MODEL,
     DEFAULT_TOP_K,
@@ -12,6 +16,10 @@ from src.config.settings import (
 import json
 import pandas as pd
 import traceback
+from collections import Counter
+
+# データベース画面で詳細表示する最大件数
+PREVIEW_ROW_LIMIT = 1000
 
 def render_settings(pinecone_service: PineconeService):
     """設定画面のUIを表示"""
@@ -39,6 +47,13 @@ def render_settings(pinecone_service: PineconeService):
                 value=st.session_state.get("chunk_size", CHUNK_SIZE),
                 help="テキストを分割する際の1チャンクあたりの文字数。大きすぎると精度が下がり、小さすぎると処理が遅くなります。"
             )
+            chunk_overlap = st.number_input(
+                "🔗 チャンクの重なり（文字数）",
+                min_value=0,
+                max_value=int(chunk_size) - 1,
+                value=min(st.session_state.get("chunk_overlap", CHUNK_OVERLAP), int(chunk_size) - 1),
+                help="前のチャンクの末尾を次のチャンクの先頭にも含める文字数。文脈が途切れにくくなりますが、チャンク数が増えます。"
+            )
         
         with col2:
             batch_size = st.number_input(
@@ -53,6 +68,7 @@ def render_settings(pinecone_service: PineconeService):
         st.markdown("### 現在の設定値")
         st.json({
             "チャンクサイズ": chunk_size,
+            "チャンクの重なり": chunk_overlap,
             "バッチサイズ": batch_size
         })
 
@@ -87,6 +103,65 @@ def render_settings(pinecone_service: PineconeService):
             "検索結果数": top_k,
             "類似度しきい値": similarity_threshold
         })
+        
+        st.markdown("---")
+        st.markdown("### キャッシュの状態")
+        st.markdown("繰り返しの質問に対する検索結果と埋め込みベクトルのキャッシュ状況です。")
+        
+        query_cache = get_query_cache()
+        embedding_cache = get_embedding_cache()
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.markdown("#### 🔁 検索結果キャッシュ")
+            if query_cache:
+                query_stats = query_cache.get_stats()
+                st.metric("ヒット率", f"{query_stats['hit_rate']:.1%}")
+                st.json({
+                    "ヒット数": query_stats["hits"],
+                    "ミス数": query_stats["misses"],
+                    "保存件数": f"{query_stats['entries']} / {query_stats['max_entries']}",
+                    "有効期間（秒）": query_stats["ttl_seconds"],
+                    "インデックス世代": query_stats["index_generation"]
+                })
+            else:
+                st.info("検索結果キャッシュは無効です。")
+        
+        with col2:
+            st.markdown("#### 🧮 埋め込みキャッシュ")
+            if embedding_cache:
+                embedding_stats = embedding_cache.get_stats()
+                st.metric("ヒット率", f"{embedding_stats['hit_rate']:.1%}")
+                st.json({
+                    "ヒット数": embedding_stats["hits"],
+                    "ミス数": embedding_stats["misses"],
+                    "保存件数": f"{embedding_stats['entries']} / {embedding_stats['max_entries']}"
+                })
+            else:
+                st.info("埋め込みキャッシュは無効です。")
+        
+        if query_cache and st.button("🗑️ 検索結果キャッシュをクリア"):
+            query_cache.clear()
+            st.success("✅ 検索結果キャッシュをクリアしました")
+        
+        st.markdown("#### 🧩 共有リソース")
+        st.markdown("全セッションで共有しているサービス・APIクライアントです。設定を変更した場合は再作成してください。")
+        st.write(", ".join(str(key) for key in get_resource_cache().keys()) or "なし")
+        if st.button("🔄 共有リソースを再作成"):
+            invalidate_resource()
+            st.success("✅ 共有リソースを破棄しました（次回の画面更新時に再作成されます）")
+        
+        st.markdown("#### 🔤 キーワード検索の索引")
+        if pinecone_service.lexical_index:
+            st.markdown("施設名・駅名・数値などの完全一致を補うための索引です。アップロード時に自動で更新されます。")
+            for namespace, label in (("", "ドキュメント"), ("property", "物件情報")):
+                st.write(f"{label}: {pinecone_service.lexical_index.count(pinecone_service.index_key, namespace)}件")
+            if st.button("🔄 キーワード検索の索引を再構築"):
+                with st.spinner("索引を再構築中..."):
+                    count = sum(pinecone_service.rebuild_lexical_index(namespace) for namespace in ("", "property"))
+                st.success(f"✅ {count}件のチャンクを索引に登録しました")
+        else:
+            st.info("キーワード検索は無効です。")
 
     # プロンプト設定タブ
     with tab3:
@@ -210,27 +285,33 @@ def render_settings(pinecone_service: PineconeService):
                 st.markdown("#### 📊 データベースの概要")
                 st.json(stats)
                 
-                # データを取得
-                data = pinecone_service.get_index_data()
+                # データをページ単位で取得し、ファイルごとに集計（詳細表示は先頭のみ保持）
+                file_summaries = {}
+                preview_rows = []
+                for item in pinecone_service.iter_index_data():
+                    summary = file_summaries.get(item['filename'])
+                    if summary is None:
+                        summary = {
+                            'filename': item['filename'],
+                            'main_category': item['main_category'],
+                            'sub_category': item['sub_category'],
+                            'city': item['city'],
+                            'created_date': item['created_date'],
+                            'upload_date': item['upload_date'],
+                            'source': item['source'],
+                            'chunk_count': 0
+                        }
+                        file_summaries[item['filename']] = summary
+                    summary['chunk_count'] += 1
+                    if len(preview_rows) < PREVIEW_ROW_LIMIT:
+                        preview_rows.append(item)
                 
-                if data:
+                if file_summaries:
                     st.markdown("#### 📋 データベースの内容")
-                    # データフレームを作成
-                    df = pd.DataFrame(data)
                     
                     # ファイルごとの集計情報を表示
                     st.markdown("##### 📊 ファイルごとの集計")
-                    df_grouped = df.groupby('filename').agg({
-                        'main_category': 'first',
-                        'sub_category': 'first',
-                        'city': 'first',
-                        'created_date': 'first',
-                        'upload_date': 'first',
-                        'source': 'first'
-                    }).reset_index()
-                    
-                    # チャンク数を計算
-                    df_grouped['chunk_count'] = df.groupby('filename').size().values
+                    df_grouped = pd.DataFrame(list(file_summaries.values())).sort_values('filename')
                     
                     # 列名の日本語対応
                     column_names = {
@@ -254,8 +335,13 @@ def render_settings(pinecone_service: PineconeService):
                         use_container_width=True
                     )
                     
+                    total_chunks = sum(summary['chunk_count'] for summary in file_summaries.values())
+                    df = pd.DataFrame(preview_rows)
+                    
                     # チャンクごとの詳細情報を表示
                     st.markdown("##### 📝 チャンクごとの詳細")
+                    if total_chunks > len(preview_rows):
+                        st.caption(f"先頭{len(preview_rows)}件を表示しています（全{total_chunks}件）")
                     
                     # メタデータからテキストを取得（修正版）
                     df['text_preview'] = df['text'].apply(lambda x: str(x)[:100] + '...' if len(str(x)) > 100 else str(x))
@@ -311,17 +397,22 @@ def render_settings(pinecone_service: PineconeService):
                 namespaces = ["default", "property"]
                 for namespace in namespaces:
                     try:
-                        vectors = pinecone_service.list_vectors(namespace=namespace)
-                        if vectors:
+                        # ベクトルをページ単位で取得し、件数を集計（表示用のメタデータは先頭のみ保持）
+                        vector_count = 0
+                        city_counter = Counter()
+                        metadata_list = []
+                        for vector in pinecone_service.iter_vectors(namespace=namespace):
+                            metadata = vector['metadata']
+                            metadata['namespace'] = namespace
+                            vector_count += 1
+                            city_counter[metadata.get('city', '')] += 1
+                            if len(metadata_list) < PREVIEW_ROW_LIMIT:
+                                metadata_list.append(metadata)
+                        
+                        if vector_count:
                             st.markdown(f"#### 📋 {namespace} namespaceの内容")
-                            
-                            # メタデータをDataFrameに変換
-                            metadata_list = []
-                            for vector in vectors:
-                                if 'metadata' in vector:
-                                    metadata = vector['metadata']
-                                    metadata['namespace'] = namespace
-                                    metadata_list.append(metadata)
+                            if vector_count > len(metadata_list):
+                                st.caption(f"先頭{len(metadata_list)}件を表示しています（全{vector_count}件）")
                             
                             if metadata_list:
                                 df = pd.DataFrame(metadata_list)
@@ -339,11 +430,10 @@ def render_settings(pinecone_service: PineconeService):
                                         'longitude'
                                     ]
                                     # 物件情報の件数を表示
-                                    st.markdown(f"##### 📊 物件情報の件数: {len(metadata_list)}件")
+                                    st.markdown(f"##### 📊 物件情報の件数: {vector_count}件")
                                     
                                     # 市区町村ごとの件数を表示
-                                    city_counts = df['city'].value_counts().reset_index()
-                                    city_counts.columns = ['市区町村', '件数']
+                                    city_counts = pd.DataFrame(city_counter.most_common(), columns=['市区町村', '件数'])
                                     st.markdown("##### 📍 市区町村別物件数")
                                     st.dataframe(
                                         city_counts,
@@ -413,6 +503,7 @@ def render_settings(pinecone_service: PineconeService):
     if st.button("💾 すべての設定を保存", type="primary"):
         st.session_state.update({
             "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
             "batch_size": batch_size,
             "top_k": top_k,
             "similarity_threshold": similarity_threshold
@@ -15,20 +15,112 @@ load_dotenv()
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY") or st.secrets.get("pinecone_key")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY") or st.secrets.get("openai_api_key")
 
+# Vector Store Settings
+# 使用するベクトルストア（"pinecone": Pinecone / "local": ローカルのベクトルストア）
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")
+LOCAL_VECTOR_STORE_DIR = os.getenv("LOCAL_VECTOR_STORE_DIR", os.path.join(".cache", "vector_store"))  # ローカルベクトルストアの保存先
+# コンパクトなメタデータ（絞り込みに使う項目のみをインデックスに保存し、本文などはローカルの文書ストアに保存）
+COMPACT_METADATA = os.getenv("COMPACT_METADATA", "false").lower() == "true"
+COMPACT_METADATA_FIELDS = ["filename", "main_category", "sub_category", "city", "created_date", "upload_date", "upload_ts", "source"]  # インデックスに保存する項目
+DOCUMENT_STORE_PATH = os.getenv("DOCUMENT_STORE_PATH", os.path.join(".cache", "document_store.sqlite3"))  # 文書ストアの保存先
+
 # Pinecone Settings
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME") or st.secrets.get("index_name")
 PINECONE_ASSISTANT_NAME = os.getenv("PINECONE_ASSISTANT_NAME") or st.secrets.get("assistant_name")
 
 # Text Processing Settings
 CHUNK_SIZE = 1000  # デフォルトのチャンクサイズ（文字数）
+CHUNK_OVERLAP = 0  # デフォルトのチャンクの重なり（前のチャンクの末尾を次のチャンクに含めるサイズ）
+# チャンクサイズの単位（"char": 文字数 / "token": トークン数。トークン数はtiktokenで数え、利用できない場合は推定）
+CHUNK_SIZE_UNIT = os.getenv("CHUNK_SIZE_UNIT", "char")
+TOKENIZER_ENCODING = "cl100k_base"  # トークン数を数える際のtiktokenのエンコーディング
 BATCH_SIZE = 100  # Pineconeへのアップロード時のバッチサイズ
+# 文分割の方法（"regex": 句読点による高速な分割 / "janome": 形態素解析による分割）
+SENTENCE_SPLITTER = os.getenv("SENTENCE_SPLITTER", "regex")
+
+# Ingestion Settings
+EMBED_CONCURRENCY = 2  # 同時に実行する埋め込みリクエスト数
+UPSERT_CONCURRENCY = 2  # 同時に実行するアップロード（upsert）数
+CSV_READ_CHUNK_ROWS = 10000  # CSVファイルを一度に読み込む行数
+CSV_DEBUG_SAMPLE_ROWS = 5  # デバッグ表示で内容を表示するCSVの行数
+ENCODING_SAMPLE_BYTES = 1024 * 1024  # エンコーディングの判定に使うファイル先頭のバイト数
+FILE_READ_BLOCK_BYTES = 1024 * 1024  # ファイルを一度に読み込むバイト数
+INGESTION_MANIFEST_PATH = os.getenv("INGESTION_MANIFEST_PATH", os.path.join(".cache", "ingestion_manifest.sqlite3"))  # 取り込み済みチャンクの記録の保存先
+INGESTION_JOB_DIR = os.getenv("INGESTION_JOB_DIR", os.path.join(".cache", "ingestion_jobs"))  # 取り込みジョブのチェックポイントの保存先
+INGESTION_RETRY_PASSES = 2  # 失敗したチャンクを再試行する回数（超えたものはデッドレターとして記録）
+INGESTION_WORKER_THREADS = 1  # バックグラウンドで同時に実行する取り込みジョブ数
+INGESTION_JOB_HISTORY = 50  # 状態を保持する取り込みジョブの最大件数（超過分は完了したものから削除）
+INGESTION_STATUS_POLL_SECONDS = 2  # 取り込みジョブの状態を画面で更新する間隔（秒）
+BULK_UPLOAD_PROCESSES = int(os.getenv("BULK_UPLOAD_PROCESSES", str(os.cpu_count() or 1)))  # 一括アップロードでチャンク分割を並列に実行するプロセス数
+
+# Model Provider Settings
+# 埋め込み・チャットモデルのプロバイダ（"openai": OpenAI / "fake": ベンチマーク用のローカルスタンドイン）
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+FAKE_LLM_LATENCY_SECONDS = float(os.getenv("FAKE_LLM_LATENCY_SECONDS", "0"))  # スタンドインのチャット応答の疑似遅延（秒）
+FAKE_EMBEDDING_LATENCY_SECONDS = float(os.getenv("FAKE_EMBEDDING_LATENCY_SECONDS", "0"))  # スタンドインの埋め込み1リクエストあたりの疑似遅延（秒）
 
 # OpenAI Settings
 EMBEDDING_MODEL = "text-embedding-ada-002"  # 使用する埋め込みモデル
+EMBEDDING_DIMENSION = 1536  # 埋め込みベクトルの次元数（OpenAIの埋め込みモデルの次元数）
+EMBEDDING_MAX_INPUTS_PER_REQUEST = 2048  # 埋め込みAPI 1リクエストあたりの最大入力数
+EMBEDDING_MAX_TOKENS_PER_REQUEST = 300000  # 埋め込みAPI 1リクエストあたりの最大トークン数
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"  # 埋め込みベクトルのディスクキャッシュを使用するか
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(".cache", "embeddings.sqlite3"))  # 埋め込みキャッシュの保存先
+EMBEDDING_CACHE_MAX_ENTRIES = 50000  # 埋め込みキャッシュの最大件数（超過分は古い順に削除）
+
+# Chat Settings
+# 質問タイプの分類方法
+#   "fused": 回答生成と同じリクエストで分類する（追加のAPI呼び出しなし）
+#   "local": キーワードによるローカル分類器を使用する
+#   "llm": 回答生成の前に分類専用のAPI呼び出しを行う
+QUESTION_CLASSIFICATION_MODE = "fused"
+
+# Sidecar Settings（地図・ハザード情報のサーバー）
+SIDECAR_ENABLED = os.getenv("SIDECAR_ENABLED", "true").lower() == "true"  # サイドカーを起動するか
+SIDECAR_SCRIPT = "reacttest.py"  # サイドカーとして起動するスクリプト（プロジェクトのルートからの相対パス）
+SIDECAR_HOST = "127.0.0.1"  # ヘルスチェックの接続先
+SIDECAR_PORT = int(os.getenv("SIDECAR_PORT", "5000"))  # サイドカーのポート番号
+SIDECAR_STARTUP_GRACE_SECONDS = 10  # 起動後、ヘルスチェックを開始するまでの時間（秒）
+SIDECAR_HEALTH_CHECK_INTERVAL_SECONDS = 10  # ヘルスチェックの間隔（秒）
+SIDECAR_HEALTH_CHECK_FAILURES = 3  # 再起動するまでに許容するヘルスチェックの連続失敗回数
+SIDECAR_MAX_BACKOFF_SECONDS = 60  # 再起動までの待機時間の上限（秒）
+SIDECAR_STABLE_SECONDS = 60  # この時間以上動作してから終了した場合は待機時間をリセット（秒）
 
 # Search Settings
 DEFAULT_TOP_K = 10  # デフォルトの検索結果数
 SIMILARITY_THRESHOLD = 0.7  # 類似度のしきい値（0-1の範囲）
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"  # 検索結果キャッシュを使用するか
+QUERY_CACHE_MAX_ENTRIES = 1000  # 検索結果キャッシュの最大件数
+QUERY_CACHE_TTL_SECONDS = 600  # 検索結果キャッシュの有効期間（秒）
+INDEX_STATS_CACHE_TTL_SECONDS = 60  # 画面表示用のインデックス統計情報をキャッシュする期間（秒）
+# 選択中の物件と質問タイプからメタデータの絞り込み条件を作成し、インデックスの検索に含めるか
+METADATA_FILTER_ENABLED = os.getenv("METADATA_FILTER_ENABLED", "true").lower() == "true"
+# 質問タイプごとに検索対象とするメインカテゴリ（含まれない質問タイプはカテゴリで絞り込まない）
+QUESTION_TYPE_MAIN_CATEGORIES = {
+    "property": "物件概要",
+    "comparison": "物件概要",
+    "price_analysis": "物件概要",
+    "investment": "物件概要",
+    "area": "地域特性・街のプロフィール"
+}
+
+# Lexical Search Settings（キーワード検索。ベクトル検索と並行して実行し、RRFで統合）
+LEXICAL_SEARCH_ENABLED = os.getenv("LEXICAL_SEARCH_ENABLED", "true").lower() == "true"  # キーワード検索を使用するか
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(".cache", "lexical_index.sqlite3"))  # キーワード検索の索引の保存先
+LEXICAL_NGRAM_SIZE = 2  # 日本語のテキストを分割するN-gramの文字数（英数字は単語単位）
+LEXICAL_MAX_QUERY_TERMS = 32  # 長いクエリは文書頻度の低い順にこの数の索引語のみで検索する
+LEXICAL_MIN_TERM_COVERAGE = 0.5  # クエリの索引語のうち、この割合以上を含むチャンクのみをキーワード検索の結果とする
+LEXICAL_MAX_DF_RATIO = 0.5  # この割合を超えるチャンクに出現する索引語は、助詞などと同様に検索に使わない
+LEXICAL_DF_FILTER_MIN_DOCUMENTS = 20  # 出現割合による索引語の除外は、チャンク数がこの数以上の場合のみ行う
+BM25_K1 = 1.2  # BM25の単語頻度の飽和パラメータ
+BM25_B = 0.75  # BM25の文書長による正規化の強さ
+RRF_K = 60  # Reciprocal Rank Fusionの順位の平滑化定数
+VECTOR_SEARCH_TIMEOUT_SECONDS = float(os.getenv("VECTOR_SEARCH_TIMEOUT_SECONDS", "3"))  # この時間内にベクトル検索が終わらない場合はキーワード検索の結果のみを返す（秒）
+HYBRID_SEARCH_WORKERS = 8  # ベクトル検索・キーワード検索を実行するスレッド数
+
+# Listing Settings
+LIST_PAGE_SIZE = 100  # ID一覧を取得する際の1ページあたりの件数（Pineconeの上限は100）
+FETCH_BATCH_SIZE = 100  # メタデータを取得する際の1リクエストあたりのID数
 
 # Metadata Settings
 DEFAULT_CREATION_DATE = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # メタデータの作成日が空の場合のデフォルト値
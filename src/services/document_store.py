@@ -0,0 +1,123 @@
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+from ..config.settings import (
+    VECTOR_STORE_BACKEND,
+    LOCAL_VECTOR_STORE_DIR,
+    PINECONE_INDEX_NAME,
+    COMPACT_METADATA_FIELDS,
+    DOCUMENT_STORE_PATH
+)
+
+def get_index_key() -> str:
+    """使用中のインデックスを区別するキー（マニフェスト・文書ストアで共通）"""
+    if VECTOR_STORE_BACKEND == "local":
+        return f"local:{os.path.abspath(LOCAL_VECTOR_STORE_DIR)}"
+    return f"pinecone:{PINECONE_INDEX_NAME}"
+
+def split_metadata(metadata: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """メタデータをインデックスに保存する項目と文書ストアに保存する項目（本文など）に分ける"""
+    compact = {key: value for key, value in metadata.items() if key in COMPACT_METADATA_FIELDS}
+    document = {key: value for key, value in metadata.items() if key not in COMPACT_METADATA_FIELDS}
+    return compact, document
+
+class DocumentStore:
+    """チャンクの本文とメタデータ（絞り込みに使わない項目）を保存するストア
+
+    コンパクトなメタデータを使用する場合、インデックスには絞り込みに使う項目のみを
+    保存し、本文などは（インデックス, namespace, ベクトルID）をキーにSQLiteに保存する。
+    検索結果はIDでまとめて取得し、メタデータを補完する。
+    """
+
+    def __init__(self, path: str = DOCUMENT_STORE_PATH):
+        """文書ストアの初期化"""
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                index_key TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                vector_id TEXT NOT NULL,
+                document TEXT NOT NULL,
+                PRIMARY KEY (index_key, namespace, vector_id)
+            )
+        """)
+        self._conn.commit()
+
+    def put_many(self, index_key: str, namespace: Optional[str], documents: Dict[str, Dict[str, Any]]) -> None:
+        """ベクトルIDごとの文書を保存（既存の文書は置き換える）"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (index_key, namespace, vector_id, document) VALUES (?, ?, ?, ?)",
+                [
+                    (index_key, namespace or "", vector_id, json.dumps(document, ensure_ascii=False))
+                    for vector_id, document in documents.items()
+                ]
+            )
+            self._conn.commit()
+
+    def get_many(self, index_key: str, namespace: Optional[str], vector_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """ベクトルIDを指定して文書をまとめて取得（保存されていないIDは含めない）"""
+        vector_ids = list(dict.fromkeys(vector_ids))
+        documents = {}
+        with self._lock:
+            # SQLiteのパラメータ数の上限を超えないように分割して取得
+            for i in range(0, len(vector_ids), 500):
+                ids = vector_ids[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT vector_id, document FROM documents WHERE index_key = ? AND namespace = ? "
+                    f"AND vector_id IN ({', '.join('?' * len(ids))})",
+                    (index_key, namespace or "", *ids)
+                ).fetchall()
+                documents.update((row[0], json.loads(row[1])) for row in rows)
+        return documents
+
+    def delete_many(self, index_key: str, namespace: Optional[str], vector_ids: Iterable[str]) -> None:
+        """ベクトルIDを指定して文書を削除"""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM documents WHERE index_key = ? AND namespace = ? AND vector_id = ?",
+                [(index_key, namespace or "", vector_id) for vector_id in vector_ids]
+            )
+            self._conn.commit()
+
+    def clear(self, index_key: str, namespace: Optional[str] = None) -> None:
+        """namespaceの文書を削除"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM documents WHERE index_key = ? AND namespace = ?",
+                (index_key, namespace or "")
+            )
+            self._conn.commit()
+
+    def hydrate(self, index_key: str, namespace: Optional[str], records: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """（ベクトルID, メタデータ）の一覧に文書ストアの内容を補完したメタデータを返す
+
+        本文（text）を含むメタデータ（コンパクトでない形式で保存したもの）はそのまま返す。
+        """
+        missing_ids = [vector_id for vector_id, metadata in records if "text" not in (metadata or {})]
+        documents = self.get_many(index_key, namespace, missing_ids) if missing_ids else {}
+        return [
+            {**documents.get(vector_id, {}), **(metadata or {})}
+            for vector_id, metadata in records
+        ]
+
+_document_store_instance: Optional[DocumentStore] = None
+_document_store_lock = threading.Lock()
+
+def get_document_store() -> DocumentStore:
+    """プロセス内で共有する文書ストアを取得"""
+    global _document_store_instance
+    with _document_store_lock:
+        if _document_store_instance is None:
+            _document_store_instance = DocumentStore()
+        return _document_store_instance
@@ -0,0 +1,152 @@
+from typing import List, Dict, Any, Optional
+from array import array
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from ..config.settings import (
+    LLM_PROVIDER,
+    EMBEDDING_CACHE_ENABLED,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MAX_ENTRIES
+)
+
+# SQLiteのプレースホルダ数の上限を超えないための1クエリあたりのキー数
+_SQL_BATCH_SIZE = 500
+
+class EmbeddingCache:
+    """埋め込みベクトルの永続キャッシュ
+
+    キーは（プロバイダ, 埋め込みモデル名, 正規化したテキストのハッシュ）で、ベクトルは
+    float32のBLOBとしてSQLiteに保存する。件数が上限を超えた場合は
+    最終参照日時の古いものから削除する（LRU）。プロバイダをキーに含めるため、
+    LLM_PROVIDER=fake で作成したベクトルがOpenAIのベクトルとして使われることはない。
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES, provider: str = LLM_PROVIDER):
+        """キャッシュの初期化"""
+        self.path = path
+        self.max_entries = max_entries
+        self.provider = provider
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)")
+        self._conn.commit()
+
+    def make_key(self, model: str, text: str) -> str:
+        """プロバイダ・モデル名と正規化したテキストからキャッシュキーを作成"""
+        normalized = " ".join(unicodedata.normalize("NFKC", text).split())
+        return hashlib.sha256(f"{self.provider}\0{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """キャッシュ済みのベクトルを取得（未登録のテキストはNone）"""
+        keys = [self.make_key(model, text) for text in texts]
+        found = {}
+
+        with self._lock:
+            unique_keys = list(dict.fromkeys(keys))
+            for i in range(0, len(unique_keys), _SQL_BATCH_SIZE):
+                key_batch = unique_keys[i:i + _SQL_BATCH_SIZE]
+                placeholders = ",".join("?" * len(key_batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    key_batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+            # 参照日時を更新（LRU）
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            results = [found.get(key) for key in keys]
+            hit_count = sum(1 for result in results if result is not None)
+            self.hits += hit_count
+            self.misses += len(results) - hit_count
+
+        return results
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        """ベクトルをキャッシュに保存"""
+        now = time.time()
+        rows = [
+            (self.make_key(model, text), array("f", vector).tobytes(), now)
+            for text, vector in zip(texts, vectors)
+        ]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """上限を超えた分を最終参照日時の古い順に削除"""
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access LIMIT ?)",
+                (overflow,)
+            )
+
+    def clear(self) -> None:
+        """キャッシュを全件削除"""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュの統計情報を取得"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            total = self.hits + self.misses
+            return {
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0
+            }
+
+_cache_instance: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """プロセス内で共有する埋め込みキャッシュを取得（無効化されている場合はNone）"""
+    global _cache_instance
+    if not EMBEDDING_CACHE_ENABLED:
+        return None
+
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = EmbeddingCache()
+        return _cache_instance
@@ -0,0 +1,115 @@
+from typing import Dict, Any, Callable, Hashable, List, Optional, Sequence, TypeVar
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import threading
+import time
+from ..config.settings import RRF_K, VECTOR_SEARCH_TIMEOUT_SECONDS, HYBRID_SEARCH_WORKERS
+
+T = TypeVar("T")
+
+def reciprocal_rank_fusion(
+    rankings: Dict[str, Sequence[T]],
+    key: Callable[[T], Hashable],
+    k: int = RRF_K
+) -> List[Dict[str, Any]]:
+    """複数の検索結果の順位を Reciprocal Rank Fusion で統合
+
+    各結果のスコアは、その結果が含まれる検索ごとの 1 / (k + 順位) の合計。
+    同じ結果（key が等しいもの）が複数の検索に含まれる場合は、先に指定した
+    検索の結果を代表として使う。
+
+    Args:
+        rankings (Dict[str, Sequence[T]]): 検索名ごとの結果（順位順）
+        key (Callable[[T], Hashable]): 同じ結果を判定するキー
+        k (int): 順位の平滑化定数
+
+    Returns:
+        List[Dict[str, Any]]: {"item", "score", "ranks"（検索名ごとの順位）} をスコア順に並べた一覧
+    """
+    fused: Dict[Hashable, Dict[str, Any]] = {}
+    for name, results in rankings.items():
+        for rank, item in enumerate(results, 1):
+            entry = fused.setdefault(key(item), {"item": item, "score": 0.0, "ranks": {}})
+            entry["score"] += 1.0 / (k + rank)
+            entry["ranks"][name] = rank
+    return sorted(fused.values(), key=lambda entry: -entry["score"])
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> ThreadPoolExecutor:
+    """検索を実行するスレッドプールを取得
+
+    時間切れになったベクトル検索の完了を待たずに戻れるよう、呼び出しごとに
+    作成せずプロセス内で共有する。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HYBRID_SEARCH_WORKERS, thread_name_prefix="hybrid-search")
+        return _executor
+
+def _timed(func: Callable[[], T]) -> Callable[[], tuple]:
+    """（結果, 所要時間（秒））を返す関数に変換"""
+    def run() -> tuple:
+        start_time = time.perf_counter()
+        result = func()
+        return result, time.perf_counter() - start_time
+    return run
+
+def run_hybrid_search(
+    vector_search: Callable[[], Sequence[T]],
+    lexical_search: Optional[Callable[[], Sequence[T]]],
+    key: Callable[[T], Hashable],
+    top_k: int,
+    vector_timeout: float = VECTOR_SEARCH_TIMEOUT_SECONDS
+) -> Dict[str, Any]:
+    """ベクトル検索とキーワード検索を並行して実行し、RRFで統合
+
+    ベクトル検索が vector_timeout 秒以内に終わらない場合や失敗した場合は、
+    キーワード検索の結果のみを返す（キーワード検索が失敗した場合はその逆）。
+    ベクトル検索で類似度のしきい値以上の結果が無い場合も、キーワード検索の結果
+    （クエリの語を一定の割合以上含むもの）は統合する（施設名・駅名の完全一致など）。
+    lexical_search が None の場合はベクトル検索のみを実行する。
+
+    Returns:
+        Dict[str, Any]: 統合結果（"results"）、検索ごとの所要時間（"latency"、秒）、
+            使用した検索（"mode": hybrid / vector / lexical）、ベクトル検索の時間切れ（"vector_timed_out"）
+    """
+    executor = _get_executor()
+    start_time = time.perf_counter()
+    vector_future = executor.submit(_timed(vector_search))
+    lexical_future = executor.submit(_timed(lexical_search)) if lexical_search else None
+
+    rankings = {}
+    latency = {"vector": None, "lexical": None}
+    if lexical_future is not None:
+        try:
+            rankings["lexical"], latency["lexical"] = lexical_future.result()
+        except Exception as e:
+            print(f"キーワード検索に失敗しました: {str(e)}")
+
+    vector_timed_out = False
+    # キーワード検索で得た結果があれば、ベクトル検索は開始からの制限時間まで待つ
+    remaining = max(vector_timeout - (time.perf_counter() - start_time), 0) if rankings.get("lexical") else None
+    try:
+        vector_results, latency["vector"] = vector_future.result(timeout=remaining)
+        rankings = {"vector": vector_results, **rankings}
+    except FutureTimeoutError:
+        vector_timed_out = True
+        print(f"ベクトル検索が{vector_timeout}秒以内に完了しないため、キーワード検索の結果のみを使用します")
+    except Exception as e:
+        if not rankings.get("lexical"):
+            raise
+        print(f"ベクトル検索に失敗したため、キーワード検索の結果のみを使用します: {str(e)}")
+
+    fused = reciprocal_rank_fusion(rankings, key)[:top_k]
+    if "vector" in rankings and "lexical" in rankings:
+        mode = "hybrid"
+    else:
+        mode = "vector" if "vector" in rankings else "lexical"
+    return {
+        "results": fused,
+        "latency": latency,
+        "mode": mode,
+        "vector_timed_out": vector_timed_out
+    }
@@ -0,0 +1,115 @@
+from typing import List, Dict, Any, Iterable, Optional, Tuple
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from ..config.settings import INGESTION_JOB_DIR
+
+def make_job_id(*parts: Any) -> str:
+    """取り込み元を表す値（ファイル名・内容のハッシュなど）からジョブIDを作成"""
+    return hashlib.sha256("\0".join(str(part) for part in parts).encode("utf-8")).hexdigest()[:32]
+
+def _batch_digest(chunk_ids: Iterable[str]) -> str:
+    """バッチに含まれるチャンクIDの一覧を要約したハッシュ"""
+    return hashlib.sha256("\0".join(chunk_ids).encode("utf-8")).hexdigest()[:16]
+
+class IngestionCheckpoint:
+    """取り込みジョブのチェックポイント
+
+    ジョブIDごとに追記専用のJSONLファイルを作成し、アップロードが完了した
+    バッチとデッドレター（再試行しても失敗したチャンク）を1行ずつ記録する。
+    途中で中断したジョブを同じジョブIDで再実行すると、記録済みのバッチは
+    埋め込みの生成とアップロードを行わずにスキップする。
+    """
+
+    def __init__(self, job_id: str, directory: str = INGESTION_JOB_DIR):
+        """チェックポイントの読み込み"""
+        self.job_id = job_id
+        file_name = job_id if re.fullmatch(r"[\w\-]+", job_id, flags=re.ASCII) else make_job_id(job_id)
+        self.path = os.path.join(directory, f"{file_name}.jsonl")
+        self.status = "new"  # new / running / done
+        self.committed: Dict[Tuple[int, int], str] = {}  # (再試行の回数, バッチ番号) -> チャンクIDのハッシュ
+        self.dead_letters: List[Dict[str, Any]] = []
+        self.uploaded = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        """記録済みの内容を読み込む（書き込み途中で中断した末尾の行は無視する）"""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+
+                record_type = record.get("type")
+                if record_type == "start":
+                    self.status = "running"
+                elif record_type == "batch":
+                    self.committed[(record["pass"], record["batch"])] = record["digest"]
+                    self.uploaded += record["count"]
+                elif record_type == "dead_letter":
+                    self.dead_letters.append({**record["chunk"], "error": record["error"]})
+                elif record_type == "done":
+                    self.status = "done"
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        """1件の記録をファイルに追記し、ディスクに書き込まれるまで待つ"""
+        record["time"] = time.time()
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def start(self, **params: Any) -> None:
+        """ジョブを開始（中断したジョブの場合は続きから再開）"""
+        if self.status == "done":
+            # 完了済みのジョブは最初からやり直す
+            os.remove(self.path)
+            self.committed = {}
+            self.dead_letters = []
+            self.uploaded = 0
+            self.status = "new"
+
+        if self.status == "running":
+            print(f"ジョブ {self.job_id} を再開します（完了済みのバッチ: {len(self.committed)}件）")
+            self._append({"type": "resume"})
+        else:
+            self._append({"type": "start", **params})
+            self.status = "running"
+
+    def is_committed(self, pass_num: int, batch_num: int, chunk_ids: List[str]) -> bool:
+        """同じ内容のバッチがアップロード済みかどうか"""
+        return self.committed.get((pass_num, batch_num)) == _batch_digest(chunk_ids)
+
+    def commit_batch(self, pass_num: int, batch_num: int, chunk_ids: List[str]) -> None:
+        """バッチのアップロード完了を記録"""
+        digest = _batch_digest(chunk_ids)
+        self._append({"type": "batch", "pass": pass_num, "batch": batch_num, "count": len(chunk_ids), "digest": digest})
+        self.committed[(pass_num, batch_num)] = digest
+        self.uploaded += len(chunk_ids)
+
+    def add_dead_letter(self, chunk: Dict[str, Any], error: str) -> None:
+        """再試行しても失敗したチャンクを記録"""
+        record_chunk = {"id": chunk.get("id"), "text": chunk.get("text"), "metadata": chunk.get("metadata", {})}
+        self._append({"type": "dead_letter", "chunk": record_chunk, "error": error})
+        self.dead_letters.append({**record_chunk, "error": error})
+
+    def finish(self, uploaded: int) -> None:
+        """ジョブの完了を記録"""
+        self._append({"type": "done", "uploaded": uploaded, "dead_letters": len(self.dead_letters)})
+        self.status = "done"
+
+def get_dead_letters(job_id: str) -> List[Dict[str, Any]]:
+    """ジョブで再試行しても失敗したチャンクの一覧を取得"""
+    return IngestionCheckpoint(job_id).dead_letters
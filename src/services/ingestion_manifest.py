@@ -0,0 +1,103 @@
+from typing import Dict, Any, Iterable, Optional, Set
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from ..config.settings import INGESTION_MANIFEST_PATH
+
+# チャンクIDの計算に含めないメタデータ（アップロードのたびに変わる値）
+VOLATILE_METADATA_FIELDS = {"id", "chunk_id", "upload_date", "created_date"}
+
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def make_chunk_id(source_id: str, text: str, metadata: Dict[str, Any], occurrence: int = 0) -> str:
+    """ソースとチャンクの内容から決定的なチャンクIDを作成
+
+    IDは「ソースIDのハッシュ_内容のハッシュ」の形式（ASCIIのみ）。同じソース内に
+    同じ内容のチャンクが複数ある場合は、出現順（occurrence）で区別する。
+    """
+    stable_metadata = {key: value for key, value in metadata.items() if key not in VOLATILE_METADATA_FIELDS}
+    content = json.dumps(
+        {"text": text, "metadata": stable_metadata, "occurrence": occurrence},
+        ensure_ascii=False,
+        sort_keys=True,
+        default=str
+    )
+    return f"{_hash(source_id)[:16]}_{_hash(content)[:32]}"
+
+class IngestionManifest:
+    """取り込み済みのチャンクIDを記録するマニフェスト
+
+    （インデックス, namespace, ソースID）ごとに、最後に取り込んだチャンクIDの
+    一覧をSQLiteに保存する。再取り込み時に変更のないチャンクを判定し、
+    不要になったチャンクを削除するために使う。
+    """
+
+    def __init__(self, path: str = INGESTION_MANIFEST_PATH):
+        """マニフェストの初期化"""
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                index_key TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                source_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                ingested_at REAL NOT NULL,
+                PRIMARY KEY (index_key, namespace, source_id, chunk_id)
+            )
+        """)
+        self._conn.commit()
+
+    def get_chunk_ids(self, index_key: str, namespace: Optional[str], source_id: str) -> Set[str]:
+        """ソースについて取り込み済みのチャンクIDを取得"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE index_key = ? AND namespace = ? AND source_id = ?",
+                (index_key, namespace or "", source_id)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def replace_source(self, index_key: str, namespace: Optional[str], source_id: str, chunk_ids: Iterable[str]) -> None:
+        """ソースの取り込み済みチャンクIDを置き換える"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM chunks WHERE index_key = ? AND namespace = ? AND source_id = ?",
+                (index_key, namespace or "", source_id)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (index_key, namespace, source_id, chunk_id, ingested_at) VALUES (?, ?, ?, ?, ?)",
+                [(index_key, namespace or "", source_id, chunk_id, now) for chunk_id in chunk_ids]
+            )
+            self._conn.commit()
+
+    def clear(self, index_key: str, namespace: Optional[str] = None) -> None:
+        """namespaceの記録を削除"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM chunks WHERE index_key = ? AND namespace = ?",
+                (index_key, namespace or "")
+            )
+            self._conn.commit()
+
+_manifest_instance: Optional[IngestionManifest] = None
+_manifest_lock = threading.Lock()
+
+def get_ingestion_manifest() -> IngestionManifest:
+    """プロセス内で共有するマニフェストを取得"""
+    global _manifest_instance
+    with _manifest_lock:
+        if _manifest_instance is None:
+            _manifest_instance = IngestionManifest()
+        return _manifest_instance
@@ -0,0 +1,234 @@
+from typing import List, Dict, Any, Iterable, Callable, Optional
+from collections import OrderedDict
+import queue
+import threading
+import time
+import traceback
+from ..config.settings import INGESTION_WORKER_THREADS, INGESTION_JOB_HISTORY
+from .ingestion_jobs import get_dead_letters
+
+# ジョブの状態
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+class IngestionWorker:
+    """バックグラウンドで取り込みジョブを実行するワーカー
+
+    アップロードをStreamlitのスクリプト実行とは別のスレッドで処理するため、
+    再実行（rerun）やページ移動でアップロードが中断されない。プロセス内の
+    全セッションで1つのキューを共有し、各ジョブの状態は get_job で取得できる。
+    """
+
+    def __init__(self, num_threads: int = INGESTION_WORKER_THREADS, history_size: int = INGESTION_JOB_HISTORY):
+        """ワーカーの初期化（スレッドは最初のジョブの登録時に起動）"""
+        self.num_threads = num_threads
+        self.history_size = history_size
+        self._queue = queue.Queue()
+        self._jobs = OrderedDict()  # ジョブID -> 状態
+        self._tasks = {}  # ジョブID -> 実行内容
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def submit(
+        self,
+        job_id: str,
+        label: str,
+        pinecone_service,
+        make_chunks: Callable[[], Iterable[Dict[str, Any]]],
+        namespace: Optional[str] = None,
+        source_id: Optional[str] = None,
+        source_file=None
+    ) -> str:
+        """取り込みジョブを登録し、ジョブIDを返す
+
+        チャンクの生成（ファイルの解析）もワーカーのスレッドで行うため、
+        make_chunks にはチャンクを返す関数を渡す。source_file（読み込み中の
+        ファイル）を渡した場合は、チャンクの総数が不明でも読み込み位置から
+        残り時間を推定する。同じジョブIDのジョブが待機中・実行中の場合は
+        新たに登録しない。
+        """
+        def run(on_progress: Callable, on_report: Callable) -> int:
+            uploaded = pinecone_service.upload_chunks(
+                make_chunks(),
+                namespace=namespace,
+                progress_callback=on_progress,
+                source_id=source_id,
+                job_id=job_id
+            )
+            on_report(dead_letters=len(get_dead_letters(job_id)))
+            return uploaded
+
+        return self.submit_task(job_id, label, run, source_file)
+
+    def submit_task(
+        self,
+        job_id: str,
+        label: str,
+        run: Callable[[Callable, Callable], int],
+        source_file=None
+    ) -> str:
+        """任意の取り込み処理をジョブとして登録し、ジョブIDを返す
+
+        run(on_progress, on_report) はワーカーのスレッドで呼ばれ、アップロードした
+        件数を返す。on_progress(完了件数, 総件数) で進捗を、on_report(**項目) で
+        ジョブの状態に表示する追加の情報（ファイルごとの処理速度、警告など）を報告する。
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] in (JOB_QUEUED, JOB_RUNNING):
+                return job_id
+
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "label": label,
+                "status": JOB_QUEUED,
+                "done": 0,
+                "total": None,
+                "uploaded": 0,
+                "dead_letters": 0,
+                "files": [],
+                "warnings": [],
+                "error": None,
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None
+            }
+            self._jobs.move_to_end(job_id)
+            self._tasks[job_id] = {
+                "run": run,
+                "source_file": source_file,
+                "source_size": self._get_file_size(source_file)
+            }
+            self._prune_history()
+            self._ensure_threads()
+
+        self._queue.put(job_id)
+        print(f"取り込みジョブを登録しました: {label}（{job_id}）")
+        return job_id
+
+    @staticmethod
+    def _get_file_size(source_file) -> Optional[int]:
+        """ファイルのサイズ（バイト数）を取得"""
+        if source_file is None:
+            return None
+        with source_file.getbuffer() as view:
+            return view.nbytes
+
+    def _ensure_threads(self) -> None:
+        """ワーカースレッドを起動（ロックを取得した状態で呼び出す）"""
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        for i in range(len(self._threads), self.num_threads):
+            thread = threading.Thread(target=self._run, name=f"ingestion-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _prune_history(self) -> None:
+        """完了したジョブの状態を古い順に削除（ロックを取得した状態で呼び出す）"""
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in (JOB_DONE, JOB_FAILED)]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            self._jobs[job_id].update(fields)
+
+    def _run(self) -> None:
+        """キューからジョブを取り出して順に実行"""
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run_job(job_id)
+            finally:
+                self._queue.task_done()
+
+    def _run_job(self, job_id: str) -> None:
+        """1件のジョブを実行"""
+        with self._lock:
+            task = self._tasks[job_id]
+            label = self._jobs[job_id]["label"]
+        self._update(job_id, status=JOB_RUNNING, started_at=time.time())
+        print(f"取り込みジョブを開始します: {label}")
+
+        def on_progress(done: int, total: Optional[int] = None) -> None:
+            self._update(job_id, done=done, total=total)
+
+        def on_report(**fields: Any) -> None:
+            self._update(job_id, **fields)
+
+        try:
+            uploaded = task["run"](on_progress, on_report)
+            self._update(job_id, status=JOB_DONE, uploaded=uploaded, finished_at=time.time())
+            print(f"取り込みジョブが完了しました: {label}（{uploaded}件）")
+        except Exception as e:
+            print(f"取り込みジョブが失敗しました: {label}: {str(e)}")
+            print(traceback.format_exc())
+            self._update(job_id, status=JOB_FAILED, error=str(e), finished_at=time.time())
+        finally:
+            with self._lock:
+                self._tasks.pop(job_id, None)
+            if task["source_file"] is not None:
+                task["source_file"].close()
+
+    @staticmethod
+    def _estimate_progress(job: Dict[str, Any], task: Optional[Dict[str, Any]]) -> Optional[float]:
+        """ジョブの進捗率（0-1）を推定（推定できない場合はNone）"""
+        if job["status"] == JOB_DONE:
+            return 1.0
+        if job["total"]:
+            return min(job["done"] / job["total"], 1.0)
+        if task and task["source_size"]:
+            # チャンクの総数が不明な場合はファイルの読み込み位置から推定
+            try:
+                return min(task["source_file"].tell() / task["source_size"], 1.0)
+            except ValueError:
+                return None
+        return None
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """ジョブの状態を取得（不明なジョブの場合はNone）
+
+        状態（queued/running/done/failed）、処理済み件数、処理速度（chunks/sec）、
+        進捗率、残り時間の推定値（秒）を返す。
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+            task = self._tasks.get(job_id)
+
+        chunks_per_sec = None
+        eta_seconds = None
+        progress = None
+        if job["started_at"] is not None:
+            elapsed = (job["finished_at"] or time.time()) - job["started_at"]
+            if elapsed > 0:
+                chunks_per_sec = job["done"] / elapsed
+            progress = self._estimate_progress(job, task)
+            if job["status"] == JOB_RUNNING and progress:
+                eta_seconds = elapsed * (1 - progress) / progress
+
+        job["chunks_per_sec"] = chunks_per_sec
+        job["progress"] = progress
+        job["eta_seconds"] = eta_seconds
+        return job
+
+    def list_jobs(self) -> List[Dict[str, Any]]:
+        """全ジョブの状態を新しい順に取得"""
+        with self._lock:
+            job_ids = list(self._jobs.keys())
+        jobs = [self.get_job(job_id) for job_id in reversed(job_ids)]
+        return [job for job in jobs if job is not None]
+
+_worker_instance: Optional[IngestionWorker] = None
+_worker_lock = threading.Lock()
+
+def get_ingestion_worker() -> IngestionWorker:
+    """プロセス内で共有する取り込みワーカーを取得"""
+    global _worker_instance
+    with _worker_lock:
+        if _worker_instance is None:
+            _worker_instance = IngestionWorker()
+        return _worker_instance
@@ -1,45 +1,172 @@
-from typing import List, Dict, Any, Tuple
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from typing import List, Dict, Any, Tuple, Iterator, Optional
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_pinecone import PineconeVectorStore
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.schema import HumanMessage, AIMessage
+from concurrent.futures import ThreadPoolExecutor
 import os
+import re
+import time
 from ..config.settings import (
     PINECONE_API_KEY,
     PINECONE_INDEX_NAME,
-    OPENAI_API_KEY,
+    EMBEDDING_MODEL,
     DEFAULT_TOP_K,
     SIMILARITY_THRESHOLD,
     DEFAULT_SYSTEM_PROMPT,
-    DEFAULT_RESPONSE_TEMPLATE
+    DEFAULT_RESPONSE_TEMPLATE,
+    QUESTION_CLASSIFICATION_MODE,
+    VECTOR_STORE_BACKEND,
+    METADATA_FILTER_ENABLED,
+    LEXICAL_SEARCH_ENABLED
 )
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .query_cache import get_query_cache, make_query_cache_key
+from .question_classifier import LocalQuestionClassifier
+from .local_vector_store import get_local_index
+from .document_store import get_document_store, get_index_key
+from .search_filters import build_metadata_filter, derive_search_filters, describe_filter
+from .lexical_index import get_lexical_index
+from .hybrid_search import run_hybrid_search
+from .providers import create_chat_model, create_embeddings
+from ..utils.resource_cache import get_resource
 
-class LangChainService:
-    def __init__(self, callback_manager=None):
-        """LangChainサービスの初期化"""
-        # チャットモデルの初期化
-        self.llm = ChatOpenAI(
-            api_key=OPENAI_API_KEY,
-            model_name="gpt-3.5-turbo",
-            temperature=0.7,
-            callback_manager=callback_manager
+# 質問タイプのカテゴリ一覧
+QUESTION_TYPE_CATEGORIES = """- facility: 施設に関する質問
+- area: 地域情報に関する質問
+- property: 物件情報に関する質問
+- comparison: 物件比較に関する質問
+- price_analysis: 価格分析に関する質問
+- location: 立地条件に関する質問
+- investment: 投資分析に関する質問"""
+
+# 回答と同時に分類する場合の1行目の形式（例: 「質問タイプ: facility」）
+FUSED_QUESTION_TYPE_PATTERN = re.compile(r"^\s*質問タイプ\s*[:：]\s*([a-z_]+)\s*(?:\n|$)")
+
+class CachedEmbeddings(Embeddings):
+    """埋め込みキャッシュを経由して埋め込みを取得するラッパー"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model: str = EMBEDDING_MODEL):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """複数テキストの埋め込みを取得（キャッシュに無いものだけを埋め込む）"""
+        vectors = self.cache.get_many(self.model, texts)
+        missing_indices = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing_indices:
+            missing_texts = [texts[i] for i in missing_indices]
+            missing_vectors = self.embeddings.embed_documents(missing_texts)
+            self.cache.put_many(self.model, missing_texts, missing_vectors)
+            for i, vector in zip(missing_indices, missing_vectors):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """クエリの埋め込みを取得"""
+        vector = self.cache.get_many(self.model, [text])[0]
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many(self.model, [text], [vector])
+        return vector
+
+class HydratingPineconeVectorStore(PineconeVectorStore):
+    """検索結果のメタデータを文書ストアで補完するPineconeVectorStore
+
+    コンパクトなメタデータで保存したベクトルは本文（text）を持たないため、
+    PineconeVectorStore のままでは検索結果から除外される。検索結果のIDで
+    文書ストアから本文などをまとめて取得し、Documentに変換する。
+    """
+
+    def similarity_search_by_vector_with_score(
+        self,
+        embedding: List[float],
+        *,
+        k: int = 4,
+        filter: Optional[dict] = None,
+        namespace: Optional[str] = None
+    ) -> List[Tuple[Document, float]]:
+        """ベクトルで類似検索し、（Document, スコア）の一覧を返す"""
+        if namespace is None:
+            namespace = self._namespace
+        results = self._index.query(
+            vector=embedding,
+            top_k=k,
+            include_metadata=True,
+            namespace=namespace,
+            filter=filter
         )
-        
-        # 埋め込みモデルの初期化
-        self.embeddings = OpenAIEmbeddings(
-            api_key=OPENAI_API_KEY,
-            model="text-embedding-ada-002"
+        matches = results["matches"]
+        hydrated = get_document_store().hydrate(
+            get_index_key(),
+            namespace,
+            [(match["id"], match["metadata"]) for match in matches]
         )
         
+        docs = []
+        for match, metadata in zip(matches, hydrated):
+            if self._text_key not in metadata:
+                print(f"本文が見つからないため検索結果から除外します: {match['id']}")
+                continue
+            text = metadata.pop(self._text_key)
+            docs.append((Document(page_content=text, metadata=metadata), match["score"]))
+        return docs
+
+def create_langchain_components(callback_manager=None) -> Dict[str, Any]:
+    """セッション間で共有するチャットモデル・埋め込みモデル・ベクトルストアを作成"""
+    # チャットモデルの初期化
+    llm = create_chat_model(
+        model_name="gpt-3.5-turbo",
+        temperature=0.7,
+        callback_manager=callback_manager
+    )
+    
+    # 埋め込みモデルの初期化（PineconeServiceと埋め込みキャッシュを共有）
+    embeddings = create_embeddings()
+    embedding_cache = get_embedding_cache()
+    if embedding_cache:
+        embeddings = CachedEmbeddings(embeddings, embedding_cache)
+    
+    if VECTOR_STORE_BACKEND == "local":
+        # ローカルのベクトルストアをPineconeのインデックスとして使用
+        vectorstore = HydratingPineconeVectorStore(
+            index=get_local_index(),
+            embedding=embeddings,
+            text_key="text"
+        )
+    else:
         # PineconeのAPIキーを環境変数に設定
         os.environ["PINECONE_API_KEY"] = PINECONE_API_KEY
         
         # Pineconeベクトルストアの初期化
-        self.vectorstore = PineconeVectorStore.from_existing_index(
+        vectorstore = HydratingPineconeVectorStore.from_existing_index(
             index_name=PINECONE_INDEX_NAME,
-            embedding=self.embeddings
+            embedding=embeddings
+        )
+    
+    return {"llm": llm, "embeddings": embeddings, "vectorstore": vectorstore}
+
+class LangChainService:
+    def __init__(self, callback_manager=None, classification_mode: str = QUESTION_CLASSIFICATION_MODE):
+        """LangChainサービスの初期化"""
+        self.classification_mode = classification_mode
+        self.local_classifier = LocalQuestionClassifier()
+        
+        # チャットモデル・埋め込みモデル・ベクトルストアはプロセス内で共有し、
+        # チャット履歴とプロンプトのみをセッションごとに保持する
+        components = get_resource(
+            ("langchain_components", id(callback_manager)),
+            lambda: create_langchain_components(callback_manager)
         )
+        self.llm = components["llm"]
+        self.embeddings = components["embeddings"]
+        self.vectorstore = components["vectorstore"]
+        
+        # 検索結果キャッシュ（PineconeServiceと共有）
+        self.query_cache = get_query_cache()
         
         # チャット履歴の初期化
         self.message_history = ChatMessageHistory()
@@ -48,28 +175,98 @@ class LangChainService:
         self.system_prompt = DEFAULT_SYSTEM_PROMPT
         self.response_template = DEFAULT_RESPONSE_TEMPLATE
 
-    def get_relevant_context(self, query: str, top_k: int = DEFAULT_TOP_K) -> Tuple[str, List[Dict[str, Any]]]:
-        """クエリに関連する文脈を取得"""
-        # 類似度検索を実行
+    def get_relevant_context(self, query: str, top_k: int = DEFAULT_TOP_K, metadata_filter: Dict[str, Any] = None) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+        """クエリに関連する文脈を取得（同一の質問は検索結果キャッシュを使用）
+        
+        metadata_filter を指定した場合はインデックスの検索で絞り込み、
+        条件に一致する候補が無い場合は条件なしで再検索する。
+        
+        Returns:
+            Tuple[str, List[Dict[str, Any]], Dict[str, Any]]: 文脈、検索詳細、検索の統計
+                （検索方法・検索ごとの所要時間・ベクトル検索の時間切れ・キャッシュの使用）
+        """
+        cache_key = make_query_cache_key("langchain", query, None, top_k, SIMILARITY_THRESHOLD, metadata_filter)
+        if self.query_cache:
+            cached = self.query_cache.get(cache_key)
+            if cached is not None:
+                context, search_details, search_stats = cached
+                return context, search_details, {**search_stats, "cached": True}
+        
+        result = self._search_relevant_context(query, top_k, metadata_filter)
+        if self.query_cache:
+            self.query_cache.put(cache_key, result)
+        return result
+
+    def _similarity_search(self, query: str, top_k: int, metadata_filter: Dict[str, Any] = None) -> List[Tuple[Any, float]]:
+        """類似度検索を実行し、しきい値以上の結果を返す"""
         results = self.vectorstore.similarity_search_with_score(
             query,
-            k=top_k
+            k=top_k,
+            filter=metadata_filter
         )
         
         # 類似度スコアでフィルタリング
-        filtered_results = [
+        return [
             (doc, score) for doc, score in results
             if score >= SIMILARITY_THRESHOLD
         ]
+
+    def _vector_search(self, query: str, top_k: int, metadata_filter: Dict[str, Any] = None) -> List[Tuple[Document, float]]:
+        """ベクトル検索を実行（絞り込み条件に一致する候補が無い場合は条件なしで再検索）"""
+        filtered_results = self._similarity_search(query, top_k, metadata_filter)
+        if metadata_filter and not filtered_results:
+            print(f"絞り込み条件に一致する候補が無いため、条件なしで再検索します: {describe_filter(metadata_filter)}")
+            filtered_results = self._similarity_search(query, top_k)
+        return filtered_results
+
+    def _lexical_search(self, query: str, top_k: int, metadata_filter: Dict[str, Any] = None) -> List[Tuple[Document, float]]:
+        """キーワード検索（BM25）を実行し、ベクトル検索と同じ（Document, スコア）の形式で返す"""
+        lexical_index = get_lexical_index()
+        matches = lexical_index.search(get_index_key(), None, query, top_k, metadata_filter)
+        if metadata_filter and not matches:
+            matches = lexical_index.search(get_index_key(), None, query, top_k)
+        return [
+            (
+                Document(
+                    page_content=match.metadata["text"],
+                    metadata={k: v for k, v in match.metadata.items() if k != "text"}
+                ),
+                match.score
+            )
+            for match in matches
+            if "text" in match.metadata
+        ]
+
+    def _search_relevant_context(self, query: str, top_k: int, metadata_filter: Dict[str, Any] = None) -> Tuple[str, List[Dict[str, Any]], Dict[str, Any]]:
+        """ベクトル検索とキーワード検索を並行して実行し、RRFで統合した結果から文脈を構築"""
+        lexical_search = None
+        if LEXICAL_SEARCH_ENABLED:
+            lexical_search = lambda: self._lexical_search(query, top_k, metadata_filter)
+        
+        # 同じ内容のチャンクは1件として扱う
+        hybrid = run_hybrid_search(
+            lambda: self._vector_search(query, top_k, metadata_filter),
+            lexical_search,
+            key=lambda result: result[0].page_content,
+            top_k=top_k
+        )
+        search_stats = {
+            "mode": hybrid["mode"],
+            "latency": hybrid["latency"],
+            "vector_timed_out": hybrid["vector_timed_out"],
+            "cached": False
+        }
         
-        if not filtered_results:
-            return "関連する情報が見つかりませんでした。", []
+        if not hybrid["results"]:
+            return "関連する情報が見つかりませんでした。", [], search_stats
         
         # 文脈の構築（上位3件のみ）
         context_parts = []
         search_details = []
         
-        for doc, score in filtered_results[:3]:  # 上位3件のみ使用
+        for entry in hybrid["results"][:3]:  # 上位3件のみ使用
+            doc, score = entry["item"]
+            
             # メタデータの取得
             metadata = doc.metadata if hasattr(doc, 'metadata') else {}
             
@@ -85,27 +282,22 @@ class LangChainService:
             if important_metadata:
                 context_parts.append(f"メタデータ: {important_metadata}")
             
-            # 検索詳細の記録
+            # 検索詳細の記録（scoreは類似度またはBM25、ranksは検索ごとの順位）
             search_details.append({
                 "content": content,
                 "score": score,
+                "ranks": entry["ranks"],
                 "metadata": important_metadata
             })
         
-        return "\n\n".join(context_parts), search_details
+        return "\n\n".join(context_parts), search_details, search_stats
 
     def analyze_question_type(self, query: str) -> str:
         """質問のタイプを分析"""
         prompt = ChatPromptTemplate.from_messages([
-            ("system", """以下の質問のタイプを分析し、最も適切なカテゴリを選択してください。
+            ("system", f"""以下の質問のタイプを分析し、最も適切なカテゴリを選択してください。
 利用可能なカテゴリ：
-- facility: 施設に関する質問
-- area: 地域情報に関する質問
-- property: 物件情報に関する質問
-- comparison: 物件比較に関する質問
-- price_analysis: 価格分析に関する質問
-- location: 立地条件に関する質問
-- investment: 投資分析に関する質問
+{QUESTION_TYPE_CATEGORIES}
 
 回答は、上記のカテゴリ名のみを返してください。"""),
             ("human", "{query}")
@@ -115,24 +307,78 @@ class LangChainService:
         response = chain.invoke({"query": query})
         return response.content.strip().lower()
 
-    def get_response(self, query: str, system_prompt: str = None, response_template: str = None, property_info: str = None, chat_history: list = None, selected_template_data: dict = None) -> Tuple[str, Dict[str, Any]]:
+    def classify_question(self, query: str, mode: str) -> Tuple[str, float]:
+        """設定された方法で質問タイプを分類し、所要時間（秒）とともに返す"""
+        start_time = time.perf_counter()
+        if mode == "local":
+            question_type = self.local_classifier.classify(query)
+        else:
+            question_type = self.analyze_question_type(query)
+        return question_type, time.perf_counter() - start_time
+
+    def parse_fused_response(self, content: str, query: str) -> Tuple[str, str]:
+        """分類と回答を同時に生成した応答から、質問タイプと回答本文を取り出す"""
+        match = FUSED_QUESTION_TYPE_PATTERN.match(content)
+        if match:
+            return match.group(1), content[match.end():].strip()
+        # 形式に従っていない場合はローカル分類器の結果を使用
+        return self.local_classifier.classify(query), content
+
+    def get_response(self, query: str, system_prompt: str = None, response_template: str = None, property_info: str = None, chat_history: list = None, selected_template_data: dict = None, property_city: str = None) -> Tuple[str, Dict[str, Any]]:
         """クエリに対する応答を生成"""
+        state = self._prepare_response(query, system_prompt, response_template, property_info, chat_history, selected_template_data, property_city)
+        
+        # 応答を生成
+        generation_start_time = time.perf_counter()
+        response = state["chain"].invoke(state["inputs"])
+        state["generation_time"] = time.perf_counter() - generation_start_time
+        
+        return self._finalize_response(state, response.content)
+
+    def stream_response(self, query: str, system_prompt: str = None, response_template: str = None, property_info: str = None, chat_history: list = None, selected_template_data: dict = None, property_city: str = None) -> "StreamingResponse":
+        """クエリに対する応答をトークン単位で生成
+        
+        返り値を反復するとトークンが順に得られ、反復が終わった時点で
+        answer と details が設定される。
+        """
+        state = self._prepare_response(query, system_prompt, response_template, property_info, chat_history, selected_template_data, property_city)
+        return StreamingResponse(self, state)
+
+    def _prepare_response(self, query: str, system_prompt: str = None, response_template: str = None, property_info: str = None, chat_history: list = None, selected_template_data: dict = None, property_city: str = None) -> Dict[str, Any]:
+        """応答生成の前処理（質問分類・文脈検索・プロンプト組み立て）"""
         # プロンプトの設定
         system_prompt = system_prompt or self.system_prompt
         response_template = response_template or self.response_template
         
-        # 質問タイプの分析
-        question_type = self.analyze_question_type(query)
+        total_start_time = time.perf_counter()
         
-        # チャット履歴を制限（最新の5件のみ保持）
-        if chat_history:
-            chat_history = chat_history[-5:]
-            self.message_history.messages = []
-            for role, content in chat_history:
-                if role == "human":
-                    self.message_history.add_user_message(content)
-                elif role == "ai":
-                    self.message_history.add_ai_message(content)
+        # 質問タイプの分析と関連文脈の検索は互いに独立しているため並行して実行
+        # （fusedの場合は回答生成と同じリクエストで分類する）
+        classification_mode = self.classification_mode
+        question_type = None
+        classification_time = 0.0
+        
+        # 選択中の物件の市区町村と質問タイプから絞り込み条件を作成
+        # （検索を分類の完了まで待たせないよう、質問タイプはローカル分類器で判定。
+        # キーワードから判定できない質問はカテゴリで絞り込まない）
+        metadata_filter = None
+        if METADATA_FILTER_ENABLED:
+            metadata_filter = build_metadata_filter(
+                **derive_search_filters(property_city, self.local_classifier.match(query))
+            )
+        
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            retrieval_future = executor.submit(self._run_timed, self.get_relevant_context, query, DEFAULT_TOP_K, metadata_filter)
+            classification_future = None
+            if classification_mode != "fused":
+                classification_future = executor.submit(self.classify_question, query, classification_mode)
+            
+            # チャット履歴の準備（検索・分類の完了を待つ間に実行）
+            self._load_chat_history(chat_history)
+            
+            (context, search_details, search_stats), retrieval_time = retrieval_future.result()
+            if classification_future:
+                question_type, classification_time = classification_future.result()
         
         # メッセージリストの作成
         messages = [
@@ -146,7 +392,13 @@ class LangChainService:
             messages.append(("system", "物件情報:\n{property_info}"))
         
         # 質問タイプの追加
-        messages.append(("system", f"質問タイプ: {question_type}"))
+        if question_type:
+            messages.append(("system", f"質問タイプ: {question_type}"))
+        else:
+            messages.append(("system", f"""回答の前に、質問のタイプを以下のカテゴリから1つ選んでください。
+{QUESTION_TYPE_CATEGORIES}
+
+応答の1行目には「質問タイプ: カテゴリ名」のみを出力し、2行目以降に回答を記述してください。"""))
         
         # 応答テンプレートの追加
         messages.append(("system", f"応答形式:\n{response_template}"))
@@ -160,41 +412,166 @@ class LangChainService:
         # チェーンの初期化
         chain = prompt | self.llm
         
-        # 関連する文脈を取得
-        context, search_details = self.get_relevant_context(query)
-        
-        # 応答を生成
-        response = chain.invoke({
-            "chat_history": self.message_history.messages,
-            "context": context,
-            "property_info": property_info or "物件情報はありません。",
-            "input": query
-        })
+        return {
+            "query": query,
+            "chain": chain,
+            "inputs": {
+                "chat_history": self.message_history.messages,
+                "context": context,
+                "property_info": property_info or "物件情報はありません。",
+                "input": query
+            },
+            "system_prompt": system_prompt,
+            "response_template": response_template,
+            "property_info": property_info,
+            "chat_history": chat_history,
+            "selected_template_data": selected_template_data,
+            "classification_mode": classification_mode,
+            "question_type": question_type,
+            "classification_time": classification_time,
+            "search_details": search_details,
+            "metadata_filter": metadata_filter,
+            "search_stats": search_stats,
+            "retrieval_time": retrieval_time,
+            "generation_time": 0.0,
+            "first_token_time": None,
+            "total_start_time": total_start_time
+        }
+
+    def _finalize_response(self, state: Dict[str, Any], content: str) -> Tuple[str, Dict[str, Any]]:
+        """生成結果から回答と詳細情報を作成し、会話履歴に追加"""
+        query = state["query"]
+        question_type = state["question_type"]
+        answer = content
+        if question_type is None:
+            question_type, answer = self.parse_fused_response(answer, query)
         
         # メッセージを履歴に追加
         self.message_history.add_user_message(query)
-        self.message_history.add_ai_message(response.content)
+        self.message_history.add_ai_message(answer)
+        
+        selected_template_data = state["selected_template_data"]
+        property_info = state["property_info"]
+        chat_history = state["chat_history"]
+        search_details = state["search_details"]
+        search_stats = state["search_stats"]
+        
+        # 処理時間の記録
+        timings = {
+            "質問分類": round(state["classification_time"], 3),
+            "文脈検索": round(state["retrieval_time"], 3),
+            "回答生成": round(state["generation_time"], 3),
+            "合計": round(time.perf_counter() - state["total_start_time"], 3)
+        }
+        if state["first_token_time"] is not None:
+            timings["最初のトークン"] = round(state["first_token_time"], 3)
         
         # 詳細情報の作成
         details = {
             "モデル": "GPT-3.5-turbo",
             "会話履歴": "有効",
             "質問タイプ": question_type,
+            "質問分類": {
+                "方式": state["classification_mode"],
+                "所要時間（秒）": round(state["classification_time"], 3)
+            },
             "回答タイプ": selected_template_data.get("name", "デフォルト") if selected_template_data else "デフォルト",
             "文脈検索": {
+                "絞り込み条件": state["metadata_filter"] or "なし",
+                "検索方法": search_stats["mode"],
+                "検索ごとの所要時間（秒）": {
+                    "ベクトル検索": round(search_stats["latency"]["vector"], 3) if search_stats["latency"]["vector"] is not None else None,
+                    "キーワード検索": round(search_stats["latency"]["lexical"], 3) if search_stats["latency"]["lexical"] is not None else None
+                },
+                "ベクトル検索の時間切れ": search_stats["vector_timed_out"],
+                "キャッシュ": "使用" if search_stats["cached"] else "未使用",
                 "検索結果数": len(search_details),
                 "マッチしたチャンク": search_details
             },
             "プロンプト": {
-                "システムプロンプト": system_prompt,
-                "応答テンプレート": response_template
+                "システムプロンプト": state["system_prompt"],
+                "応答テンプレート": state["response_template"]
             },
             "物件情報": property_info or "物件情報はありません。",
-            "会話履歴数": len(chat_history) if chat_history else 0
+            "会話履歴数": min(len(chat_history), 5) if chat_history else 0,
+            "処理時間（秒）": timings
         }
         
-        return response.content, details
+        return answer, details
+
+    def _load_chat_history(self, chat_history: list = None) -> None:
+        """チャット履歴をLangChainのメッセージ履歴に反映（最新の5件のみ保持）"""
+        if chat_history:
+            chat_history = chat_history[-5:]
+            self.message_history.messages = []
+            for role, content in chat_history:
+                if role == "human":
+                    self.message_history.add_user_message(content)
+                elif role == "ai":
+                    self.message_history.add_ai_message(content)
+
+    @staticmethod
+    def _run_timed(func, *args, **kwargs) -> Tuple[Any, float]:
+        """関数を実行し、結果と所要時間（秒）を返す"""
+        start_time = time.perf_counter()
+        result = func(*args, **kwargs)
+        return result, time.perf_counter() - start_time
 
     def clear_memory(self):
         """会話メモリをクリア"""
-        self.message_history.clear() 
\ No newline at end of file
+        self.message_history.clear() 
+
+class StreamingResponse:
+    """ストリーミング応答（反復でトークンを返し、終了後に answer と details を保持）"""
+
+    # fused方式で1行目（質問タイプ）を待つ最大文字数。超えた場合は形式に従っていないとみなす
+    FUSED_PREFIX_MAX_CHARS = 40
+
+    def __init__(self, service: LangChainService, state: Dict[str, Any]):
+        self.service = service
+        self.state = state
+        self.answer = None
+        self.details = None
+
+    def __iter__(self) -> Iterator[str]:
+        state = self.state
+        pieces = []
+        # fused方式では「質問タイプ: ...」の1行目を表示しないようにバッファする
+        prefix_done = state["question_type"] is not None
+        buffer = ""
+        
+        generation_start_time = time.perf_counter()
+        for chunk in state["chain"].stream(state["inputs"]):
+            token = chunk.content
+            if not token:
+                continue
+            if state["first_token_time"] is None:
+                state["first_token_time"] = time.perf_counter() - state["total_start_time"]
+            pieces.append(token)
+            
+            if prefix_done:
+                yield token
+                continue
+            
+            buffer += token
+            # 先頭の改行・空白は1行目の終わりとみなさない
+            stripped = buffer.lstrip()
+            if "\n" in stripped or len(stripped) > self.FUSED_PREFIX_MAX_CHARS:
+                prefix_done = True
+                rest = self._strip_question_type(buffer)
+                if rest:
+                    yield rest
+        
+        if not prefix_done and buffer:
+            rest = self._strip_question_type(buffer)
+            if rest:
+                yield rest
+        
+        state["generation_time"] = time.perf_counter() - generation_start_time
+        self.answer, self.details = self.service._finalize_response(state, "".join(pieces))
+
+    @staticmethod
+    def _strip_question_type(text: str) -> str:
+        """先頭の「質問タイプ: ...」行を取り除く"""
+        match = FUSED_QUESTION_TYPE_PATTERN.match(text)
+        return text[match.end():].lstrip() if match else text
@@ -0,0 +1,283 @@
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+from collections import Counter
+from dataclasses import dataclass
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from ..config.settings import (
+    LEXICAL_INDEX_PATH,
+    LEXICAL_NGRAM_SIZE,
+    BM25_K1,
+    BM25_B,
+    LEXICAL_MAX_QUERY_TERMS,
+    LEXICAL_MIN_TERM_COVERAGE,
+    LEXICAL_MAX_DF_RATIO,
+    LEXICAL_DF_FILTER_MIN_DOCUMENTS
+)
+from .local_vector_store import matches_filter
+
+# 英数字の連続（単語・数値）と、それ以外の文字の連続（日本語など）
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[^\W_a-z0-9]+")
+
+def tokenize(text: str, ngram_size: int = LEXICAL_NGRAM_SIZE) -> List[str]:
+    """テキストを索引語に分割
+
+    NFKCで正規化（全角英数字を半角に統一）したうえで、英数字は単語単位、
+    日本語などはN-gram単位に分割する。記号と空白は除外する。
+    """
+    terms = []
+    for run in _TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).lower()):
+        if run[0].isascii() or len(run) <= ngram_size:
+            terms.append(run)
+        else:
+            terms.extend(run[i:i + ngram_size] for i in range(len(run) - ngram_size + 1))
+    return terms
+
+def _has_hiragana(term: str) -> bool:
+    """ひらがなを含む索引語か（助詞・助動詞・送り仮名を含むN-gram）"""
+    return any("\u3041" <= char <= "\u309f" for char in term)
+
+def select_query_terms(text: str) -> List[str]:
+    """クエリの索引語から検索に使うものを選択
+
+    「ます」「この」のように、ひらがなを含むN-gramはほぼすべての文書に一致するため除外する。
+    クエリがひらがなのみの場合は、すべての索引語を使う。
+    """
+    terms = list(dict.fromkeys(tokenize(text)))
+    content_terms = [term for term in terms if not _has_hiragana(term)]
+    return content_terms or terms
+
+@dataclass
+class LexicalMatch:
+    """キーワード検索の結果（ベクトル検索の結果と同じく id / score / metadata で参照できる）"""
+    id: str
+    score: float  # BM25スコア
+    metadata: Dict[str, Any]
+
+class _NamespaceIndex:
+    """1つの（インデックス, namespace）の転置インデックス（メモリ上に保持）"""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = {}  # 索引語 -> {ベクトルID: 出現回数}
+        self.terms: Dict[str, Dict[str, int]] = {}  # ベクトルID -> {索引語: 出現回数}
+        self.lengths: Dict[str, int] = {}  # ベクトルID -> 文書長（索引語の数）
+        self.total_length = 0
+
+    def add(self, vector_id: str, terms: Dict[str, int]) -> None:
+        """文書を追加（同じIDの文書は置き換える）"""
+        self.remove(vector_id)
+        self.terms[vector_id] = terms
+        length = sum(terms.values())
+        self.lengths[vector_id] = length
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[vector_id] = tf
+
+    def remove(self, vector_id: str) -> None:
+        """文書を削除"""
+        terms = self.terms.pop(vector_id, None)
+        if terms is None:
+            return
+        self.total_length -= self.lengths.pop(vector_id)
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(vector_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def score(
+        self,
+        query_terms: List[str],
+        max_terms: int = LEXICAL_MAX_QUERY_TERMS,
+        min_coverage: float = LEXICAL_MIN_TERM_COVERAGE
+    ) -> Dict[str, float]:
+        """クエリの索引語に対する文書ごとのBM25スコア
+
+        大半の文書に出現する索引語は除外し、長いクエリは文書頻度の低い（スコアへの寄与が
+        大きい）索引語 max_terms 個のみで評価する。評価した索引語（索引に無いものも含む）の
+        うち min_coverage 以上の割合を含む文書のみを返す。
+        """
+        total_documents = len(self.lengths)
+        if not total_documents:
+            return {}
+        empty: Dict[str, int] = {}
+        postings = [self.postings.get(term, empty) for term in query_terms]
+        if total_documents >= LEXICAL_DF_FILTER_MIN_DOCUMENTS:
+            postings = [posting for posting in postings if len(posting) <= total_documents * LEXICAL_MAX_DF_RATIO]
+        postings = sorted(postings, key=len)[:max_terms]
+        if not postings:
+            return {}
+
+        lengths = self.lengths
+        length_scale = BM25_K1 * BM25_B / (self.total_length / total_documents or 1)
+        length_base = BM25_K1 * (1 - BM25_B)
+        scores: Dict[str, float] = {}
+        matched_terms: Dict[str, int] = {}
+        for posting in postings:
+            df = len(posting)
+            weight = math.log(1 + (total_documents - df + 0.5) / (df + 0.5)) * (BM25_K1 + 1)
+            for vector_id, tf in posting.items():
+                scores[vector_id] = scores.get(vector_id, 0.0) + weight * tf / (tf + length_base + length_scale * lengths[vector_id])
+                matched_terms[vector_id] = matched_terms.get(vector_id, 0) + 1
+
+        min_matched = len(postings) * min_coverage
+        return {
+            vector_id: score for vector_id, score in scores.items()
+            if matched_terms[vector_id] >= min_matched
+        }
+
+class LexicalIndex:
+    """チャンクの本文に対する転置インデックス（BM25で順位付け）
+
+    文書ごとの索引語の出現回数とメタデータ（本文を含む）を（インデックス, namespace,
+    ベクトルID）をキーにSQLiteに保存し、検索用の転置インデックスはnamespaceごとに
+    初回の利用時にメモリ上に構築する。アップロード・削除のたびに該当する文書の分だけ
+    SQLiteとメモリ上の索引を更新するため、全体を作り直す必要はない。
+    """
+
+    def __init__(self, path: str = LEXICAL_INDEX_PATH):
+        """索引の初期化"""
+        self.path = path
+        self._lock = threading.Lock()
+        self._indexes: Dict[Tuple[str, str], _NamespaceIndex] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                index_key TEXT NOT NULL,
+                namespace TEXT NOT NULL,
+                vector_id TEXT NOT NULL,
+                terms TEXT NOT NULL,
+                metadata TEXT NOT NULL,
+                PRIMARY KEY (index_key, namespace, vector_id)
+            )
+        """)
+        self._conn.commit()
+
+    def _get_index(self, index_key: str, namespace: str) -> _NamespaceIndex:
+        """namespaceの転置インデックスを取得（未構築の場合はSQLiteから読み込む。ロックを取得してから呼び出す）"""
+        index = self._indexes.get((index_key, namespace))
+        if index is None:
+            index = _NamespaceIndex()
+            rows = self._conn.execute(
+                "SELECT vector_id, terms FROM documents WHERE index_key = ? AND namespace = ?",
+                (index_key, namespace)
+            )
+            for vector_id, terms in rows:
+                index.add(vector_id, json.loads(terms))
+            self._indexes[(index_key, namespace)] = index
+        return index
+
+    def add_documents(self, index_key: str, namespace: Optional[str], documents: Iterable[Tuple[str, Dict[str, Any]]]) -> None:
+        """（ベクトルID, メタデータ）の一覧を索引に追加（同じIDの文書は置き換える）"""
+        namespace = namespace or ""
+        entries = [
+            (vector_id, dict(Counter(tokenize(metadata.get("text", "")))), metadata)
+            for vector_id, metadata in documents
+        ]
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (index_key, namespace, vector_id, terms, metadata) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (index_key, namespace, vector_id, json.dumps(terms, ensure_ascii=False), json.dumps(metadata, ensure_ascii=False))
+                    for vector_id, terms, metadata in entries
+                ]
+            )
+            self._conn.commit()
+            index = self._get_index(index_key, namespace)
+            for vector_id, terms, _ in entries:
+                index.add(vector_id, terms)
+
+    def delete_documents(self, index_key: str, namespace: Optional[str], vector_ids: Iterable[str]) -> None:
+        """ベクトルIDを指定して索引から削除"""
+        namespace = namespace or ""
+        vector_ids = list(vector_ids)
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM documents WHERE index_key = ? AND namespace = ? AND vector_id = ?",
+                [(index_key, namespace, vector_id) for vector_id in vector_ids]
+            )
+            self._conn.commit()
+            index = self._get_index(index_key, namespace)
+            for vector_id in vector_ids:
+                index.remove(vector_id)
+
+    def clear(self, index_key: str, namespace: Optional[str] = None) -> None:
+        """namespaceの索引を削除"""
+        namespace = namespace or ""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM documents WHERE index_key = ? AND namespace = ?",
+                (index_key, namespace)
+            )
+            self._conn.commit()
+            self._indexes[(index_key, namespace)] = _NamespaceIndex()
+
+    def count(self, index_key: str, namespace: Optional[str] = None) -> int:
+        """namespaceの索引に登録されている文書数"""
+        with self._lock:
+            return len(self._get_index(index_key, namespace or "").lengths)
+
+    def search(
+        self,
+        index_key: str,
+        namespace: Optional[str],
+        query: str,
+        top_k: int,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> List[LexicalMatch]:
+        """クエリに含まれる索引語でBM25の上位top_k件を検索（metadata_filter に一致するもののみ）
+
+        クエリの索引語を一定の割合以上含まないチャンクは、スコアに関わらず結果に含めない。
+        """
+        namespace = namespace or ""
+        query_terms = select_query_terms(query)
+        if not query_terms or top_k <= 0:
+            return []
+
+        with self._lock:
+            scores = self._get_index(index_key, namespace).score(query_terms)
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+        # スコアの高い順にメタデータを取得し、絞り込み条件に一致するものを top_k 件集める
+        matches = []
+        page_size = top_k * 4 if metadata_filter else top_k
+        for i in range(0, len(ranked), page_size):
+            page = ranked[i:i + page_size]
+            with self._lock:
+                rows = self._conn.execute(
+                    f"SELECT vector_id, metadata FROM documents WHERE index_key = ? AND namespace = ? "
+                    f"AND vector_id IN ({', '.join('?' * len(page))})",
+                    (index_key, namespace, *(vector_id for vector_id, _ in page))
+                ).fetchall()
+            metadata_by_id = {row[0]: json.loads(row[1]) for row in rows}
+            for vector_id, score in page:
+                metadata = metadata_by_id.get(vector_id)
+                if metadata is None or not matches_filter(metadata, metadata_filter):
+                    continue
+                matches.append(LexicalMatch(id=vector_id, score=score, metadata=metadata))
+                if len(matches) >= top_k:
+                    return matches
+        return matches
+
+_lexical_index_instance: Optional[LexicalIndex] = None
+_lexical_index_lock = threading.Lock()
+
+def get_lexical_index() -> LexicalIndex:
+    """プロセス内で共有するキーワード検索の索引を取得"""
+    global _lexical_index_instance
+    with _lexical_index_lock:
+        if _lexical_index_instance is None:
+            _lexical_index_instance = LexicalIndex()
+        return _lexical_index_instance
@@ -0,0 +1,328 @@
+from typing import List, Dict, Any, Iterator, Optional
+from urllib.parse import quote, unquote
+import json
+import os
+import sqlite3
+import threading
+import numpy as np
+from ..config.settings import LOCAL_VECTOR_STORE_DIR, EMBEDDING_DIMENSION
+
+# 行列の初期確保行数（以降は不足するたびに倍に拡張）
+_INITIAL_CAPACITY = 1024
+
+class _Record(dict):
+    """属性アクセスにも対応した辞書（Pineconeのレスポンスオブジェクト互換）"""
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+def _compare(operator: str, value: Any, operand: Any) -> bool:
+    """Pineconeのフィルタの比較演算子を評価"""
+    if operator == "$eq":
+        return value == operand
+    if operator == "$ne":
+        return value != operand
+    if operator == "$in":
+        return value in operand
+    if operator == "$nin":
+        return value not in operand
+    if operator in ("$gt", "$gte", "$lt", "$lte"):
+        # 数値以外（未設定を含む）は範囲の条件に一致しない
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return False
+        if operator == "$gt":
+            return value > operand
+        if operator == "$gte":
+            return value >= operand
+        if operator == "$lt":
+            return value < operand
+        return value <= operand
+    raise ValueError(f"未対応のフィルタ演算子です: {operator}")
+
+def matches_filter(metadata: Dict[str, Any], metadata_filter: Optional[Dict[str, Any]]) -> bool:
+    """メタデータがPineconeのフィルタ（$eq, $in, $gte, $and, $or など）に一致するか"""
+    if not metadata_filter:
+        return True
+    for key, condition in metadata_filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub_filter) for sub_filter in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, sub_filter) for sub_filter in condition):
+                return False
+        elif isinstance(condition, dict):
+            for operator, operand in condition.items():
+                if operator == "$exists":
+                    if (key in metadata) != bool(operand):
+                        return False
+                elif key not in metadata:
+                    # 項目が無い場合は $ne / $nin のみ一致する
+                    if operator not in ("$ne", "$nin"):
+                        return False
+                elif not _compare(operator, metadata[key], operand):
+                    return False
+        # 演算子を省略した場合は $eq として扱う
+        elif key not in metadata or metadata[key] != condition:
+            return False
+    return True
+
+class _NamespaceStore:
+    """1つのnamespaceのベクトルを保持するストア
+
+    正規化済みのベクトルを連続したfloat32行列としてメモリマップドファイルに保存し、
+    IDとメタデータはSQLiteに保存する。行番号は常に 0..count-1 に詰めて管理する。
+    """
+
+    def __init__(self, directory: str, dimension: int):
+        os.makedirs(directory, exist_ok=True)
+        self.dimension = dimension
+        self.vectors_path = os.path.join(directory, "vectors.f32")
+        self.db = sqlite3.connect(os.path.join(directory, "records.sqlite3"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                metadata TEXT NOT NULL
+            )
+        """)
+        self.db.commit()
+
+        rows = self.db.execute("SELECT row, id, metadata FROM records ORDER BY row").fetchall()
+        self.ids = [row[1] for row in rows]
+        self.metadata = [json.loads(row[2]) for row in rows]
+        self.positions = {vector_id: i for i, vector_id in enumerate(self.ids)}
+        self.count = len(self.ids)
+
+        row_bytes = self.dimension * 4
+        existing_rows = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        self._open_matrix(max(_INITIAL_CAPACITY, self.count, existing_rows))
+
+    def _open_matrix(self, capacity: int) -> None:
+        """指定した行数でベクトルファイルをメモリマップする（不足分はファイルを拡張）"""
+        required_bytes = capacity * self.dimension * 4
+        with open(self.vectors_path, "ab") as f:
+            if f.tell() < required_bytes:
+                f.truncate(required_bytes)
+        self.capacity = capacity
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+
+    def _normalize(self, values: List[float]) -> np.ndarray:
+        """コサイン類似度を内積で計算できるようにベクトルを正規化"""
+        vector = np.asarray(values, dtype=np.float32)
+        if vector.shape != (self.dimension,):
+            raise ValueError(f"ベクトルの次元数が一致しません（期待値: {self.dimension}, 実際: {vector.shape[-1]}）")
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def upsert(self, vectors: List[Dict[str, Any]]) -> int:
+        """ベクトルを追加または更新"""
+        new_rows = sum(1 for vector in vectors if vector["id"] not in self.positions)
+        if self.count + new_rows > self.capacity:
+            self.matrix.flush()
+            capacity = self.capacity
+            while capacity < self.count + new_rows:
+                capacity *= 2
+            self._open_matrix(capacity)
+
+        records = []
+        for vector in vectors:
+            vector_id = vector["id"]
+            metadata = dict(vector.get("metadata") or {})
+            row = self.positions.get(vector_id)
+            if row is None:
+                row = self.count
+                self.count += 1
+                self.positions[vector_id] = row
+                self.ids.append(vector_id)
+                self.metadata.append(metadata)
+            else:
+                self.metadata[row] = metadata
+            self.matrix[row] = self._normalize(vector["values"])
+            records.append((row, vector_id, json.dumps(metadata, ensure_ascii=False)))
+
+        self.matrix.flush()
+        self.db.executemany("INSERT OR REPLACE INTO records (row, id, metadata) VALUES (?, ?, ?)", records)
+        self.db.commit()
+        return len(records)
+
+    def delete(self, ids: List[str]) -> None:
+        """ベクトルを削除（末尾の行を空いた行に移動して詰める）"""
+        for vector_id in ids:
+            row = self.positions.pop(vector_id, None)
+            if row is None:
+                continue
+            last = self.count - 1
+            self.db.execute("DELETE FROM records WHERE row = ?", (row,))
+            if row != last:
+                self.matrix[row] = self.matrix[last]
+                self.ids[row] = self.ids[last]
+                self.metadata[row] = self.metadata[last]
+                self.positions[self.ids[row]] = row
+                self.db.execute("UPDATE records SET row = ? WHERE row = ?", (row, last))
+            self.ids.pop()
+            self.metadata.pop()
+            self.count -= 1
+
+        self.matrix.flush()
+        self.db.commit()
+
+    def delete_all(self) -> None:
+        """全ベクトルを削除"""
+        self.db.execute("DELETE FROM records")
+        self.db.commit()
+        self.ids = []
+        self.metadata = []
+        self.positions = {}
+        self.count = 0
+
+    def query(self, vector: List[float], top_k: int, metadata_filter: Optional[Dict[str, Any]] = None) -> List[tuple]:
+        """コサイン類似度の上位top_k件を（行番号, スコア）で返す（フィルタに一致する行のみ）"""
+        if self.count == 0 or top_k <= 0:
+            return []
+        if metadata_filter:
+            # フィルタに一致する行のみ類似度を計算する
+            rows = np.array(
+                [row for row in range(self.count) if matches_filter(self.metadata[row], metadata_filter)],
+                dtype=np.int64
+            )
+            if len(rows) == 0:
+                return []
+            scores = self.matrix[rows] @ self._normalize(vector)
+        else:
+            rows = None
+            scores = self.matrix[:self.count] @ self._normalize(vector)
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        if rows is None:
+            return [(int(i), float(scores[i])) for i in top]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+class LocalIndex:
+    """Pineconeのインデックスと同じ操作を提供するローカルのベクトルストア
+
+    PineconeService および LangChain の PineconeVectorStore から、
+    Pineconeのインデックスの代わりに利用できる。
+    """
+
+    def __init__(self, directory: str = LOCAL_VECTOR_STORE_DIR, dimension: int = EMBEDDING_DIMENSION):
+        """ローカルベクトルストアの初期化（保存済みのnamespaceを読み込む）"""
+        self.directory = directory
+        self.dimension = dimension
+        # PineconeVectorStore（langchain-pinecone 0.2.5以降）が初期化時に参照する接続情報
+        self.config = _Record(host=f"local://{os.path.abspath(directory)}", api_key="")
+        self._stores = {}
+        self._lock = threading.RLock()
+
+        os.makedirs(directory, exist_ok=True)
+        for entry in sorted(os.listdir(directory)):
+            if os.path.isdir(os.path.join(directory, entry)):
+                self._stores[self._namespace_name(entry)] = _NamespaceStore(os.path.join(directory, entry), dimension)
+
+    @staticmethod
+    def _directory_name(namespace: Optional[str]) -> str:
+        """namespace名を保存先のディレクトリ名に変換"""
+        return quote(namespace, safe="") if namespace else "__default__"
+
+    @staticmethod
+    def _namespace_name(directory_name: str) -> str:
+        """保存先のディレクトリ名をnamespace名に戻す"""
+        return "" if directory_name == "__default__" else unquote(directory_name)
+
+    def _store(self, namespace: Optional[str], create: bool = False) -> Optional[_NamespaceStore]:
+        """namespaceのストアを取得（create=Trueの場合は無ければ作成）"""
+        name = namespace or ""
+        store = self._stores.get(name)
+        if store is None and create:
+            store = _NamespaceStore(os.path.join(self.directory, self._directory_name(name)), self.dimension)
+            self._stores[name] = store
+        return store
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = None, **kwargs) -> _Record:
+        """ベクトルを追加または更新"""
+        with self._lock:
+            upserted = self._store(namespace, create=True).upsert(vectors)
+        return _Record(upserted_count=upserted)
+
+    def query(self, vector: List[float], top_k: int = 10, include_metadata: bool = False, include_values: bool = False, namespace: str = None, filter: Optional[Dict[str, Any]] = None, **kwargs) -> _Record:
+        """類似ベクトルを検索（filter にはPineconeと同じ形式のメタデータフィルタを指定）"""
+        with self._lock:
+            store = self._store(namespace)
+            matches = []
+            if store is not None:
+                for row, score in store.query(vector, top_k, filter):
+                    matches.append(_Record(
+                        id=store.ids[row],
+                        score=score,
+                        values=store.matrix[row].tolist() if include_values else [],
+                        # 呼び出し側で変更されても影響しないようにコピーを返す
+                        metadata=dict(store.metadata[row]) if include_metadata else None
+                    ))
+        return _Record(matches=matches, namespace=namespace or "")
+
+    def fetch(self, ids: List[str], namespace: str = None, **kwargs) -> _Record:
+        """IDを指定してベクトルを取得"""
+        vectors = {}
+        with self._lock:
+            store = self._store(namespace)
+            if store is not None:
+                for vector_id in ids:
+                    row = store.positions.get(vector_id)
+                    if row is not None:
+                        vectors[vector_id] = _Record(
+                            id=vector_id,
+                            values=store.matrix[row].tolist(),
+                            metadata=dict(store.metadata[row])
+                        )
+        return _Record(vectors=vectors, namespace=namespace or "")
+
+    def delete(self, ids: List[str] = None, delete_all: bool = False, namespace: str = None, **kwargs) -> None:
+        """ベクトルを削除"""
+        with self._lock:
+            store = self._store(namespace)
+            if store is None:
+                return
+            if delete_all:
+                store.delete_all()
+            elif ids:
+                store.delete(ids)
+
+    def list(self, namespace: str = None, limit: int = 100, prefix: str = None, **kwargs) -> Iterator[List[str]]:
+        """IDをページ単位で列挙"""
+        with self._lock:
+            store = self._store(namespace)
+            ids = list(store.ids) if store is not None else []
+        if prefix:
+            ids = [vector_id for vector_id in ids if vector_id.startswith(prefix)]
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def describe_index_stats(self, **kwargs) -> _Record:
+        """インデックスの統計情報を取得"""
+        with self._lock:
+            namespaces = {
+                name: _Record(vector_count=store.count)
+                for name, store in self._stores.items()
+                if store.count > 0
+            }
+        return _Record(
+            dimension=self.dimension,
+            metric="cosine",
+            total_vector_count=sum(namespace.vector_count for namespace in namespaces.values()),
+            namespaces=namespaces
+        )
+
+_local_indexes: Dict[str, LocalIndex] = {}
+_local_indexes_lock = threading.Lock()
+
+def get_local_index(directory: str = LOCAL_VECTOR_STORE_DIR) -> LocalIndex:
+    """プロセス内で共有するローカルベクトルストアを取得"""
+    with _local_indexes_lock:
+        index = _local_indexes.get(directory)
+        if index is None:
+            index = LocalIndex(directory)
+            _local_indexes[directory] = index
+        return index
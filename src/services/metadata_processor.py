@@ -1,9 +1,8 @@
 from typing import Dict, Any, List
 from dataclasses import dataclass
 from langchain.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
+from .providers import create_chat_model
 import json
-import os
 
 @dataclass
 class MetadataField:
@@ -17,8 +16,7 @@ class MetadataField:
 class MetadataProcessor:
     def __init__(self):
         """メタデータプロセッサの初期化"""
-        self.llm = ChatOpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"),
+        self.llm = create_chat_model(
             model_name="gpt-3.5-turbo",
             temperature=0
         )
@@ -1,37 +1,79 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, Callable, Optional, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pinecone import Pinecone, ServerlessSpec
-from openai import OpenAI
 import time
 from ..config.settings import (
     PINECONE_API_KEY,
     PINECONE_INDEX_NAME,
-    OPENAI_API_KEY,
     EMBEDDING_MODEL,
+    EMBEDDING_DIMENSION,
+    EMBEDDING_MAX_INPUTS_PER_REQUEST,
+    EMBEDDING_MAX_TOKENS_PER_REQUEST,
     BATCH_SIZE,
+    EMBED_CONCURRENCY,
+    UPSERT_CONCURRENCY,
     DEFAULT_TOP_K,
-    SIMILARITY_THRESHOLD
+    SIMILARITY_THRESHOLD,
+    LIST_PAGE_SIZE,
+    FETCH_BATCH_SIZE,
+    VECTOR_STORE_BACKEND,
+    INGESTION_RETRY_PASSES,
+    INDEX_STATS_CACHE_TTL_SECONDS,
+    COMPACT_METADATA,
+    LEXICAL_SEARCH_ENABLED
 )
+from .embedding_cache import get_embedding_cache
+from .query_cache import get_query_cache, get_index_generation, bump_index_generation, make_query_cache_key
+from .local_vector_store import get_local_index
+from .ingestion_manifest import get_ingestion_manifest, make_chunk_id
+from .ingestion_jobs import IngestionCheckpoint
+from .document_store import get_document_store, get_index_key, split_metadata
+from .search_filters import describe_filter, to_timestamp
+from .lexical_index import get_lexical_index
+from .hybrid_search import run_hybrid_search
+from .providers import create_openai_client
+from ..utils.resource_cache import get_resource_cache
+from ..utils.chunking import get_token_encoding
 import json
 
 class PineconeService:
     def __init__(self):
         """Pineconeサービスの初期化"""
         try:
-            # OpenAIクライアントの初期化
-            if not OPENAI_API_KEY:
-                raise ValueError("OpenAI APIキーが設定されていません")
-            self.openai_client = OpenAI(api_key=OPENAI_API_KEY)
+            # 埋め込みAPIクライアントの初期化（LLM_PROVIDERに応じてOpenAIまたはスタンドイン）
+            self.openai_client = create_openai_client()
             
-            # Pineconeの初期化
-            if not PINECONE_API_KEY:
-                raise ValueError("Pinecone APIキーが設定されていません")
-            if not PINECONE_INDEX_NAME:
-                raise ValueError("Pineconeインデックス名が設定されていません")
+            # 埋め込みキャッシュ（LangChainServiceと共有）
+            self.embedding_cache = get_embedding_cache()
+            self.query_cache = get_query_cache()
             
-            self.pc = Pinecone(api_key=PINECONE_API_KEY)
+            # 取り込み済みチャンクの記録（インデックスごとに区別する）
+            self.manifest = get_ingestion_manifest()
+            self.index_key = get_index_key()
             
-            # インデックスの存在確認と初期化
-            self._initialize_index()
+            # 本文などを保存する文書ストア（コンパクトなメタデータの場合に使用）
+            self.document_store = get_document_store()
+            
+            # キーワード検索の索引（アップロード・削除のたびに更新）
+            self.lexical_index = get_lexical_index() if LEXICAL_SEARCH_ENABLED else None
+            
+            if VECTOR_STORE_BACKEND == "local":
+                # ローカルのベクトルストアを使用（Pineconeには接続しない）
+                self.index = get_local_index()
+                print("ローカルのベクトルストアを使用します")
+            else:
+                # Pineconeの初期化
+                if not PINECONE_API_KEY:
+                    raise ValueError("Pinecone APIキーが設定されていません")
+                if not PINECONE_INDEX_NAME:
+                    raise ValueError("Pineconeインデックス名が設定されていません")
+                
+                self.pc = Pinecone(api_key=PINECONE_API_KEY)
+                
+                # インデックスの存在確認と初期化
+                self._initialize_index()
             
             # インデックスの次元数を取得
             stats = self.index.describe_index_stats()
@@ -61,7 +103,7 @@ class PineconeService:
                     )
                     self.pc.create_index(
                         name=PINECONE_INDEX_NAME,
-                        dimension=1536,  # OpenAIの埋め込みモデルの次元数
+                        dimension=EMBEDDING_DIMENSION,  # OpenAIの埋め込みモデルの次元数
                         metric="cosine",
                         spec=spec
                     )
@@ -90,6 +132,65 @@ class PineconeService:
 
     def get_embedding(self, text: str) -> List[float]:
         """テキストの埋め込みベクトルを取得"""
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """複数テキストの埋め込みベクトルをまとめて取得（入力順を保持）"""
+        if self.embedding_cache:
+            embeddings = self.embedding_cache.get_many(EMBEDDING_MODEL, texts)
+        else:
+            embeddings = [None] * len(texts)
+        
+        # キャッシュに無いテキストのみAPIで埋め込む
+        missing_indices = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        missing_texts = [texts[i] for i in missing_indices]
+        
+        # リクエスト上限に収まるサブバッチごとに埋め込みを取得
+        for start, end in self._split_embedding_requests(missing_texts):
+            sub_embeddings = self._create_embeddings(missing_texts[start:end])
+            for i, embedding in zip(missing_indices[start:end], sub_embeddings):
+                embeddings[i] = embedding
+            if self.embedding_cache:
+                self.embedding_cache.put_many(EMBEDDING_MODEL, missing_texts[start:end], sub_embeddings)
+        
+        return embeddings
+
+    def _split_embedding_requests(self, texts: List[str]) -> List[tuple]:
+        """入力数とトークン数の上限に収まるようにテキストを区切る"""
+        ranges = []
+        start = 0
+        request_tokens = 0
+        
+        for i, text in enumerate(texts):
+            text_tokens = self._count_embedding_tokens(text)
+            if i > start and (
+                i - start >= EMBEDDING_MAX_INPUTS_PER_REQUEST
+                or request_tokens + text_tokens > EMBEDDING_MAX_TOKENS_PER_REQUEST
+            ):
+                ranges.append((start, i))
+                start = i
+                request_tokens = 0
+            request_tokens += text_tokens
+        
+        if start < len(texts):
+            ranges.append((start, len(texts)))
+        
+        return ranges
+
+    @staticmethod
+    def _count_embedding_tokens(text: str) -> int:
+        """埋め込みAPIのトークン数の上限と比較するためのトークン数を取得
+        
+        tiktokenが利用できない場合は、UTF-8のバイト数を上限値として使う
+        （1トークンは1バイト以上のため、上限を超えることはない）。
+        """
+        encoding = get_token_encoding()
+        if encoding is None:
+            return len(text.encode("utf-8"))
+        return len(encoding.encode(text, disallowed_special=()))
+
+    def _create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """1リクエスト分のテキストを埋め込み（失敗時はこのサブバッチのみ再試行）"""
         max_retries = 3
         retry_delay = 1  # seconds
         
@@ -97,107 +198,415 @@ class PineconeService:
             try:
                 response = self.openai_client.embeddings.create(
                     model=EMBEDDING_MODEL,
-                    input=text
+                    input=texts
                 )
-                return response.data[0].embedding
+                # レスポンスの順序は保証されないためindexで並べ替える
+                data = sorted(response.data, key=lambda item: item.index)
+                return [item.embedding for item in data]
             except Exception as e:
                 if attempt < max_retries - 1:
-                    print(f"埋め込みベクトルの生成に失敗しました（試行 {attempt + 1}/{max_retries}）: {str(e)}")
+                    print(f"埋め込みベクトルの生成に失敗しました（試行 {attempt + 1}/{max_retries}、{len(texts)}件）: {str(e)}")
                     print(f"{retry_delay}秒後に再試行します...")
                     time.sleep(retry_delay)
                     retry_delay *= 2
                 else:
                     raise Exception(f"埋め込みベクトルの生成に失敗しました（最大試行回数到達）: {str(e)}")
 
-    def upload_chunks(self, chunks: List[Dict[str, Any]], namespace: str = None, batch_size: int = BATCH_SIZE) -> None:
-        """チャンクをPineconeにアップロード"""
-        if not chunks:
+    def _build_vector_metadata(self, chunk: Dict[str, Any]) -> Dict[str, Any]:
+        """チャンクからベクトルのメタデータを作成"""
+        # メタデータの設定（CSVファイルのメタデータを含める）
+        return {
+            "text": chunk["text"],
+            "filename": chunk["metadata"].get("filename", ""),  # メタデータからファイル名を取得
+            "main_category": chunk["metadata"].get("main_category", ""),
+            "sub_category": chunk["metadata"].get("sub_category", ""),
+            "city": chunk["metadata"].get("city", ""),
+            "created_date": chunk["metadata"].get("created_date", ""),
+            "upload_date": chunk["metadata"].get("upload_date", ""),
+            # 日付の範囲で絞り込むためのアップロード日時（UNIX時刻）
+            "upload_ts": to_timestamp(chunk["metadata"].get("upload_date")) or time.time(),
+            "source": chunk["metadata"].get("source", ""),
+            # CSVファイルのメタデータ
+            "facility_name": chunk["metadata"].get("facility_name", ""),
+            "latitude": chunk["metadata"].get("latitude", 0.0),
+            "longitude": chunk["metadata"].get("longitude", 0.0),
+            "walking_distance": chunk["metadata"].get("walking_distance", 0),
+            "walking_minutes": chunk["metadata"].get("walking_minutes", 0),
+            "straight_distance": chunk["metadata"].get("straight_distance", 0)
+        }
+
+    def upload_chunks(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        namespace: str = None,
+        batch_size: int = BATCH_SIZE,
+        progress_callback: Optional[Callable[[int, Optional[int]], None]] = None,
+        embed_concurrency: int = EMBED_CONCURRENCY,
+        upsert_concurrency: int = UPSERT_CONCURRENCY,
+        source_id: Optional[str] = None,
+        job_id: Optional[str] = None
+    ) -> int:
+        """チャンクをPineconeにアップロードし、アップロードした件数を返す
+        
+        埋め込み生成とアップロードをパイプライン化し、バッチN+1の埋め込みと
+        バッチNのアップロードを並行して実行する。処理中のバッチ数は
+        embed_concurrency + upsert_concurrency 件までに制限される。
+        progress_callback(完了件数, 総件数) は呼び出し元のスレッドから呼ばれる
+        （総件数が不明なイテレータの場合はNone）。
+        
+        source_id（ファイル名など取り込み元を表す文字列）を指定した場合は、
+        チャンクIDをソースと内容から決定的に作成し、前回の取り込みから
+        変更のないチャンクはスキップする。アップロード完了後、今回の
+        取り込みに含まれなかった前回のチャンクは削除する。
+        
+        job_id を指定した場合は、完了したバッチをチェックポイントに記録し、
+        中断したジョブを同じjob_idで再実行すると続きのバッチから再開する。
+        失敗したチャンクは INGESTION_RETRY_PASSES 回まで1件ずつ再試行し、
+        それでも失敗したものはデッドレターとして記録する（get_dead_letters で取得）。
+        """
+        previous_ids = None
+        current_ids = []
+        if source_id is not None:
+            previous_ids = self.manifest.get_chunk_ids(self.index_key, namespace, source_id)
+            is_sized = hasattr(chunks, "__len__")
+            chunks = self._iter_changed_chunks(chunks, source_id, previous_ids, current_ids)
+            if is_sized:
+                chunks = list(chunks)
+        
+        total_chunks = len(chunks) if hasattr(chunks, "__len__") else None
+        if total_chunks == 0 and source_id is None and job_id is None:
             print("アップロードするチャンクがありません")
-            return
+            return 0
+
+        checkpoint = None
+        if job_id is not None:
+            checkpoint = IngestionCheckpoint(job_id)
+            checkpoint.start(namespace=namespace or "", source_id=source_id, batch_size=batch_size)
 
         try:
-            total_chunks = len(chunks)
-            print(f"アップロード開始: 合計{total_chunks}件のチャンク")
+            print(f"アップロード開始: 合計{total_chunks if total_chunks is not None else '不明'}件のチャンク")
             
-            # チャンクをバッチに分割
-            for i in range(0, len(chunks), batch_size):
-                batch = chunks[i:i + batch_size]
-                batch_num = i // batch_size + 1
-                print(f"\nバッチ {batch_num} を処理中... ({len(batch)}件)")
-                
-                # バッチ内の各チャンクの埋め込みベクトルを取得
-                vectors = []
-                retry_chunks = []  # 再試行が必要なチャンク
-                
-                for j, chunk in enumerate(batch, 1):
+            uploaded = 0
+            
+            def on_uploaded(count: int) -> None:
+                nonlocal uploaded
+                uploaded += count
+                if progress_callback:
+                    progress_callback(uploaded, total_chunks)
+            
+            failed_chunks = self._run_upload_pipeline(
+                chunks, namespace, batch_size, embed_concurrency, upsert_concurrency,
+                on_uploaded, checkpoint, pass_num=0
+            )
+            
+            # 失敗したチャンクを1件ずつ再試行（回数に上限を設ける）
+            for pass_num in range(1, INGESTION_RETRY_PASSES + 1):
+                if not failed_chunks:
+                    break
+                print(f"\n失敗したチャンク {len(failed_chunks)}件 を再試行します...（{pass_num}/{INGESTION_RETRY_PASSES}回目）")
+                failed_chunks = self._run_upload_pipeline(
+                    [chunk for chunk, _ in failed_chunks], namespace, 1, embed_concurrency, upsert_concurrency,
+                    on_uploaded, checkpoint, pass_num=pass_num
+                )
+            
+            # 再試行しても失敗したチャンクはデッドレターとして記録
+            dead_ids = set()
+            if failed_chunks:
+                print(f"\n{len(failed_chunks)}件のチャンクをアップロードできませんでした（デッドレターとして記録）")
+                for chunk, error in failed_chunks:
+                    dead_ids.add(chunk["id"])
+                    if checkpoint:
+                        checkpoint.add_dead_letter(chunk, error)
+            
+            if source_id is not None:
+                # アップロードできなかったチャンクは取り込み済みとして記録しない（次回の取り込みで再試行される）
+                self._remove_stale_chunks(
+                    namespace, source_id, previous_ids,
+                    [chunk_id for chunk_id in current_ids if chunk_id not in dead_ids]
+                )
+            
+            if checkpoint:
+                checkpoint.finish(uploaded)
+            
+            print("\nアップロード完了")
+            return uploaded
+            
+        except Exception as e:
+            raise Exception(f"チャンクのアップロードに失敗しました: {str(e)}")
+        finally:
+            # インデックスの内容が変わったため、キャッシュ済みの検索結果を無効化
+            bump_index_generation()
+
+    def _run_upload_pipeline(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        namespace: str,
+        batch_size: int,
+        embed_concurrency: int,
+        upsert_concurrency: int,
+        on_uploaded: Callable[[int], None],
+        checkpoint: Optional[IngestionCheckpoint] = None,
+        pass_num: int = 0
+    ) -> List[Tuple[Dict[str, Any], str]]:
+        """埋め込み生成とアップロードのパイプラインを実行し、失敗したチャンクとエラー内容を返す
+        
+        チェックポイントに記録済みのバッチはスキップし、アップロードが完了した
+        バッチは on_uploaded(件数) を呼んだうえでチェックポイントに記録する。
+        
+        埋め込みはアップロードのバッチ（batch_size件）ごとではなく、連続する
+        複数のバッチを埋め込みAPIの入力数・トークン数の上限までまとめて
+        1リクエストで取得する。再試行（pass_num > 0）では、失敗したチャンクが
+        他のチャンクを巻き込まないようにバッチごとに埋め込む。
+        """
+        failed_chunks = []  # (チャンク, エラー内容)
+        embed_pending = deque()  # ([(バッチ番号, バッチ)], Future)
+        upsert_pending = deque()  # (バッチ番号, バッチ, Future)
+        resumed = 0
+        
+        with ThreadPoolExecutor(max_workers=embed_concurrency) as embed_executor, \
+                ThreadPoolExecutor(max_workers=upsert_concurrency) as upsert_executor:
+            
+            def drain_upserts(limit: int) -> None:
+                """実行中のアップロードがlimit件以下になるまで待機"""
+                while len(upsert_pending) > limit:
+                    batch_num, batch, future = upsert_pending.popleft()
                     try:
-                        print(f"  チャンク {j}/{len(batch)} の埋め込みベクトルを生成中...")
-                        vector = self.get_embedding(chunk["text"])
-                        
-                        # メタデータの設定（CSVファイルのメタデータを含める）
-                        metadata = {
-                            "text": chunk["text"],
-                            "filename": chunk["metadata"].get("filename", ""),  # メタデータからファイル名を取得
-                            "main_category": chunk["metadata"].get("main_category", ""),
-                            "sub_category": chunk["metadata"].get("sub_category", ""),
-                            "city": chunk["metadata"].get("city", ""),
-                            "created_date": chunk["metadata"].get("created_date", ""),
-                            "upload_date": chunk["metadata"].get("upload_date", ""),
-                            "source": chunk["metadata"].get("source", ""),
-                            # CSVファイルのメタデータ
-                            "facility_name": chunk["metadata"].get("facility_name", ""),
-                            "latitude": chunk["metadata"].get("latitude", 0.0),
-                            "longitude": chunk["metadata"].get("longitude", 0.0),
-                            "walking_distance": chunk["metadata"].get("walking_distance", 0),
-                            "walking_minutes": chunk["metadata"].get("walking_minutes", 0),
-                            "straight_distance": chunk["metadata"].get("straight_distance", 0)
-                        }
-                        
-                        # デバッグ情報の表示
-                        print(f"  メタデータ: {json.dumps(metadata, ensure_ascii=False)}")
-                        
-                        vectors.append({
-                            "id": chunk["id"],
-                            "values": vector,
-                            "metadata": metadata
-                        })
+                        future.result()
                     except Exception as e:
-                        print(f"  チャンク {chunk['id']} の処理中にエラーが発生しました: {str(e)}")
-                        retry_chunks.append(chunk)
+                        print(f"  バッチ {batch_num} のアップロード中にエラーが発生しました: {str(e)}")
+                        failed_chunks.extend((chunk, str(e)) for chunk in batch)
+                        continue
+                    if checkpoint:
+                        checkpoint.commit_batch(pass_num, batch_num, [chunk["id"] for chunk in batch])
+                    on_uploaded(len(batch))
+            
+            def drain_embeddings(limit: int) -> None:
+                """実行中の埋め込みがlimit件以下になるまで待機し、完了分をアップロードに回す"""
+                while len(embed_pending) > limit:
+                    group, future = embed_pending.popleft()
+                    try:
+                        vectors = future.result()
+                    except Exception as e:
+                        for batch_num, batch in group:
+                            print(f"  バッチ {batch_num} の処理中にエラーが発生しました: {str(e)}")
+                            failed_chunks.extend((chunk, str(e)) for chunk in batch)
                         continue
-                
-                if vectors:
-                    max_retries = 3
-                    retry_delay = 2
                     
-                    for attempt in range(max_retries):
-                        try:
-                            # バッチをアップロード（namespaceを指定）
-                            print(f"  {len(vectors)}件のベクトルをアップロード中...")
-                            self.index.upsert(vectors=vectors, namespace=namespace)
-                            print(f"  バッチ {batch_num} のアップロードが完了しました")
-                            break
-                        except Exception as e:
-                            if attempt < max_retries - 1:
-                                print(f"  バッチ {batch_num} のアップロードに失敗しました（試行 {attempt + 1}/{max_retries}）: {str(e)}")
-                                print(f"  {retry_delay}秒後に再試行します...")
-                                time.sleep(retry_delay)
-                                retry_delay *= 2
-                            else:
-                                raise Exception(f"バッチ {batch_num} のアップロードに失敗しました（最大試行回数到達）: {str(e)}")
-                
-                # 失敗したチャンクを再試行
-                if retry_chunks:
-                    print(f"\n失敗したチャンク {len(retry_chunks)}件 を再試行します...")
-                    self.upload_chunks(retry_chunks, namespace, batch_size)
+                    # まとめて埋め込んだベクトルをアップロードのバッチに分け直す
+                    offset = 0
+                    for batch_num, batch in group:
+                        batch_vectors = vectors[offset:offset + len(batch)]
+                        offset += len(batch)
+                        # アップロード側が詰まっている場合はここで待機（バックプレッシャー）
+                        drain_upserts(upsert_concurrency - 1)
+                        upsert_pending.append((
+                            batch_num,
+                            batch,
+                            upsert_executor.submit(self._upsert_vectors, batch_vectors, namespace, batch_num)
+                        ))
             
-            print("\nアップロード完了")
+            def iter_pending_batches() -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+                """前回の実行でアップロード済みのバッチを除いて、バッチ番号とバッチを返す"""
+                nonlocal resumed
+                for batch_num, batch in enumerate(self._iter_batches(chunks, batch_size), 1):
+                    if checkpoint and checkpoint.is_committed(pass_num, batch_num, [chunk["id"] for chunk in batch]):
+                        resumed += 1
+                        on_uploaded(len(batch))
+                        continue
+                    yield batch_num, batch
             
-        except Exception as e:
-            raise Exception(f"チャンクのアップロードに失敗しました: {str(e)}")
+            max_inputs = EMBEDDING_MAX_INPUTS_PER_REQUEST if pass_num == 0 else 1
+            for group in self._iter_embedding_groups(iter_pending_batches(), max_inputs):
+                drain_embeddings(embed_concurrency - 1)
+                group_chunks = [chunk for _, batch in group for chunk in batch]
+                first_num, last_num = group[0][0], group[-1][0]
+                batch_label = f"バッチ {first_num}" if first_num == last_num else f"バッチ {first_num}〜{last_num}"
+                print(f"\n{batch_label} を処理中... ({len(group_chunks)}件)")
+                embed_pending.append((group, embed_executor.submit(self._embed_batch, group_chunks)))
+            
+            drain_embeddings(0)
+            drain_upserts(0)
+        
+        if resumed:
+            print(f"アップロード済みのバッチ {resumed}件 をスキップしました")
+        return failed_chunks
+
+    def _iter_changed_chunks(
+        self,
+        chunks: Iterable[Dict[str, Any]],
+        source_id: str,
+        previous_ids: set,
+        current_ids: List[str]
+    ) -> Iterator[Dict[str, Any]]:
+        """チャンクに決定的なIDを付与し、前回の取り込みから変更のないチャンクを除外
+        
+        付与したIDはすべて current_ids に追加する。
+        """
+        occurrences = {}
+        skipped = 0
+        for chunk in chunks:
+            metadata = chunk.get("metadata", {})
+            chunk_id = make_chunk_id(source_id, chunk["text"], metadata)
+            # 同じ内容のチャンクが複数ある場合は出現順で区別する
+            occurrence = occurrences.get(chunk_id, 0)
+            occurrences[chunk_id] = occurrence + 1
+            if occurrence:
+                chunk_id = make_chunk_id(source_id, chunk["text"], metadata, occurrence)
+            
+            current_ids.append(chunk_id)
+            if chunk_id in previous_ids:
+                skipped += 1
+                continue
+            yield {**chunk, "id": chunk_id}
+        
+        if skipped:
+            print(f"変更のないチャンク {skipped}件 をスキップしました")
+
+    def _remove_stale_chunks(self, namespace: str, source_id: str, previous_ids: set, current_ids: List[str]) -> None:
+        """前回の取り込みにあり今回含まれなかったチャンクを削除し、取り込み済みの記録を更新"""
+        stale_ids = sorted(previous_ids - set(current_ids))
+        for i in range(0, len(stale_ids), BATCH_SIZE):
+            self.index.delete(ids=stale_ids[i:i + BATCH_SIZE], namespace=namespace)
+        self.document_store.delete_many(self.index_key, namespace, stale_ids)
+        if self.lexical_index:
+            self.lexical_index.delete_documents(self.index_key, namespace, stale_ids)
+        if stale_ids:
+            print(f"不要になったチャンク {len(stale_ids)}件 を削除しました")
+        
+        self.manifest.replace_source(self.index_key, namespace, source_id, current_ids)
 
-    def query(self, query_text: str, namespace: str = None, top_k: int = DEFAULT_TOP_K, similarity_threshold: float = SIMILARITY_THRESHOLD) -> Dict[str, Any]:
-        """クエリに基づいて類似チャンクを検索"""
+    @staticmethod
+    def _iter_batches(chunks: Iterable[Dict[str, Any]], batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+        """チャンクを先頭から順にバッチへまとめる（イテレータも逐次処理）"""
+        iterator = iter(chunks)
+        while True:
+            batch = list(islice(iterator, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def _iter_embedding_groups(
+        self,
+        batches: Iterable[Tuple[int, List[Dict[str, Any]]]],
+        max_inputs: int = EMBEDDING_MAX_INPUTS_PER_REQUEST
+    ) -> Iterator[List[Tuple[int, List[Dict[str, Any]]]]]:
+        """連続するバッチを、埋め込みAPIの1リクエストの入力数・トークン数の上限までまとめる
+        
+        1つのバッチだけで上限を超える場合はそのバッチ単独のグループとし、
+        リクエストの分割は get_embeddings に任せる。
+        """
+        group = []
+        group_inputs = 0
+        group_tokens = 0
+        
+        for batch_num, batch in batches:
+            batch_tokens = sum(self._count_embedding_tokens(chunk["text"]) for chunk in batch)
+            if group and (
+                group_inputs + len(batch) > max_inputs
+                or group_tokens + batch_tokens > EMBEDDING_MAX_TOKENS_PER_REQUEST
+            ):
+                yield group
+                group = []
+                group_inputs = 0
+                group_tokens = 0
+            group.append((batch_num, batch))
+            group_inputs += len(batch)
+            group_tokens += batch_tokens
+        
+        if group:
+            yield group
+
+    def _embed_batch(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """バッチ内のチャンクの埋め込みをまとめて取得し、アップロード用のベクトルを作成"""
+        embeddings = self.get_embeddings([chunk["text"] for chunk in batch])
+        
+        vectors = []
+        for chunk, vector in zip(batch, embeddings):
+            metadata = self._build_vector_metadata(chunk)
+            
+            # デバッグ情報の表示
+            print(f"  メタデータ: {json.dumps(metadata, ensure_ascii=False)}")
+            
+            vectors.append({
+                "id": chunk["id"],
+                "values": vector,
+                "metadata": metadata
+            })
+        return vectors
+
+    def _upsert_vectors(self, vectors: List[Dict[str, Any]], namespace: str, batch_num: int) -> None:
+        """ベクトルのバッチをアップロード（失敗時は再試行）"""
+        # キーワード検索の索引には本文を含むメタデータで登録する
+        documents = [(vector["id"], vector["metadata"]) for vector in vectors]
+        if COMPACT_METADATA:
+            vectors = self._store_documents(vectors, namespace)
+        
+        max_retries = 3
+        retry_delay = 2
+        
+        for attempt in range(max_retries):
+            try:
+                # バッチをアップロード（namespaceを指定）
+                print(f"  {len(vectors)}件のベクトルをアップロード中...")
+                self.index.upsert(vectors=vectors, namespace=namespace)
+                print(f"  バッチ {batch_num} のアップロードが完了しました")
+                break
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    print(f"  バッチ {batch_num} のアップロードに失敗しました（試行 {attempt + 1}/{max_retries}）: {str(e)}")
+                    print(f"  {retry_delay}秒後に再試行します...")
+                    time.sleep(retry_delay)
+                    retry_delay *= 2
+                else:
+                    raise Exception(f"バッチ {batch_num} のアップロードに失敗しました（最大試行回数到達）: {str(e)}")
+        
+        # キーワード検索の索引を更新（失敗してもアップロードは成功として扱い、索引の再構築で復旧する）
+        if self.lexical_index:
+            try:
+                self.lexical_index.add_documents(self.index_key, namespace, documents)
+            except Exception as e:
+                print(f"  バッチ {batch_num} をキーワード検索の索引に登録できませんでした: {str(e)}")
+
+    def _store_documents(self, vectors: List[Dict[str, Any]], namespace: str) -> List[Dict[str, Any]]:
+        """本文などを文書ストアに保存し、絞り込みに使う項目のみをメタデータに持つベクトルを返す
+        
+        検索時に本文が欠けないよう、文書ストアへの保存はアップロードより先に行う。
+        """
+        documents = {}
+        compact_vectors = []
+        for vector in vectors:
+            compact, document = split_metadata(vector["metadata"])
+            documents[vector["id"]] = document
+            compact_vectors.append({**vector, "metadata": compact})
+        self.document_store.put_many(self.index_key, namespace, documents)
+        return compact_vectors
+
+    def hydrate_metadata(self, records: List[Tuple[str, Dict[str, Any]]], namespace: str = None) -> List[Dict[str, Any]]:
+        """（ベクトルID, メタデータ）の一覧に文書ストアの本文などをまとめて補完"""
+        return self.document_store.hydrate(self.index_key, namespace, records)
+
+    def query(
+        self,
+        query_text: str,
+        namespace: str = None,
+        top_k: int = DEFAULT_TOP_K,
+        similarity_threshold: float = SIMILARITY_THRESHOLD,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        fallback_unfiltered: bool = True
+    ) -> Dict[str, Any]:
+        """クエリに基づいて類似チャンクを検索
+        
+        metadata_filter（build_metadata_filter で作成）を指定した場合はインデックスの
+        検索で絞り込む。条件に一致する候補が無い場合は、fallback_unfiltered が True
+        なら条件なしで再検索する（結果の "filter" は実際に適用した条件）。
+        """
+        cache_key = make_query_cache_key("pinecone", query_text, namespace, top_k, similarity_threshold, metadata_filter)
+        if self.query_cache:
+            cached = self.query_cache.get(cache_key)
+            if cached is not None:
+                print(f"検索結果キャッシュを使用: {query_text}")
+                return cached
+        
         max_retries = 3
         retry_delay = 1
         
@@ -208,41 +617,38 @@ class PineconeService:
                 print(f"検索クエリ: {query_text}")
                 print(f"類似度しきい値: {similarity_threshold}")
                 print(f"取得する候補数: {top_k * 2}")
+                if metadata_filter:
+                    print(f"絞り込み条件: {describe_filter(metadata_filter)}")
                 
-                # より多くの候補を取得（フィルタリング用）
-                results = self.index.query(
-                    vector=query_vector,
-                    top_k=top_k * 2,  # フィルタリング用に2倍取得
-                    include_metadata=True,
-                    namespace=namespace  # namespaceを指定
+                applied_filter = metadata_filter
+                total_matches, filtered_matches = self._query_matches(
+                    query_vector, namespace, top_k, similarity_threshold, metadata_filter
                 )
+                if metadata_filter and not filtered_matches and fallback_unfiltered:
+                    print("絞り込み条件に一致する候補が無いため、条件なしで再検索します")
+                    applied_filter = None
+                    total_matches, filtered_matches = self._query_matches(
+                        query_vector, namespace, top_k, similarity_threshold
+                    )
                 
-                print(f"取得した候補数: {len(results.matches)}")
-                if results.matches:
-                    print("候補のスコア:")
-                    for match in results.matches:
-                        print(f"スコア: {match.score:.3f}")
-                
-                # 類似度でフィルタリング
-                filtered_matches = [
-                    match for match in results.matches
-                    if match.score >= similarity_threshold
-                ]
-                
-                print(f"フィルタリング後の候補数: {len(filtered_matches)}")
-                
-                # 上位K件に制限
-                filtered_matches = filtered_matches[:top_k]
+                # 文書ストアから本文などを補完
+                hydrated = self.hydrate_metadata([(match.id, match.metadata) for match in filtered_matches], namespace)
+                for match, metadata in zip(filtered_matches, hydrated):
+                    match.metadata = metadata
                 
                 print(f"最終的な検索結果数: {len(filtered_matches)}")
                 for match in filtered_matches:
-                    print(f"スコア: {match.score:.3f}, テキスト: {match.metadata['text'][:100]}...")
+                    print(f"スコア: {match.score:.3f}, テキスト: {match.metadata.get('text', '')[:100]}...")
                 
-                return {
+                result = {
                     "matches": filtered_matches,
-                    "total_matches": len(results.matches),
-                    "filtered_matches": len(filtered_matches)
+                    "total_matches": total_matches,
+                    "filtered_matches": len(filtered_matches),
+                    "filter": applied_filter
                 }
+                if self.query_cache:
+                    self.query_cache.put(cache_key, result)
+                return result
                 
             except Exception as e:
                 if attempt < max_retries - 1:
@@ -253,6 +659,108 @@ class PineconeService:
                 else:
                     raise Exception(f"検索クエリの実行に失敗しました（最大試行回数到達）: {str(e)}")
 
+    def lexical_query(
+        self,
+        query_text: str,
+        namespace: str = None,
+        top_k: int = DEFAULT_TOP_K,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        fallback_unfiltered: bool = True
+    ) -> List[Any]:
+        """キーワード検索（BM25）で上位top_k件を検索（キーワード検索が無効な場合は空）"""
+        if not self.lexical_index:
+            return []
+        matches = self.lexical_index.search(self.index_key, namespace, query_text, top_k, metadata_filter)
+        if metadata_filter and not matches and fallback_unfiltered:
+            matches = self.lexical_index.search(self.index_key, namespace, query_text, top_k)
+        return matches
+
+    def hybrid_query(
+        self,
+        query_text: str,
+        namespace: str = None,
+        top_k: int = DEFAULT_TOP_K,
+        similarity_threshold: float = SIMILARITY_THRESHOLD,
+        metadata_filter: Optional[Dict[str, Any]] = None,
+        fallback_unfiltered: bool = True
+    ) -> Dict[str, Any]:
+        """ベクトル検索とキーワード検索を並行して実行し、RRFで統合した上位top_k件を返す
+        
+        施設名・駅名・数値などの完全一致はキーワード検索で補う。ベクトル検索が
+        一定時間内に終わらない場合はキーワード検索の結果のみを返す。結果の
+        "matches" は query と同じく id / score / metadata で参照でき、score は
+        それぞれの検索のスコア（類似度またはBM25）。
+        """
+        lexical_search = None
+        if self.lexical_index:
+            lexical_search = lambda: self.lexical_query(query_text, namespace, top_k, metadata_filter, fallback_unfiltered)
+        
+        hybrid = run_hybrid_search(
+            lambda: self.query(query_text, namespace, top_k, similarity_threshold, metadata_filter, fallback_unfiltered)["matches"],
+            lexical_search,
+            key=lambda match: match.id,
+            top_k=top_k
+        )
+        print(f"検索方法: {hybrid['mode']}、検索ごとの所要時間（秒）: {hybrid['latency']}")
+        return {
+            "matches": [entry["item"] for entry in hybrid["results"]],
+            "ranks": [entry["ranks"] for entry in hybrid["results"]],
+            "mode": hybrid["mode"],
+            "latency": hybrid["latency"],
+            "vector_timed_out": hybrid["vector_timed_out"]
+        }
+
+    def rebuild_lexical_index(self, namespace: str = None) -> int:
+        """インデックスに保存済みのベクトルからキーワード検索の索引を作り直し、登録件数を返す"""
+        if not self.lexical_index:
+            return 0
+        self.lexical_index.clear(self.index_key, namespace)
+        count = 0
+        for batch in self._iter_batches(self.iter_vectors(namespace=namespace), FETCH_BATCH_SIZE):
+            self.lexical_index.add_documents(
+                self.index_key,
+                namespace,
+                [(vector["id"], vector["metadata"]) for vector in batch]
+            )
+            count += len(batch)
+        print(f"キーワード検索の索引を再構築しました（{count}件）")
+        return count
+
+    def _query_matches(
+        self,
+        query_vector: List[float],
+        namespace: str,
+        top_k: int,
+        similarity_threshold: float,
+        metadata_filter: Optional[Dict[str, Any]] = None
+    ) -> Tuple[int, List[Any]]:
+        """インデックスを検索し、（候補数, しきい値以上の上位top_k件）を返す"""
+        # より多くの候補を取得（フィルタリング用）
+        results = self.index.query(
+            vector=query_vector,
+            top_k=top_k * 2,  # フィルタリング用に2倍取得
+            include_metadata=True,
+            namespace=namespace,  # namespaceを指定
+            filter=metadata_filter
+        )
+        
+        print(f"取得した候補数: {len(results.matches)}")
+        if results.matches:
+            print("候補のスコア:")
+            for match in results.matches:
+                print(f"スコア: {match.score:.3f}")
+        
+        # 類似度でフィルタリング
+        filtered_matches = [
+            match for match in results.matches
+            if match.score >= similarity_threshold
+        ]
+        
+        print(f"フィルタリング後の候補数: {len(filtered_matches)}")
+        
+        # 上位K件に制限
+        return len(results.matches), filtered_matches[:top_k]
+
     def get_index_stats(self, namespace: str = None) -> Dict[str, Any]:
         """インデックスの統計情報を取得"""
         max_retries = 3
@@ -274,46 +782,90 @@ class PineconeService:
                 else:
                     raise Exception(f"統計情報の取得に失敗しました（最大試行回数到達）: {str(e)}")
 
+    def get_cached_index_stats(self, namespace: str = None) -> Dict[str, Any]:
+        """インデックスの統計情報を取得（画面表示用。一定時間キャッシュし、アップロード・クリア時は再取得）"""
+        return get_resource_cache().get_value(
+            ("index_stats", self.index_key, namespace),
+            lambda: self.get_index_stats(namespace),
+            INDEX_STATS_CACHE_TTL_SECONDS,
+            version=get_index_generation()
+        )
+
     def clear_index(self, namespace: str = None) -> None:
         """インデックスをクリア"""
         try:
             self.index.delete(delete_all=True, namespace=namespace)
+            self.manifest.clear(self.index_key, namespace)
+            self.document_store.clear(self.index_key, namespace)
+            if self.lexical_index:
+                self.lexical_index.clear(self.index_key, namespace)
+            bump_index_generation()
             print(f"インデックスをクリアしました（namespace: {namespace if namespace else 'default'}）")
         except Exception as e:
             raise Exception(f"インデックスのクリアに失敗しました: {str(e)}")
 
-    def get_index_data(self) -> List[Dict]:
-        """インデックスのデータを取得"""
-        try:
-            # 全ベクトルを取得
-            results = self.index.query(
-                vector=[0] * 1536,  # ダミーベクトル
-                top_k=10000,  # より多くのデータを取得
-                include_metadata=True,
-                namespace=""
-            )
-            
-            data = []
-            for match in results.matches:
-                if 'metadata' in match:
-                    metadata = match['metadata']
-                    # 必要なメタデータを抽出（テキストを含める）
-                    item = {
-                        'text': metadata.get('text', ''),  # テキストデータを追加
-                        'filename': metadata.get('filename', ''),
-                        'main_category': metadata.get('main_category', ''),
-                        'sub_category': metadata.get('sub_category', ''),
-                        'city': metadata.get('city', ''),
-                        'created_date': metadata.get('created_date', ''),
-                        'upload_date': metadata.get('upload_date', ''),
-                        'source': metadata.get('source', '')
+    def iter_vectors(self, namespace: str = None, page_size: int = LIST_PAGE_SIZE, fetch_batch_size: int = FETCH_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """namespace内のベクトルを順に取得するジェネレータ
+        
+        IDをページ単位で列挙し、メタデータは fetch_batch_size 件ずつ取得するため、
+        件数に関わらずメモリ使用量は一定に保たれる。
+        """
+        for id_page in self.index.list(namespace=namespace or "", limit=page_size):
+            for i in range(0, len(id_page), fetch_batch_size):
+                ids = id_page[i:i + fetch_batch_size]
+                vectors = self._fetch_vectors(ids, namespace)
+                found_ids = [vector_id for vector_id in ids if vector_id in vectors]
+                # 文書ストアから本文などを補完
+                hydrated = self.hydrate_metadata(
+                    [(vector_id, vectors[vector_id].metadata) for vector_id in found_ids],
+                    namespace
+                )
+                for vector_id, metadata in zip(found_ids, hydrated):
+                    yield {
+                        "id": vector_id,
+                        "metadata": metadata
                     }
-                    data.append(item)
-            
-            return data
+
+    def _fetch_vectors(self, ids: List[str], namespace: str = None) -> Dict[str, Any]:
+        """IDを指定してベクトルを取得（失敗時は再試行）"""
+        max_retries = 3
+        retry_delay = 1
+        
+        for attempt in range(max_retries):
+            try:
+                return self.index.fetch(ids=ids, namespace=namespace or "").vectors
+            except Exception as e:
+                if attempt < max_retries - 1:
+                    print(f"ベクトルの取得に失敗しました（試行 {attempt + 1}/{max_retries}）: {str(e)}")
+                    print(f"{retry_delay}秒後に再試行します...")
+                    time.sleep(retry_delay)
+                    retry_delay *= 2
+                else:
+                    raise Exception(f"ベクトルの取得に失敗しました（最大試行回数到達）: {str(e)}")
+
+    def iter_index_data(self, namespace: str = "") -> Iterator[Dict[str, Any]]:
+        """インデックスのデータを1件ずつ取得"""
+        try:
+            for vector in self.iter_vectors(namespace=namespace):
+                metadata = vector["metadata"]
+                # 必要なメタデータを抽出（テキストを含める）
+                yield {
+                    'text': metadata.get('text', ''),  # テキストデータを追加
+                    'filename': metadata.get('filename', ''),
+                    'main_category': metadata.get('main_category', ''),
+                    'sub_category': metadata.get('sub_category', ''),
+                    'city': metadata.get('city', ''),
+                    'created_date': metadata.get('created_date', ''),
+                    'upload_date': metadata.get('upload_date', ''),
+                    'source': metadata.get('source', '')
+                }
         except Exception as e:
             raise Exception(f"インデックスデータの取得に失敗しました: {str(e)}")
 
+    def get_index_data(self) -> List[Dict]:
+        """インデックスのデータを取得"""
+        return list(self.iter_index_data())
+
     def get_stats(self, namespace: str = None) -> dict:
         """指定されたnamespaceの統計情報を取得"""
         try:
@@ -325,16 +877,9 @@ class PineconeService:
             raise Exception(f"統計情報の取得に失敗しました: {str(e)}")
 
     def list_vectors(self, namespace: str = None, limit: int = 1000) -> list:
-        """指定されたnamespaceのベクトルを取得"""
+        """指定されたnamespaceのベクトルを取得（最大limit件）"""
         try:
-            # 空のクエリで全ベクトルを取得
-            results = self.index.query(
-                vector=[0] * 1536,  # ダミーベクトル（次元数はモデルに依存）
-                top_k=limit,
-                include_metadata=True,
-                namespace=namespace
-            )
-            return results.matches
+            return list(islice(self.iter_vectors(namespace=namespace), limit))
         except Exception as e:
             raise Exception(f"ベクトルの取得に失敗しました: {str(e)}")
 
@@ -349,13 +894,14 @@ class PineconeService:
                 
             # 最初のベクトルを取得
             vector = result.vectors[vector_id]
+            metadata = self.hydrate_metadata([(vector.id, vector.metadata)], namespace)[0]
             
             # 結果を整形
             return {
                 "id": vector.id,
                 "values": vector.values,
-                "metadata": vector.metadata,
-                "text": vector.metadata.get("text", "")
+                "metadata": metadata,
+                "text": metadata.get("text", "")
             }
         except Exception as e:
             print(f"ベクトルの取得中にエラーが発生しました: {str(e)}")
@@ -0,0 +1,151 @@
+"""
+埋め込み・チャットモデルのプロバイダを切り替えるモジュール
+
+LLM_PROVIDER が "openai" の場合はOpenAIのクライアントを、"fake" の場合は
+ネットワークを使わない決定的なスタンドインを返す。スタンドインは
+ベンチマークやテストで、API遅延を除いた自前の処理時間を計測するために使う。
+"""
+
+from typing import List, Any, Optional, Iterator
+from types import SimpleNamespace
+import hashlib
+import re
+import time
+import numpy as np
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from openai import OpenAI
+from ..config.settings import (
+    OPENAI_API_KEY,
+    EMBEDDING_MODEL,
+    EMBEDDING_DIMENSION,
+    LLM_PROVIDER,
+    FAKE_LLM_LATENCY_SECONDS,
+    FAKE_EMBEDDING_LATENCY_SECONDS
+)
+
+def fake_embedding(text: str, dimension: int = EMBEDDING_DIMENSION) -> List[float]:
+    """テキストのハッシュを乱数シードにした決定的な埋め込みベクトルを作成"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(dimension).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector.tolist()
+
+class _FakeEmbeddingsAPI:
+    """OpenAIクライアントの embeddings.create と同じ形式の応答を返すスタンドイン"""
+
+    def __init__(self, dimension: int, latency: float):
+        self.dimension = dimension
+        self.latency = latency
+
+    def create(self, model: str, input: Any, **kwargs) -> SimpleNamespace:
+        texts = [input] if isinstance(input, str) else list(input)
+        if self.latency:
+            time.sleep(self.latency)
+        return SimpleNamespace(
+            model=model,
+            data=[
+                SimpleNamespace(index=i, embedding=fake_embedding(text, self.dimension))
+                for i, text in enumerate(texts)
+            ]
+        )
+
+class FakeOpenAIClient:
+    """埋め込みAPIのみを提供するOpenAIクライアントのスタンドイン"""
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, latency: float = FAKE_EMBEDDING_LATENCY_SECONDS):
+        self.embeddings = _FakeEmbeddingsAPI(dimension, latency)
+
+class FakeEmbeddings(Embeddings):
+    """LangChainの埋め込みインターフェースのスタンドイン"""
+
+    def __init__(self, dimension: int = EMBEDDING_DIMENSION, latency: float = FAKE_EMBEDDING_LATENCY_SECONDS):
+        self.dimension = dimension
+        self.latency = latency
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.latency:
+            time.sleep(self.latency)
+        return [fake_embedding(text, self.dimension) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+class FakeChatModel(BaseChatModel):
+    """プロンプトの種類に応じた定型の応答を返すチャットモデルのスタンドイン
+
+    - 質問タイプの分類（カテゴリ名のみ / JSON形式）
+    - メタデータ抽出（プロンプトに記載されたフィールドを持つJSON）
+    - 通常の回答（fused方式の場合は1行目に質問タイプを付与）
+    """
+
+    latency: float = FAKE_LLM_LATENCY_SECONDS
+    model_name: str = "fake-chat"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _canned_response(self, messages: List[BaseMessage]) -> str:
+        """メッセージの内容から定型の応答を作成"""
+        from .question_classifier import LocalQuestionClassifier
+
+        system_text = "\n".join(str(m.content) for m in messages if m.type == "system")
+        human_text = next((str(m.content) for m in reversed(messages) if m.type == "human"), "")
+        question_type = LocalQuestionClassifier().classify(human_text)
+
+        if '"confidence"' in system_text:
+            # QuestionClassifier は facility / area / property の3分類
+            classifier_type = question_type if question_type in ("facility", "area", "property") else "area"
+            return f'{{"type": "{classifier_type}", "confidence": 0.9, "reason": "ダミー応答"}}'
+        if "カテゴリ名のみを返してください" in system_text:
+            return question_type
+        if "JSONで出力してください" in system_text:
+            fields = re.findall(r'^\s+"(\w+)":', system_text, flags=re.MULTILINE)
+            return "{" + ", ".join(f'"{field}": "ダミー"' for field in fields) + "}"
+
+        answer = f"（ダミー応答）「{human_text[:50]}」についての回答です。"
+        if "質問タイプ: カテゴリ名" in system_text:
+            return f"質問タイプ: {question_type}\n{answer}"
+        return answer
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        message = AIMessage(content=self._canned_response(messages))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        if self.latency:
+            time.sleep(self.latency)
+        content = self._canned_response(messages)
+        for i in range(0, len(content), 4):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=content[i:i + 4]))
+
+def _require_openai_api_key() -> None:
+    if not OPENAI_API_KEY:
+        raise ValueError("OpenAI APIキーが設定されていません")
+
+def create_openai_client():
+    """埋め込みAPI用のクライアントを作成"""
+    if LLM_PROVIDER == "fake":
+        return FakeOpenAIClient()
+    _require_openai_api_key()
+    return OpenAI(api_key=OPENAI_API_KEY)
+
+def create_embeddings() -> Embeddings:
+    """LangChain用の埋め込みモデルを作成"""
+    if LLM_PROVIDER == "fake":
+        return FakeEmbeddings()
+    _require_openai_api_key()
+    return OpenAIEmbeddings(api_key=OPENAI_API_KEY, model=EMBEDDING_MODEL)
+
+def create_chat_model(model_name: str = "gpt-3.5-turbo", temperature: float = 0.7, **kwargs) -> BaseChatModel:
+    """チャットモデルを作成"""
+    if LLM_PROVIDER == "fake":
+        return FakeChatModel(**kwargs)
+    _require_openai_api_key()
+    return ChatOpenAI(api_key=OPENAI_API_KEY, model_name=model_name, temperature=temperature, **kwargs)
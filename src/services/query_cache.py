@@ -0,0 +1,113 @@
+from typing import Dict, Any, Optional, Hashable
+from collections import OrderedDict
+import threading
+import time
+import unicodedata
+from ..config.settings import (
+    QUERY_CACHE_ENABLED,
+    QUERY_CACHE_MAX_ENTRIES,
+    QUERY_CACHE_TTL_SECONDS
+)
+from .search_filters import describe_filter
+
+class QueryResultCache:
+    """検索結果のキャッシュ（TTL + LRU）
+
+    キーにはインデックスの世代番号を含めるため、アップロードやクリアで
+    世代が進むと古い結果は参照されなくなる。
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES, ttl_seconds: float = QUERY_CACHE_TTL_SECONDS):
+        """キャッシュの初期化"""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # キー -> (有効期限, 値)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """表記ゆれを吸収するためにクエリを正規化"""
+        normalized = " ".join(unicodedata.normalize("NFKC", query).split()).lower()
+        return normalized.rstrip("?!。.")
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """キャッシュから値を取得（期限切れ・未登録の場合はNone）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """値をキャッシュに保存（上限を超えた場合は最も古いものを削除）"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """キャッシュを全件削除"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キャッシュの統計情報を取得"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "index_generation": _index_generation
+            }
+
+_cache_instance: Optional[QueryResultCache] = None
+_cache_lock = threading.Lock()
+_index_generation = 0
+
+def get_query_cache() -> Optional[QueryResultCache]:
+    """プロセス内で共有する検索結果キャッシュを取得（無効化されている場合はNone）"""
+    global _cache_instance
+    if not QUERY_CACHE_ENABLED:
+        return None
+
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = QueryResultCache()
+        return _cache_instance
+
+def get_index_generation() -> int:
+    """インデックスの世代番号を取得"""
+    return _index_generation
+
+def bump_index_generation() -> int:
+    """インデックスの内容が変わったことを記録し、キャッシュ済みの検索結果を無効化"""
+    global _index_generation
+    with _cache_lock:
+        _index_generation += 1
+        if _cache_instance is not None:
+            _cache_instance.clear()
+        return _index_generation
+
+def make_query_cache_key(kind: str, query: str, namespace: Optional[str], top_k: int, similarity_threshold: float, metadata_filter: Optional[Dict[str, Any]] = None) -> tuple:
+    """検索結果キャッシュのキーを作成"""
+    return (
+        kind,
+        QueryResultCache.normalize_query(query),
+        namespace or "",
+        top_k,
+        similarity_threshold,
+        describe_filter(metadata_filter),
+        _index_generation
+    )
@@ -1,9 +1,8 @@
 from typing import Literal, Optional
-from langchain.chat_models import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 from langchain.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from src.config.settings import OPENAI_API_KEY
+from src.services.providers import create_chat_model
 
 class QuestionType(BaseModel):
     """質問タイプを表すモデル"""
@@ -21,13 +20,7 @@ class QuestionType(BaseModel):
 
 class QuestionClassifier:
     def __init__(self, model_name: str = "gpt-3.5-turbo"):
-        if not OPENAI_API_KEY:
-            raise ValueError("OPENAI_API_KEY is not set in settings")
-        
-        self.llm = ChatOpenAI(
-            model_name=model_name,
-            openai_api_key=OPENAI_API_KEY
-        )
+        self.llm = create_chat_model(model_name=model_name)
         self.parser = PydanticOutputParser(pydantic_object=QuestionType)
         
         # フォーマット指示を取得
@@ -69,4 +62,37 @@ class QuestionClassifier:
         result = self.classify(question)
         if result.confidence >= 0.7:
             return result.type
-        return None 
\ No newline at end of file
+        return None 
+
+class LocalQuestionClassifier:
+    """キーワードに基づくローカルの質問分類器（APIを呼び出さない）"""
+
+    # カテゴリごとの判定キーワード（同点の場合は先に定義したカテゴリを優先）
+    KEYWORDS = {
+        "comparison": ["比較", "比べ", "違い", "どちらが", "どっちが"],
+        "investment": ["投資", "利回り", "資産価値", "収益", "売却", "賃貸経営"],
+        "price_analysis": ["価格", "相場", "値段", "費用", "いくら", "坪単価", "家賃", "予算"],
+        "location": ["立地", "アクセス", "徒歩", "通勤", "通学", "何分", "距離", "最寄り駅"],
+        "facility": [
+            "コンビニ", "スーパー", "病院", "クリニック", "学校", "小学校", "中学校", "保育園",
+            "幼稚園", "公園", "銀行", "郵便局", "薬局", "ドラッグストア", "施設", "最寄り", "近く"
+        ],
+        "property": ["物件", "間取り", "設備", "築年数", "面積", "駐車場", "部屋", "マンション", "一戸建て", "土地"],
+        "area": ["治安", "地域", "街", "エリア", "環境", "歴史", "人口", "雰囲気", "住みやすさ", "子育て"]
+    }
+    DEFAULT_TYPE = "area"
+
+    def match(self, question: str) -> Optional[str]:
+        """キーワードが最も多く含まれる質問タイプを返す（いずれも含まれない場合はNone）"""
+        best_type = None
+        best_score = 0
+        for question_type, keywords in self.KEYWORDS.items():
+            score = sum(1 for keyword in keywords if keyword in question)
+            if score > best_score:
+                best_type = question_type
+                best_score = score
+        return best_type
+
+    def classify(self, question: str) -> str:
+        """質問のタイプを判別する"""
+        return self.match(question) or self.DEFAULT_TYPE
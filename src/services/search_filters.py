@@ -0,0 +1,76 @@
+from typing import Dict, Any, Optional, Union
+from datetime import datetime
+import json
+from ..config.settings import QUESTION_TYPE_MAIN_CATEGORIES
+
+DateLike = Union[str, datetime, int, float]
+
+def to_timestamp(value: Optional[DateLike]) -> Optional[float]:
+    """日時（ISO形式の文字列・datetime・UNIX時刻）をUNIX時刻に変換（変換できない場合はNone）"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+def build_metadata_filter(
+    city: Optional[str] = None,
+    main_category: Optional[str] = None,
+    sub_category: Optional[str] = None,
+    source: Optional[str] = None,
+    date_from: Optional[DateLike] = None,
+    date_to: Optional[DateLike] = None
+) -> Optional[Dict[str, Any]]:
+    """検索条件からPineconeのメタデータフィルタを作成（条件が無い場合はNone）
+
+    市区町村は、市区町村が設定されていないチャンク（地域を問わない情報）も対象に含める。
+    日付の範囲はアップロード日時（upload_ts）で絞り込む。
+    """
+    conditions = []
+    if city:
+        conditions.append({"city": {"$in": [city, ""]}})
+    if main_category:
+        conditions.append({"main_category": {"$eq": main_category}})
+    if sub_category:
+        conditions.append({"sub_category": {"$eq": sub_category}})
+    if source:
+        conditions.append({"source": {"$eq": source}})
+
+    date_range = {}
+    if to_timestamp(date_from) is not None:
+        date_range["$gte"] = to_timestamp(date_from)
+    if to_timestamp(date_to) is not None:
+        date_range["$lte"] = to_timestamp(date_to)
+    if date_range:
+        conditions.append({"upload_ts": date_range})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+def derive_search_filters(property_city: Optional[str] = None, question_type: Optional[str] = None) -> Dict[str, Any]:
+    """選択中の物件の市区町村と質問タイプから検索条件を作成
+
+    Returns:
+        Dict[str, Any]: build_metadata_filter に渡す検索条件
+    """
+    filters = {}
+    if property_city:
+        filters["city"] = property_city
+    main_category = QUESTION_TYPE_MAIN_CATEGORIES.get(question_type)
+    if main_category:
+        filters["main_category"] = main_category
+    return filters
+
+def describe_filter(metadata_filter: Optional[Dict[str, Any]]) -> str:
+    """メタデータフィルタを表示・キャッシュのキー用の文字列に変換"""
+    if not metadata_filter:
+        return ""
+    return json.dumps(metadata_filter, ensure_ascii=False, sort_keys=True)
@@ -0,0 +1,190 @@
+from typing import Dict, Any, Optional
+import atexit
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from ..config.settings import (
+    SIDECAR_ENABLED,
+    SIDECAR_SCRIPT,
+    SIDECAR_HOST,
+    SIDECAR_PORT,
+    SIDECAR_STARTUP_GRACE_SECONDS,
+    SIDECAR_HEALTH_CHECK_INTERVAL_SECONDS,
+    SIDECAR_HEALTH_CHECK_FAILURES,
+    SIDECAR_MAX_BACKOFF_SECONDS,
+    SIDECAR_STABLE_SECONDS
+)
+
+# プロジェクトのルートディレクトリ（サイドカーのスクリプトはここからの相対パス）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+class SidecarSupervisor:
+    """サイドカー（地図・ハザード情報のサーバー）の起動と監視
+
+    プロセス内で1度だけサーバーを起動し、一定間隔でポートへの接続を確認する。
+    異常終了した場合や応答しなくなった場合は、待機時間を倍増させながら再起動する。
+    正常終了（終了コード0）した場合は再起動しない。
+    """
+
+    def __init__(
+        self,
+        script: str = SIDECAR_SCRIPT,
+        host: str = SIDECAR_HOST,
+        port: int = SIDECAR_PORT
+    ):
+        """監視の初期化（サーバーは start で起動）"""
+        self.script = script if os.path.isabs(script) else os.path.join(PROJECT_ROOT, script)
+        self.host = host
+        self.port = port
+        self.status = "stopped"  # stopped / starting / running / external / restarting / exited
+        self.restarts = 0
+        self.last_exit_code: Optional[int] = None
+        self._process: Optional[subprocess.Popen] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """監視スレッドを起動（起動済みの場合は何もしない）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # 正常終了したサーバーは再実行のたびに起動し直さない
+            if self.status == "exited":
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._supervise, name="sidecar-supervisor", daemon=True)
+            self._thread.start()
+
+    def is_healthy(self) -> bool:
+        """サーバーのポートに接続できるかどうか"""
+        try:
+            with socket.create_connection((self.host, self.port), timeout=1):
+                return True
+        except OSError:
+            return False
+
+    def _spawn(self) -> subprocess.Popen:
+        """サーバーのプロセスを起動（Streamlitと同じPythonインタプリタを使用）"""
+        print(f"サイドカーを起動します: {self.script}")
+        return subprocess.Popen([sys.executable, self.script], cwd=PROJECT_ROOT)
+
+    def _supervise(self) -> None:
+        """サーバーを起動し、終了・応答なしを検知したら再起動する"""
+        backoff = 1
+        while not self._stop_event.is_set():
+            # 別のプロセスが起動したサーバーが既に応答している場合は起動しない
+            if self.is_healthy():
+                self.status = "external"
+                self._stop_event.wait(SIDECAR_HEALTH_CHECK_INTERVAL_SECONDS)
+                continue
+
+            self.status = "starting"
+            with self._lock:
+                if self._stop_event.is_set():
+                    break
+                self._process = self._spawn()
+            process = self._process
+            started_at = time.monotonic()
+            exit_code = self._watch(process, started_at)
+
+            if self._stop_event.is_set():
+                break
+            self.last_exit_code = exit_code
+            if exit_code == 0:
+                print("サイドカーが終了しました（終了コード 0）")
+                self.status = "exited"
+                return
+
+            # 一定時間安定して動作していた場合は待機時間をリセット
+            if time.monotonic() - started_at >= SIDECAR_STABLE_SECONDS:
+                backoff = 1
+            self.status = "restarting"
+            self.restarts += 1
+            print(f"サイドカーが異常終了しました（終了コード {exit_code}）。{backoff}秒後に再起動します...")
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, SIDECAR_MAX_BACKOFF_SECONDS)
+
+    def _watch(self, process: subprocess.Popen, started_at: float) -> Optional[int]:
+        """プロセスの終了まで監視し、終了コードを返す（応答しない場合は停止させる）"""
+        failures = 0
+        while not self._stop_event.is_set():
+            try:
+                return process.wait(timeout=SIDECAR_HEALTH_CHECK_INTERVAL_SECONDS)
+            except subprocess.TimeoutExpired:
+                pass
+
+            # 起動直後はポートが開くまで待つ
+            if time.monotonic() - started_at < SIDECAR_STARTUP_GRACE_SECONDS:
+                continue
+            if self.is_healthy():
+                self.status = "running"
+                failures = 0
+                continue
+
+            failures += 1
+            print(f"サイドカーのヘルスチェックに失敗しました（{failures}/{SIDECAR_HEALTH_CHECK_FAILURES}）")
+            if failures >= SIDECAR_HEALTH_CHECK_FAILURES:
+                print("サイドカーが応答しないため停止します")
+                self._terminate(process)
+                # 終了コード0でも再起動の対象にする
+                return process.returncode or -1
+        return None
+
+    @staticmethod
+    def _terminate(process: subprocess.Popen, timeout: float = 5) -> None:
+        """プロセスを停止（一定時間内に終了しない場合は強制終了）"""
+        if process.poll() is not None:
+            return
+        process.terminate()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def stop(self) -> None:
+        """監視を終了し、サーバーを停止"""
+        with self._lock:
+            self._stop_event.set()
+            process = self._process
+        if process is not None:
+            self._terminate(process)
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=10)
+        self.status = "stopped"
+
+    def get_status(self) -> Dict[str, Any]:
+        """サイドカーの状態を取得"""
+        process = self._process
+        return {
+            "status": self.status,
+            "pid": process.pid if process is not None and process.poll() is None else None,
+            "restarts": self.restarts,
+            "last_exit_code": self.last_exit_code,
+            "port": self.port
+        }
+
+_supervisor_instance: Optional[SidecarSupervisor] = None
+_supervisor_lock = threading.Lock()
+
+def get_sidecar_supervisor() -> SidecarSupervisor:
+    """プロセス内で共有するサイドカーの監視を取得"""
+    global _supervisor_instance
+    with _supervisor_lock:
+        if _supervisor_instance is None:
+            _supervisor_instance = SidecarSupervisor()
+            # プロセスの終了時にサイドカーも停止する
+            atexit.register(_supervisor_instance.stop)
+        return _supervisor_instance
+
+def start_sidecar() -> Optional[SidecarSupervisor]:
+    """サイドカーを起動（起動済みの場合は何もしない。無効化されている場合はNone）"""
+    if not SIDECAR_ENABLED:
+        return None
+    supervisor = get_sidecar_supervisor()
+    supervisor.start()
+    return supervisor
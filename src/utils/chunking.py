@@ -0,0 +1,188 @@
+from typing import Iterable, Iterator, List, Optional
+from collections import deque
+from dataclasses import dataclass
+import threading
+from ..config.settings import CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_SIZE_UNIT, TOKENIZER_ENCODING
+
+# 1トークンあたりの最大文字数の目安（長すぎる行を強制的に分割する際の探索範囲）
+MAX_CHARS_PER_TOKEN = 16
+
+@dataclass
+class TextChunk:
+    """チャンク分割の結果"""
+    id: str  # 「IDの接頭辞_連番」（同じ入力・設定からは常に同じID）
+    index: int  # ドキュメント内の連番
+    text: str
+    size: int  # チャンクのサイズ（文字数またはトークン数。区切り文字は含めない）
+
+_token_encoding = None
+_token_encoding_loaded = False
+_token_encoding_lock = threading.Lock()
+
+def get_token_encoding():
+    """tiktokenのエンコーディングを取得（初回のみ読み込み。利用できない場合はNone）"""
+    global _token_encoding, _token_encoding_loaded
+    with _token_encoding_lock:
+        if not _token_encoding_loaded:
+            _token_encoding_loaded = True
+            try:
+                import tiktoken
+                _token_encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:
+                print(f"tiktokenを読み込めないため、トークン数は文字数から推定します: {str(e)}")
+        return _token_encoding
+
+def estimate_tokens(text: str) -> int:
+    """tiktokenを使わずにトークン数を推定（ASCII文字は4文字で1トークン、それ以外は1文字で1トークン）"""
+    ascii_count = len(text.encode("ascii", "ignore"))
+    return (len(text) - ascii_count) + (ascii_count + 3) // 4
+
+def count_tokens(text: str) -> int:
+    """テキストのトークン数を取得（tiktokenが利用できない場合は推定値）"""
+    encoding = get_token_encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+class ChunkingEngine:
+    """テキストをチャンクに分割するエンジン
+
+    行や文などの単位を先頭から1度だけ走査し、サイズの上限（文字数または
+    トークン数）を超えない範囲で単位をまとめてチャンクを逐次生成する。
+    単位はリストに保持して出力時に1度だけ連結するため、処理時間は入力の
+    長さに比例する。上限を超える単位は上限以下に強制的に分割する。
+    chunk_overlap を指定した場合は、前のチャンクの末尾の単位（合計が
+    chunk_overlap 以下のもの）を次のチャンクの先頭にも含める。
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = CHUNK_SIZE,
+        chunk_overlap: int = CHUNK_OVERLAP,
+        size_unit: str = CHUNK_SIZE_UNIT,
+        separator: str = "\n"
+    ):
+        """
+        Args:
+            chunk_size (int): チャンクの最大サイズ
+            chunk_overlap (int): 前のチャンクと重ねるサイズ（chunk_size 未満）
+            size_unit (str): サイズの単位（"char": 文字数 / "token": トークン数）
+            separator (str): 単位を連結する際の区切り文字
+        """
+        if chunk_size <= 0:
+            raise ValueError("チャンクサイズは1以上を指定してください")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("チャンクの重なりは0以上、チャンクサイズ未満を指定してください")
+        if size_unit not in ("char", "token"):
+            raise ValueError(f"サイズの単位が不正です: {size_unit}")
+
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.size_unit = size_unit
+        self.separator = separator
+
+    def measure(self, text: str) -> int:
+        """テキストのサイズを取得"""
+        if self.size_unit == "token":
+            return count_tokens(text)
+        return len(text)
+
+    def _fit_end(self, text: str, start: int, budget: int) -> int:
+        """text[start:end] が budget 以下となる最大の end を求める（最低1文字は含める）"""
+        if self.size_unit == "char":
+            return min(start + budget, len(text))
+
+        lo, hi = start + 1, min(len(text), start + budget * MAX_CHARS_PER_TOKEN)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.measure(text[start:mid]) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def _fit_start(self, text: str, end: int, budget: int, lower: int) -> int:
+        """text[start:end] が budget 以下となる最小の start を求める（lower より後ろ）"""
+        if self.size_unit == "char":
+            return max(end - budget, lower)
+
+        lo, hi = max(lower, end - budget * MAX_CHARS_PER_TOKEN), end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.measure(text[mid:end]) <= budget:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def split_oversized(self, text: str) -> List[str]:
+        """上限を超えるテキストを上限以下の断片に分割（断片の間も chunk_overlap だけ重ねる）"""
+        pieces = []
+        start = 0
+        while start < len(text):
+            end = self._fit_end(text, start, self.chunk_size)
+            pieces.append(text[start:end])
+            if end >= len(text):
+                break
+            start = self._fit_start(text, end, self.chunk_overlap, start + 1) if self.chunk_overlap else end
+        return pieces
+
+    def iter_chunks(self, units: Iterable[str], id_prefix: str = "chunk") -> Iterator[TextChunk]:
+        """
+        単位（行・文など）のイテレータからチャンクを逐次生成する関数
+
+        空白のみの単位は除外する。IDは「id_prefix_連番」で、同じドキュメント内で一意になる。
+
+        Args:
+            units (Iterable[str]): 分割するテキストの単位
+            id_prefix (str): チャンクIDの接頭辞（ファイル名など）
+
+        Returns:
+            Iterator[TextChunk]: チャンクのイテレータ
+        """
+        buffer = deque()  # (単位, サイズ)
+        buffer_size = 0
+        index = 0
+
+        def make_chunk(text: str, size: int) -> TextChunk:
+            nonlocal index
+            chunk = TextChunk(id=f"{id_prefix}_{index}", index=index, text=text, size=size)
+            index += 1
+            return chunk
+
+        for unit in units:
+            unit = unit.strip()
+            if not unit:
+                continue
+            size = self.measure(unit)
+
+            # 上限を超える単位は、それまでの内容を出力してから単独で分割する
+            if size > self.chunk_size:
+                if buffer:
+                    yield make_chunk(self.separator.join(text for text, _ in buffer), buffer_size)
+                    buffer.clear()
+                    buffer_size = 0
+                for piece in self.split_oversized(unit):
+                    yield make_chunk(piece, self.measure(piece))
+                continue
+
+            if buffer and buffer_size + size > self.chunk_size:
+                yield make_chunk(self.separator.join(text for text, _ in buffer), buffer_size)
+
+                # 末尾の単位を重なりとして次のチャンクに残す
+                kept = deque()
+                kept_size = 0
+                while buffer and kept_size + buffer[-1][1] <= self.chunk_overlap:
+                    kept.appendleft(buffer.pop())
+                    kept_size += kept[0][1]
+                # 重なりを含めると上限を超える場合は、古いものから減らす
+                while kept and kept_size + size > self.chunk_size:
+                    kept_size -= kept.popleft()[1]
+                buffer = kept
+                buffer_size = kept_size
+
+            buffer.append((unit, size))
+            buffer_size += size
+
+        if buffer:
+            yield make_chunk(self.separator.join(text for text, _ in buffer), buffer_size)
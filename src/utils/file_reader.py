@@ -0,0 +1,66 @@
+from typing import Iterator, Iterable, Optional
+import codecs
+from ..config.settings import ENCODING_SAMPLE_BYTES, FILE_READ_BLOCK_BYTES
+
+# 日本語のファイルで一般的なエンコーディング（判定はこの順に行う）
+ENCODINGS = ['utf-8', 'shift-jis', 'cp932', 'euc-jp']
+
+def detect_encoding(file, sample_size: int = ENCODING_SAMPLE_BYTES) -> Optional[str]:
+    """ファイルの先頭 sample_size バイトからエンコーディングを判定（判定できない場合はNone）
+
+    ファイル全体を読み込まず、先頭部分だけをデコードして元のバイト列に
+    戻せるかどうかで判定する。末尾で途切れたマルチバイト文字は無視する。
+    """
+    file.seek(0)
+    sample = file.read(sample_size)
+    file.seek(0)
+
+    for encoding in ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)()
+        try:
+            decoded = decoder.decode(sample, final=False)
+        except UnicodeDecodeError:
+            continue
+        pending = decoder.getstate()[0]
+        try:
+            if decoded.encode(encoding) == sample[:len(sample) - len(pending)]:
+                return encoding
+        except UnicodeEncodeError:
+            continue
+    return None
+
+def iter_decoded_blocks(file, encoding: str, block_size: int = FILE_READ_BLOCK_BYTES) -> Iterator[str]:
+    """ファイルを block_size バイトずつ読み込み、逐次デコードした文字列を返す
+
+    判定に使った先頭部分より後ろにデコードできないバイトがあった場合は
+    置換文字に置き換える。
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    file.seek(0)
+    while True:
+        block = file.read(block_size)
+        if not block:
+            break
+        text = decoder.decode(block)
+        if text:
+            yield text
+    text = decoder.decode(b'', final=True)
+    if text:
+        yield text
+
+def iter_lines(blocks: Iterable[str]) -> Iterator[str]:
+    """文字列のブロックを改行（\\n）ごとの行に分割して返す（text.split('\\n') と同じ行を返す）"""
+    pending = ''
+    for block in blocks:
+        lines = (pending + block).split('\n')
+        pending = lines.pop()
+        yield from lines
+    yield pending
+
+def iter_file_lines(file, block_size: int = FILE_READ_BLOCK_BYTES) -> Iterator[str]:
+    """ファイルのエンコーディングを判定し、1行ずつ読み込む
+
+    判定できない場合はUTF-8として読み込む（一部の文字が化ける可能性あり）。
+    """
+    encoding = detect_encoding(file) or 'utf-8'
+    return iter_lines(iter_decoded_blocks(file, encoding, block_size))
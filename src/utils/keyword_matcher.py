@@ -0,0 +1,73 @@
+from typing import List, Set, Iterable, Dict
+from collections import deque
+
+class KeywordMatcher:
+    """複数のキーワードを1回の走査で検出するマッチャー（Aho–Corasick法）
+
+    キーワードごとに部分文字列検索を繰り返す代わりに、全キーワードから
+    オートマトンを構築しておき、テキストを1文字ずつ1回だけ走査する。
+    重なり合うキーワード（例：「文化」と「文化財」）もすべて検出する。
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        """キーワードからオートマトンを構築"""
+        self.keywords = list(dict.fromkeys(keyword for keyword in keywords if keyword))
+
+        # トライ木の構築
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[List[int]] = [[]]
+        for keyword_index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    goto.append({})
+                    outputs.append([])
+                    next_state = len(goto) - 1
+                    goto[state][char] = next_state
+                state = next_state
+            outputs[state].append(keyword_index)
+
+        # 失敗遷移を幅優先で求め、各状態の遷移表に反映する
+        # （走査時に失敗遷移をたどらずに済むよう、遷移先をすべて展開しておく）
+        transitions: List[Dict[str, int]] = [dict(goto[0])] + [None] * (len(goto) - 1)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            outputs[state] = outputs[state] + outputs[fail[state]]
+            for char, next_state in goto[state].items():
+                fail[next_state] = transitions[fail[state]].get(char, 0) if state else 0
+                queue.append(next_state)
+
+        self._transitions = transitions
+        self._outputs = [tuple(output) for output in outputs]
+
+    def find_per_line(self, text: str) -> List[Set[str]]:
+        """行ごとに含まれるキーワードの集合を返す（text.split('\\n') と同じ順序・行数）"""
+        transitions = self._transitions
+        outputs = self._outputs
+        keywords = self.keywords
+
+        lines = []
+        found = set()
+        state = 0
+        for char in text:
+            if char == '\n':
+                lines.append({keywords[i] for i in found})
+                found = set()
+                state = 0
+                continue
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        lines.append({keywords[i] for i in found})
+        return lines
+
+    def find(self, text: str) -> Set[str]:
+        """テキストに含まれるキーワードの集合を返す"""
+        found = set()
+        for line_keywords in self.find_per_line(text):
+            found |= line_keywords
+        return found
@@ -0,0 +1,95 @@
+from typing import Dict, Any, Callable, Hashable, Optional, TypeVar
+import threading
+import time
+
+T = TypeVar("T")
+
+class ResourceCache:
+    """プロセス内で共有するリソース（サービス・APIクライアントなど）のキャッシュ
+
+    Streamlitはユーザー操作のたびにスクリプト全体を再実行するため、初期化に
+    ネットワーク通信を伴うオブジェクトを毎回作成しないよう、キーごとに1度だけ
+    作成して全セッションで共有する。作成はキーごとのロックで直列化するため、
+    複数のセッションから同時に要求されても作成は1回だけ行われる。
+    """
+
+    def __init__(self):
+        """キャッシュの初期化"""
+        self._resources: Dict[Hashable, Any] = {}
+        self._values: Dict[Hashable, tuple] = {}  # キー -> (有効期限, バージョン, 値)
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _get_key_lock(self, key: Hashable) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def get(self, key: Hashable, factory: Callable[[], T]) -> T:
+        """リソースを取得（未作成の場合は factory で作成。作成に失敗した場合はキャッシュしない）"""
+        with self._lock:
+            if key in self._resources:
+                return self._resources[key]
+
+        with self._get_key_lock(key):
+            with self._lock:
+                if key in self._resources:
+                    return self._resources[key]
+            resource = factory()
+            with self._lock:
+                self._resources[key] = resource
+            return resource
+
+    def get_value(self, key: Hashable, factory: Callable[[], T], ttl_seconds: float, version: Hashable = None) -> T:
+        """有効期限付きの値を取得（期限切れ・バージョン違いの場合は factory で再取得）"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is not None and entry[0] > now and entry[1] == version:
+                return entry[2]
+
+        with self._get_key_lock(key):
+            with self._lock:
+                entry = self._values.get(key)
+                if entry is not None and entry[0] > time.monotonic() and entry[1] == version:
+                    return entry[2]
+            value = factory()
+            with self._lock:
+                self._values[key] = (time.monotonic() + ttl_seconds, version, value)
+            return value
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """指定したキー（省略時は全件）のリソースと値を破棄（次回の取得時に再作成される）"""
+        with self._lock:
+            if key is None:
+                self._resources.clear()
+                self._values.clear()
+            else:
+                self._resources.pop(key, None)
+                self._values.pop(key, None)
+
+    def keys(self) -> list:
+        """キャッシュされているリソースのキー"""
+        with self._lock:
+            return list(self._resources.keys())
+
+_cache_instance: Optional[ResourceCache] = None
+_cache_lock = threading.Lock()
+
+def get_resource_cache() -> ResourceCache:
+    """プロセス内で共有するリソースキャッシュを取得"""
+    global _cache_instance
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = ResourceCache()
+        return _cache_instance
+
+def get_resource(key: Hashable, factory: Callable[[], T]) -> T:
+    """共有のリソースを取得（未作成の場合は factory で作成）"""
+    return get_resource_cache().get(key, factory)
+
+def invalidate_resource(key: Optional[Hashable] = None) -> None:
+    """共有のリソースを破棄（省略時は全件）"""
+    get_resource_cache().invalidate(key)
@@ -1,20 +1,89 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from janome.tokenizer import Tokenizer
-from ..config.settings import CHUNK_SIZE
+from ..config.settings import CHUNK_SIZE, CHUNK_OVERLAP, SENTENCE_SPLITTER
+from .chunking import ChunkingEngine
+import re
+import threading
 import time
+import unicodedata
+
+# 文末とみなす文字
+SENTENCE_TERMINATORS = ['。', '！', '？', '!', '?']
+_TERMINATOR_PATTERN = re.compile("[" + "".join(SENTENCE_TERMINATORS) + "]")
+
+_tokenizer: Optional[Tokenizer] = None
+_tokenizer_lock = threading.Lock()
+
+def get_tokenizer() -> Tokenizer:
+    """プロセス内で共有するJanomeのトークナイザーを取得（辞書の読み込みは初回のみ）"""
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            _tokenizer = Tokenizer()
+        return _tokenizer
+
+def _is_symbol(char: str) -> bool:
+    """Janomeが記号として扱う文字かどうかを判定"""
+    return char != '・' and unicodedata.category(char)[0] in ('P', 'S')
+
+def split_sentences(text: str) -> List[str]:
+    """句読点の位置でテキストを文単位に分割（形態素解析を行わない高速版）
+
+    Janomeによる分割と同じく前後の空白を除き、文末の文字までを1文とする。
+    半角の「!」「?」はJanomeでは前後の記号（全角・半角を問わない）とまとめて1語に
+    なることが多いため、テキストの末尾を除き、前後に記号が無い場合のみ文末とみなす。
+
+    Janomeとの違い: 語と文末の記号が交互に現れる通常の文では結果は一致するが、
+    記号が連続する箇所では異なる場合がある。Janomeでは記号の連続を1語にまとめるか
+    どうかが形態素解析のコスト（前後の語・記号の種類）で決まるため、文字の並びだけ
+    では再現できない（例: 「（参考）?次」はどちらも分割しないが、「「はい」?いいえ」は
+    Janomeのみ「?」の後で分割する。全角の「。」「！」「？」はここでは常に文末とみなす）。
+    Janomeで分割した既存のデータとチャンクの境界を完全に揃える場合は
+    SENTENCE_SPLITTER=janome を使用する。
+    """
+    text = text.strip()
+    sentences = []
+    start = 0
+
+    for match in _TERMINATOR_PATTERN.finditer(text):
+        end = match.end()
+        if match.group() in ('!', '?') and end < len(text):
+            prev_char = text[end - 2] if end >= 2 else ''
+            if _is_symbol(text[end]) or (prev_char and _is_symbol(prev_char)):
+                continue
+        sentences.append(text[start:end])
+        start = end
+
+    if start < len(text):
+        sentences.append(text[start:])
+
+    return sentences
 
 class JapaneseTextProcessor:
-    def __init__(self):
-        self.tokenizer = Tokenizer()
+    def __init__(self, sentence_splitter: str = SENTENCE_SPLITTER):
+        """
+        Args:
+            sentence_splitter (str): 文分割の方法（"regex" または "janome"）
+        """
+        self.sentence_splitter = sentence_splitter
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        """共有のJanomeトークナイザー"""
+        return get_tokenizer()
 
     def split_into_sentences(self, text: str) -> List[str]:
         """テキストを文単位に分割"""
+        if self.sentence_splitter != "janome":
+            return split_sentences(text)
+
+        # 形態素の境界で分割する場合
         sentences = []
         current_sentence = []
         
         for token in self.tokenizer.tokenize(text):
             current_sentence.append(token.surface)
-            if token.surface in ['。', '！', '？', '!', '?']:
+            if token.surface in SENTENCE_TERMINATORS:
                 sentences.append(''.join(current_sentence))
                 current_sentence = []
         
@@ -27,73 +96,24 @@ class JapaneseTextProcessor:
         """文の区切りかどうかを判定"""
         if not text:
             return False
-        return text[-1] in ['。', '！', '？', '!', '?']
-
-    def process_text_file(self, file_content: str, filename: str, chunk_size: int = CHUNK_SIZE) -> List[Dict[str, Any]]:
-        """テキストファイルを文脈を考慮したチャンクに分割"""
-        chunks = []
-        current_chunk = ""
-        current_length = 0
-        chunk_id = 0
-        
-        # 文単位に分割
-        sentences = self.split_into_sentences(file_content)
-        
-        for sentence in sentences:
-            sentence_size = len(sentence)
-            
-            # 現在のチャンクに文を追加できる場合
-            if current_length + sentence_size <= chunk_size:
-                current_chunk += sentence + "\n"
-                current_length += sentence_size + 1
-            else:
-                # 現在のチャンクが空でない場合、新しいチャンクを作成
-                if current_chunk:
-                    chunks.append({
-                        "id": f"{filename}_chunk_{chunk_id}",  # ファイル名を含めたID
-                        "text": current_chunk.strip(),
-                        "metadata": {
-                            "filename": filename,
-                            "chunk_id": chunk_id
-                        }
-                    })
-                    chunk_id += 1
-                    current_chunk = ""
-                    current_length = 0
-                
-                # 文がチャンクサイズを超える場合は、強制的に分割
-                if sentence_size > chunk_size:
-                    # 文を適切なサイズに分割
-                    for i in range(0, len(sentence), chunk_size):
-                        sub_chunk = sentence[i:i + chunk_size]
-                        chunks.append({
-                            "id": f"{filename}_chunk_{chunk_id}",  # ファイル名を含めたID
-                            "text": sub_chunk,
-                            "metadata": {
-                                "filename": filename,
-                                "chunk_id": chunk_id
-                            }
-                        })
-                    current_chunk = ""
-                    current_length = 0
-                else:
-                    current_chunk = sentence + "\n"
-                    current_length = sentence_size + 1
-        
-        # 最後のチャンクを追加
-        if current_chunk:
-            chunks.append({
-                "id": f"{filename}_chunk_{chunk_id}",  # ファイル名を含めたID
-                "text": current_chunk.strip(),
+        return text[-1] in SENTENCE_TERMINATORS
+
+    def process_text_file(self, file_content: str, filename: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[Dict[str, Any]]:
+        """テキストファイルを文脈を考慮したチャンクに分割（文の途中では区切らない）"""
+        engine = ChunkingEngine(chunk_size, chunk_overlap)
+        return [
+            {
+                "id": chunk.id,  # ファイル名を含めたID
+                "text": chunk.text,
                 "metadata": {
                     "filename": filename,
-                    "chunk_id": chunk_id
+                    "chunk_id": chunk.index
                 }
-            })
-        
-        return chunks
+            }
+            for chunk in engine.iter_chunks(self.split_into_sentences(file_content), id_prefix=f"{filename}_chunk")
+        ]
 
 # 後方互換性のための関数
-def process_text_file(file_content: str, filename: str, chunk_size: int = CHUNK_SIZE) -> List[Dict[str, Any]]:
+def process_text_file(file_content: str, filename: str, chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> List[Dict[str, Any]]:
     processor = JapaneseTextProcessor()
-    return processor.process_text_file(file_content, filename, chunk_size)
\ No newline at end of file
+    return processor.process_text_file(file_content, filename, chunk_size, chunk_overlap)
\ No newline at end of file
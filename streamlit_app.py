@@ -1,6 +1,4 @@
 import streamlit as st
-import subprocess
-import threading
 from src.utils.text_processing import process_text_file
 from src.services.pinecone_service import PineconeService
 from src.components.file_upload import render_file_upload
@@ -9,15 +7,21 @@ from src.components.settings_ui import render_settings
 from src.components.agent import render_agent
 from src.components.property_upload import render_property_upload
 from src.config.settings import DEFAULT_SYSTEM_PROMPT, DEFAULT_RESPONSE_TEMPLATE
+from src.utils.resource_cache import get_resource
+from src.services.sidecar import start_sidecar
 import os
 from langsmith import Client
 from langchain.callbacks.tracers import LangChainTracer
 from langchain.callbacks.manager import CallbackManager
 
-# LangSmithの設定
-client = Client()
-tracer = LangChainTracer()
-callback_manager = CallbackManager([tracer])
+def create_callback_manager() -> CallbackManager:
+    """LangSmithのトレースを送信するコールバックマネージャーを作成"""
+    client = Client()
+    tracer = LangChainTracer()
+    return CallbackManager([tracer])
+
+# LangSmithの設定（再実行のたびに作成しないよう、プロセス内で共有する）
+callback_manager = get_resource("langsmith_callback_manager", create_callback_manager)
 
 # セッション状態の初期化
 if "messages" not in st.session_state:
@@ -29,11 +33,11 @@ if "system_prompt" not in st.session_state:
 if "response_template" not in st.session_state:
     st.session_state.response_template = DEFAULT_RESPONSE_TEMPLATE
 
-# Pineconeサービスの初期化
+# Pineconeサービスの初期化（プロセス内で共有し、再実行時は作成済みのものを使用）
 try:
-    pinecone_service = PineconeService()
-    # インデックスの状態を確認
-    stats = pinecone_service.get_index_stats()
+    pinecone_service = get_resource("pinecone_service", PineconeService)
+    # インデックスの状態を確認（一定時間キャッシュした値を使用）
+    stats = pinecone_service.get_cached_index_stats()
     if stats['total_vector_count'] == 0:
         st.info("データベースは空です。物件情報を登録してください。")
     else:
@@ -55,14 +59,8 @@ def read_file_content(file) -> str:
     
     raise ValueError("ファイルのエンコーディングを特定できませんでした。UTF-8、Shift-JIS、CP932、EUC-JPのいずれかで保存されているファイルをアップロードしてください。")
 
-def start_flask_server():
-    """Flaskサーバーを起動する"""
-    subprocess.run(["python", "reacttest.py"])
-
-# Flaskサーバーを別スレッドで起動
-flask_thread = threading.Thread(target=start_flask_server)
-flask_thread.daemon = True
-flask_thread.start()
+# Flaskサーバーをサイドカーとして起動（プロセス内で1度だけ起動し、異常終了時は再起動）
+start_sidecar()
 
 def main():
     # サイドバーにメニューを配置
@@ -0,0 +1,30 @@
+"""
+テスト用の環境変数の設定
+
+設定はインポート時に環境変数から読み込まれるため、各テストは src をインポートする前に
+このモジュールをインポートする。外部APIを使わないスタンドイン（LLM_PROVIDER=fake,
+VECTOR_STORE_BACKEND=local）を使い、保存先はすべて一時ディレクトリにする。
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+STORE_DIR = tempfile.mkdtemp(prefix="pinechat_test_")
+atexit.register(shutil.rmtree, STORE_DIR, ignore_errors=True)
+
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["VECTOR_STORE_BACKEND"] = "local"
+os.environ["LOCAL_VECTOR_STORE_DIR"] = os.path.join(STORE_DIR, "vector_store")
+os.environ["INGESTION_MANIFEST_PATH"] = os.path.join(STORE_DIR, "ingestion_manifest.sqlite3")
+os.environ["INGESTION_JOB_DIR"] = os.path.join(STORE_DIR, "ingestion_jobs")
+os.environ["DOCUMENT_STORE_PATH"] = os.path.join(STORE_DIR, "document_store.sqlite3")
+os.environ["LEXICAL_INDEX_PATH"] = os.path.join(STORE_DIR, "lexical_index.sqlite3")
+os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(STORE_DIR, "embeddings.sqlite3")
+# st.secrets を参照しないようにダミーの値を設定
+for _name in ("PINECONE_API_KEY", "OPENAI_API_KEY", "PINECONE_INDEX_NAME", "PINECONE_ASSISTANT_NAME"):
+    os.environ.setdefault(_name, "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
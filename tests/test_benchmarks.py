@@ -0,0 +1,36 @@
+"""
+ベンチマークのスモークテスト（各シナリオが最小の件数で完走し、結果を出力することを確認）
+
+実行方法: python -m unittest discover tests
+"""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+import support
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "run_benchmarks.py")
+
+class BenchmarkSmokeTest(unittest.TestCase):
+    def test_all_scenarios_with_size_1(self):
+        """取り込み・検索・チャット応答のシナリオが --sizes 1 で結果を出力する"""
+        output_path = os.path.join(support.STORE_DIR, "bench_smoke.json")
+        subprocess.run(
+            [
+                sys.executable, SCRIPT_PATH,
+                "--sizes", "1", "--repeat", "1", "--queries", "1",
+                "--only", "upload_chunks,query,get_response",
+                "--output", output_path
+            ],
+            check=True,
+            capture_output=True
+        )
+        with open(output_path, encoding="utf-8") as f:
+            names = {result["name"] for result in json.load(f)["results"]}
+        self.assertEqual(names, {"upload_chunks", "query", "LangChainService.get_response"})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+"""
+埋め込みキャッシュのテスト
+
+実行方法: python -m unittest discover tests
+"""
+
+import os
+import tempfile
+import unittest
+
+import support  # noqa: F401（src をインポートする前にテスト用の環境変数を設定）
+from src.config.settings import EMBEDDING_MODEL
+from src.services.embedding_cache import EmbeddingCache
+from src.services.providers import fake_embedding
+
+class EmbeddingCacheProviderTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "embeddings.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_fake_vectors_are_not_served_to_openai(self):
+        """LLM_PROVIDER=fake で保存したベクトルは、同じモデル名でもOpenAIの実行では使わない"""
+        fake_cache = EmbeddingCache(self.path, provider="fake")
+        fake_cache.put_many(EMBEDDING_MODEL, ["西川口駅"], [fake_embedding("西川口駅")])
+        self.assertIsNotNone(fake_cache.get_many(EMBEDDING_MODEL, ["西川口駅"])[0])
+        fake_cache._conn.close()
+
+        openai_cache = EmbeddingCache(self.path, provider="openai")
+        self.assertEqual(openai_cache.get_many(EMBEDDING_MODEL, ["西川口駅"]), [None])
+        openai_cache._conn.close()
+
+if __name__ == "__main__":
+    unittest.main()
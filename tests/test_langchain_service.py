@@ -0,0 +1,29 @@
+"""
+ローカルのベクトルストアを使ったLangChainServiceのテスト
+
+実行方法: python -m unittest discover tests
+"""
+
+import unittest
+
+import support  # noqa: F401（src をインポートする前にテスト用の環境変数を設定）
+from src.services.langchain_service import LangChainService
+from src.services.local_vector_store import get_local_index
+from src.services.pinecone_service import PineconeService
+
+class LocalBackendLangChainServiceTest(unittest.TestCase):
+    def test_create_service_with_local_index(self):
+        """ローカルのベクトルストアをPineconeのインデックスとして初期化できる"""
+        service = LangChainService()
+        self.assertIs(service.vectorstore._index, get_local_index())
+
+    def test_search_uploaded_chunks(self):
+        """アップロードしたチャンクをLangChainServiceから検索できる"""
+        PineconeService().upload_chunks([
+            {"id": "station", "text": "西川口駅から徒歩4分の物件です。", "metadata": {}}
+        ])
+        context, _, _ = LangChainService().get_relevant_context("西川口駅から徒歩4分の物件です。")
+        self.assertIn("西川口駅", context)
+
+if __name__ == "__main__":
+    unittest.main()
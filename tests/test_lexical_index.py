@@ -0,0 +1,90 @@
+"""
+キーワード検索（BM25）とハイブリッド検索の関連性の判定のテスト
+
+実行方法: python -m unittest discover tests
+"""
+
+import os
+import tempfile
+import unittest
+
+import support  # noqa: F401（src をインポートする前にテスト用の環境変数を設定）
+from src.services.lexical_index import LexicalIndex, select_query_terms
+from src.services.hybrid_search import run_hybrid_search
+
+INDEX_KEY = "test"
+
+DOCUMENTS = [
+    ("doc1", {"text": "さいたま市には大宮駅があります。"}),
+    ("doc2", {"text": "川口駅の近くにはスーパーがあります。"}),
+    ("doc3", {"text": "駅前にラーメン屋があり、美味しいと評判です。"}),
+    ("doc4", {"text": "この物件は南向きで日当たりが良いです。"}),
+]
+
+class LexicalIndexRelevanceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = LexicalIndex(os.path.join(self.tmpdir.name, "lexical_index.sqlite3"))
+        self.index.add_documents(INDEX_KEY, None, DOCUMENTS)
+
+    def tearDown(self):
+        self.index._conn.close()
+        self.tmpdir.cleanup()
+
+    def test_function_words_are_not_query_terms(self):
+        """ひらがなを含むN-gram（助詞・助動詞など）は検索に使わない"""
+        terms = select_query_terms("近くにコンビニはありますか？")
+        self.assertNotIn("ます", terms)
+        self.assertNotIn("あり", terms)
+        self.assertIn("コン", terms)
+
+    def test_no_relevant_match(self):
+        """助詞などが一致するだけのチャンクは結果に含めない"""
+        matches = self.index.search(INDEX_KEY, None, "この物件の近くに図書館はありますか？", 3)
+        self.assertEqual(matches, [])
+
+    def test_relevant_match(self):
+        """クエリの語を十分に含むチャンクは結果に含める"""
+        matches = self.index.search(INDEX_KEY, None, "この物件の近くに美味しいラーメン屋はありますか？", 3)
+        self.assertEqual([match.id for match in matches], ["doc3"])
+
+class HybridSearchRelevanceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = LexicalIndex(os.path.join(self.tmpdir.name, "lexical_index.sqlite3"))
+        self.index.add_documents(INDEX_KEY, None, DOCUMENTS)
+
+    def tearDown(self):
+        self.index._conn.close()
+        self.tmpdir.cleanup()
+
+    def _hybrid_search(self, query, vector_search=lambda: []):
+        return run_hybrid_search(
+            vector_search,
+            lambda: self.index.search(INDEX_KEY, None, query, 3),
+            key=lambda match: match.id,
+            top_k=3
+        )
+
+    def test_exact_name_without_vector_results(self):
+        """ベクトル検索でしきい値以上の結果が無くても、名称が一致するチャンクは返す"""
+        hybrid = self._hybrid_search("大宮駅について教えてください")
+        self.assertEqual([entry["item"].id for entry in hybrid["results"]], ["doc1"])
+        self.assertEqual(hybrid["results"][0]["ranks"], {"lexical": 1})
+
+    def test_no_relevant_match_in_either_search(self):
+        """どちらの検索でも該当が無い場合は結果を返さない"""
+        hybrid = self._hybrid_search("この物件の近くに図書館はありますか？")
+        self.assertEqual(hybrid["results"], [])
+
+    def test_vector_failure_falls_back_to_lexical(self):
+        """ベクトル検索が失敗した場合は、キーワード検索の結果のみを返す"""
+        def failing_search():
+            raise RuntimeError("unavailable")
+
+        hybrid = self._hybrid_search("駅前のラーメン屋", failing_search)
+        self.assertEqual([entry["item"].id for entry in hybrid["results"]], ["doc3"])
+        self.assertEqual(hybrid["mode"], "lexical")
+
+if __name__ == "__main__":
+    unittest.main()
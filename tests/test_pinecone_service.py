@@ -0,0 +1,47 @@
+"""
+PineconeService のアップロード処理のテスト
+
+実行方法: python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import unittest
+
+import support  # noqa: F401（src をインポートする前にテスト用の環境変数を設定）
+from src.config.settings import EMBEDDING_MAX_INPUTS_PER_REQUEST
+from src.services.pinecone_service import PineconeService
+
+NAMESPACE = "test-upload"
+
+class UploadEmbeddingRequestTest(unittest.TestCase):
+    def setUp(self):
+        self.service = PineconeService()
+        self.service.embedding_cache = None
+        self.request_sizes = []
+        create = self.service.openai_client.embeddings.create
+
+        def counting_create(**kwargs):
+            self.request_sizes.append(len(kwargs["input"]))
+            return create(**kwargs)
+
+        self.service.openai_client.embeddings.create = counting_create
+
+    def tearDown(self):
+        self.service.clear_index(NAMESPACE)
+
+    def test_embedding_requests_are_not_limited_by_batch_size(self):
+        """埋め込みはアップロードのバッチ件数ではなく、APIの上限までまとめてリクエストする"""
+        chunks = [
+            {"id": f"chunk-{i}", "text": f"施設{i}は駅から徒歩{i % 20}分です。", "metadata": {}}
+            for i in range(250)
+        ]
+        with contextlib.redirect_stdout(io.StringIO()):
+            uploaded = self.service.upload_chunks(chunks, namespace=NAMESPACE, batch_size=10)
+
+        self.assertEqual(uploaded, len(chunks))
+        self.assertEqual(self.request_sizes, [len(chunks)])
+        self.assertLessEqual(max(self.request_sizes), EMBEDDING_MAX_INPUTS_PER_REQUEST)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+文分割のテスト（高速版の split_sentences とJanomeによる分割の比較）
+
+実行方法: python -m unittest discover tests
+"""
+
+import unittest
+
+import support  # noqa: F401（src をインポートする前にテスト用の環境変数を設定）
+from src.utils.text_processing import JapaneseTextProcessor, split_sentences
+
+# 語と文末の記号が交互に現れる文（全角・半角の記号が混在するもの）
+MATCHING_TEXTS = [
+    "「はい。」と言った。次です。",
+    "本当ですか？！すごい。",
+    "駅まで徒歩5分。（参考）次へ。",
+    "価格は？（税込）",
+    "本当?すごい!次",
+    "やった！！次へ",
+    "何？」と聞いた。",
+    "（参考）?次です",
+    "（参考）!次",
+    "abc?def",
+    "本当?!すごい",
+    "え?」と言った",
+    "営業時間は9:00〜17:00です。",
+    "えっ…。次",
+    "やった！〜楽しい",
+    "すごい！」「次",
+    "本当！？（笑）",
+]
+
+# 記号が連続する箇所で分割位置が異なるもの（docstringに記載した既知の違い）
+DIFFERING_TEXTS = {
+    "「はい」?いいえ": (["「はい」?いいえ"], ["「はい」?", "いいえ"]),
+    ":！(": ([":！", "("], [":！("]),
+}
+
+class SplitSentencesTest(unittest.TestCase):
+    def setUp(self):
+        self.janome = JapaneseTextProcessor(sentence_splitter="janome")
+
+    def test_matches_janome_on_mixed_punctuation(self):
+        """全角・半角の句読点が混在する通常の文ではJanomeと同じ位置で分割する"""
+        for text in MATCHING_TEXTS:
+            with self.subTest(text=text):
+                self.assertEqual(split_sentences(text), self.janome.split_into_sentences(text))
+
+    def test_known_differences_in_symbol_runs(self):
+        """記号が連続する箇所の既知の違い（Janomeの分割結果が変わった場合に検出する）"""
+        for text, (regex_sentences, janome_sentences) in DIFFERING_TEXTS.items():
+            with self.subTest(text=text):
+                self.assertEqual(split_sentences(text), regex_sentences)
+                self.assertEqual(self.janome.split_into_sentences(text), janome_sentences)
+
+if __name__ == "__main__":
+    unittest.main()